@@ -0,0 +1,5 @@
+"""
+Performance benchmarks of the GeoMop model.
+
+Benchmarks are run from the src directory, e.g. python -m benchmark.memory
+"""
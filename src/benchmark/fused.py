@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the fused auto-conversion and validation
+
+Compares the two-pass path (autoconvert followed by Validator.validate)
+with Validator.autoconvert_and_validate on the sample configurations.
+Both paths convert in place, so every repetition works on a freshly
+parsed tree; parsing is not measured.
+
+Usage: python -m benchmark.fused [repetitions]
+
+@author: Tomas Krizek
+"""
+
+import glob
+import os
+import sys
+import time
+
+from data import parse_format, parse_con, autoconvert, Validator
+from data.autoconverter import INPLACE
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+CON_DIR = os.path.join(ROOT_DIR, 'data', 'con')
+FORMAT_FILE = os.path.join(ROOT_DIR, 'data', 'format', '1.8.2.json')
+
+
+def two_pass(node, its, validator):
+    data = autoconvert(node, its, mode=INPLACE)
+    validator.validate(data, its)
+
+
+def fused(node, its, validator):
+    validator.autoconvert_and_validate(node, its, mode=INPLACE)
+
+
+def measure(function, filename, its, repetitions):
+    """Returns the total time of function over freshly parsed trees."""
+    validator = Validator()
+    total = 0.0
+    for i in range(repetitions):
+        node = parse_con(filename)
+        start = time.perf_counter()
+        function(node, its, validator)
+        total += time.perf_counter() - start
+    return total
+
+
+def main(repetitions=200):
+    its = parse_format(FORMAT_FILE)
+    totals = [0.0, 0.0]
+    for filename in sorted(glob.glob(os.path.join(CON_DIR, '*.con'))):
+        times = [measure(function, filename, its, repetitions)
+                 for function in (two_pass, fused)]
+        totals = [total + time_ for total, time_ in zip(totals, times)]
+        print('{name:30} two-pass {0:8.2f} ms  fused {1:8.2f} ms'.format(
+            *[1000 * time_ / repetitions for time_ in times],
+            name=os.path.basename(filename)))
+    print('{name:30} two-pass {0:8.2f} ms  fused {1:8.2f} ms ({2:.0%})'.format(
+        *[1000 * total / repetitions for total in totals],
+        totals[1] / totals[0], name='total'))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
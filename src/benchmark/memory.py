@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark of the DataNode tree structure
+
+Measures the memory footprint per node of a tree constructed from
+synthetic data, and per item of a long numeric array. The footprint of the current DataNode is compared with
+the original node layout (instance __dict__, string names of array
+items), which is kept here as a reference.
+
+Usage: python -m benchmark.memory [number of records]
+
+@author: Tomas Krizek
+"""
+
+import sys
+import tracemalloc
+
+from data.model import DataNode
+
+
+class LegacyDataNode:
+    """Reference node with the original (unslotted) memory layout."""
+
+    def __init__(self, data, parent=None, name=''):
+        self._ref = None
+        self.parent = parent
+        self.name = name
+        if isinstance(data, dict):
+            self._value = {}
+            for key, value in data.items():
+                self._value[key] = LegacyDataNode(value, self, key)
+        elif isinstance(data, list):
+            self._value = []
+            for i, item in enumerate(data):
+                self._value.append(LegacyDataNode(item, self, str(i)))
+        else:
+            self._value = data
+
+
+def generate_data(records):
+    """Returns data with the given number of records in an array."""
+    return {
+        'problem': {
+            'TYPE': 'SequentialCoupling',
+            'input_fields': [
+                {
+                    'region': 'region_{0}'.format(i),
+                    'conductivity': 1.0 + i,
+                    'init_pressure': [0.0, 1.0, 2.0]
+                } for i in range(records)
+            ]
+        }
+    }
+
+
+def count_nodes(data):
+    """Returns the number of nodes created for data."""
+    if isinstance(data, dict):
+        return 1 + sum(count_nodes(value) for value in data.values())
+    elif isinstance(data, list):
+        return 1 + sum(count_nodes(item) for item in data)
+    return 1
+
+
+def node_footprint(node_class, data):
+    """Returns the average number of bytes allocated per node."""
+    tracemalloc.start()
+    try:
+        root = node_class(data)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del root
+    return size / count_nodes(data)
+
+
+def main(records=10000):
+    data = generate_data(records)
+    legacy = node_footprint(LegacyDataNode, data)
+    current = node_footprint(DataNode, data)
+    print('nodes:   {0}'.format(count_nodes(data)))
+    print('legacy:  {0:.1f} B/node'.format(legacy))
+    print('current: {0:.1f} B/node ({1:.0%} of legacy)'.format(
+        current, current / legacy))
+
+    data = {'values': [0.5 * i for i in range(10 * records)]}
+    legacy = node_footprint(LegacyDataNode, data)
+    current = node_footprint(DataNode, data)
+    print('numeric array: legacy {0:.1f} B/item, current {1:.1f} B/item'.format(
+        legacy, current))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
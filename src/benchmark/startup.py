@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Startup benchmark of the CLI and the data package
+
+Runs commands under python -X importtime and reports the time spent in
+imports after the interpreter itself started (imports done by site are
+not counted), together with the modules which took the most time.
+The exit status is 1 if a scenario exceeds its time budget (BUDGETS),
+so the script can check a machine whose timings are known. Caches are
+created in a temporary directory, not in the user cache.
+
+Usage: python -m benchmark.startup [repetitions]
+
+@author: Tomas Krizek
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..')
+ROOT_DIR = os.path.join(SRC_DIR, '..')
+FORMAT_FILE = os.path.join(ROOT_DIR, 'data', 'format', '1.8.2.json')
+CON_FILE = os.path.join(ROOT_DIR, 'data', 'con', 'flow_robin.con')
+
+SCENARIOS = [
+    ('import data', ['-c', 'import data']),
+    ('parse_format', ['-c', 'from data import parse_format']),
+    ('cli --help', ['cli.py', '--help']),
+    ('cli validate', ['cli.py', CON_FILE, '-f', FORMAT_FILE, '--no-cache']),
+    ('cli cached', ['cli.py', CON_FILE, '-f', FORMAT_FILE]),
+]
+
+# import time budgets [ms]
+BUDGETS = {
+    'import data': 2,
+    'parse_format': 12,
+    'cli --help': 20,
+    'cli validate': 25,
+    'cli cached': 30,
+}
+
+
+def import_times(args, cache_home=None):
+    """
+    Runs python -X importtime with args in the src directory. Returns
+    a list of (name, self time, cumulative time, depth) of the imports made
+    after site, times in seconds. cache_home is used as XDG_CACHE_HOME.
+    """
+    env = None
+    if cache_home is not None:
+        env = dict(os.environ, XDG_CACHE_HOME=cache_home)
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                             cwd=SRC_DIR, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True,
+                             env=env)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            self_time, cumulative = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if name == 'site' and depth == 0:
+            imports = []  # interpreter startup
+            continue
+        imports.append((name, self_time / 1e6, cumulative / 1e6, depth))
+    return imports
+
+
+def startup_time(args, repetitions=5, cache_home=None):
+    """Returns the best total import time of args and its imports."""
+    best = None
+    for i in range(repetitions):
+        imports = import_times(args, cache_home)
+        total = sum(cumulative for name, self_time, cumulative, depth in imports
+                    if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, imports)
+    return best
+
+
+def main(repetitions=5):
+    """Prints the startup times; returns the number of exceeded budgets."""
+    exceeded = 0
+    with tempfile.TemporaryDirectory() as cache_home:
+        for name, args in SCENARIOS:
+            total, imports = startup_time(args, repetitions, cache_home)
+            over = total * 1000 > BUDGETS[name]
+            exceeded = exceeded + over
+            print('{name:16} {total:8.2f} ms  (budget {budget} ms, {count} modules){over}'.format(
+                name=name, total=total * 1000, budget=BUDGETS[name],
+                count=len(imports), over='  OVER BUDGET' if over else ''))
+            slowest = sorted(imports, key=(lambda item: -item[1]))[:5]
+            print('    ' + ', '.join('{0} {1:.2f}'.format(module, self_time * 1000)
+                                     for module, self_time, cumulative, depth in slowest))
+    return exceeded
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main(*[int(arg) for arg in sys.argv[1:]]) else 0)
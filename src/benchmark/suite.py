@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite on synthetic configurations
+
+Generates configurations valid against the 1.8.2 format at several scales
+(benchmark.synthetic) and measures the phases of their processing: parsing
+(decoding and building the tree), resolving references, auto-conversion
+and validation by the plain Validator (without the instrumentation of
+data.profiling). Every phase is measured repeatedly and the best time is
+kept.
+
+The times can be stored as a baseline and later runs compared with it;
+a phase which is slower than the baseline by more than the threshold is
+reported as a regression and the exit status is 1. Baselines are specific
+to the machine they were measured on, which is recorded in the baseline;
+comparing with a baseline of another machine prints a warning.
+
+Usage: python -m benchmark.suite [options]
+    --scales 1e3,1e4,1e5    numbers of nodes of the default scenarios
+    --array-length, --depth, --ref-density, --fanout
+                            knobs of the default scenarios
+    --variants              also run the scenarios varying single knobs
+    --repetitions N         number of measurements of every scenario
+    --baseline [FILE]       compare with a stored baseline
+    --save-baseline [FILE]  store the measured times as a baseline
+                            (the FILE defaults to benchmark/baseline.json)
+    --threshold RATIO       allowed slowdown against the baseline (1.25)
+
+@author: Tomas Krizek
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from data import autoconverter, parse_format
+from data.model import DataNode
+from data.parser import _decode_con, _extract_references, _ReferenceResolver
+from data.validation import Validator
+from benchmark.synthetic import scaled
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+FORMAT_FILE = os.path.join(ROOT_DIR, 'data', 'format', '1.8.2.json')
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+PHASES = ['parse', 'resolve', 'autoconvert', 'validate']
+SCALES = [1000, 10000, 100000]
+
+# scenarios varying a single knob, at 1e4 nodes
+VARIANTS = [
+    ('shallow', {'depth': 2}),
+    ('refs', {'ref_density': 0.2}),
+    ('fanout', {'fanout': 8}),
+]
+
+MIN_DIFFERENCE = 0.001  # differences below 1 ms are not regressions
+
+
+def scenarios(scales, knobs, variants=False):
+    """Returns (name, nodes, knobs) of the scenarios to run."""
+    result = [('default-{0:.0e}'.format(nodes), nodes, knobs)
+              for nodes in scales]
+    if variants:
+        for name, variant in VARIANTS:
+            variant_knobs = dict(knobs)
+            variant_knobs.update(variant)
+            result.append(('{0}-1e+04'.format(name), 10000, variant_knobs))
+    return result
+
+
+def measure(its, nodes, knobs, repetitions):
+    """
+    Returns the number of nodes and the best time of every phase of
+    processing a configuration with (at least) nodes nodes.
+    """
+    config = scaled(its, nodes, **knobs)
+    con = config.to_con()
+    times = None
+    for i in range(repetitions):
+        run, validator = _run_phases(con, its)
+        if validator.error_count:
+            raise ValueError("Synthetic configuration is not valid:\n" +
+                             validator.console_log)
+        if times is None:
+            times = run
+        else:
+            times = {phase: min(times[phase], run[phase]) for phase in PHASES}
+    return config.count_nodes(), times
+
+
+def _run_phases(con, its):
+    """Processes con phase by phase; returns the times and the validator."""
+    start = time.perf_counter()
+    data = _decode_con(con)
+    refs = _extract_references(data)
+    root = DataNode(data)
+    parsed = time.perf_counter()
+    root = _ReferenceResolver(root, refs).resolve()
+    resolved = time.perf_counter()
+    root = autoconverter.autoconvert(root, its, mode=autoconverter.INPLACE)
+    converted = time.perf_counter()
+    validator = Validator()
+    validator.validate(root, its)
+    validated = time.perf_counter()
+    times = {
+        'parse': parsed - start,
+        'resolve': resolved - parsed,
+        'autoconvert': converted - resolved,
+        'validate': validated - converted}
+    return times, validator
+
+
+def machine():
+    """Returns the description of this machine stored in baselines."""
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': '{0} {1}'.format(platform.python_implementation(),
+                                   platform.python_version())}
+
+
+def compare(results, baseline, threshold):
+    """Returns the descriptions of regressions of results against baseline."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for phase in PHASES:
+            time_ = result['times'][phase]
+            base = baseline[name]['times'].get(phase)
+            if base is None:
+                continue
+            if time_ > base * threshold and time_ - base > MIN_DIFFERENCE:
+                regressions.append(
+                    '{name} {phase}: {time:.2f} ms, baseline {base:.2f} ms '
+                    '({ratio:.2f}x)'.format(
+                        name=name, phase=phase, time=time_ * 1000,
+                        base=base * 1000, ratio=time_ / base))
+    return regressions
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmark.suite',
+        description='Benchmark on synthetic configurations')
+    parser.add_argument('--scales', default=','.join(str(n) for n in SCALES),
+                        help='comma separated numbers of nodes')
+    parser.add_argument('--array-length', type=int, default=None)
+    parser.add_argument('--depth', type=int, default=None)
+    parser.add_argument('--ref-density', type=float, default=None)
+    parser.add_argument('--fanout', type=int, default=None)
+    parser.add_argument('--variants', action='store_true')
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--baseline', nargs='?', const=BASELINE_FILE,
+                        default=None)
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_FILE,
+                        default=None)
+    parser.add_argument('--threshold', type=float, default=1.25)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    knobs = {key: value for key, value in (
+        ('array_length', args.array_length), ('depth', args.depth),
+        ('ref_density', args.ref_density), ('fanout', args.fanout))
+        if value is not None}
+    scales = [int(float(scale)) for scale in args.scales.split(',')]
+    its = parse_format(FORMAT_FILE)
+
+    print('{name:16} {nodes:>8} '.format(name='scenario', nodes='nodes') +
+          ' '.join('{0:>12}'.format(phase + ' [ms]') for phase in PHASES))
+    results = {}
+    for name, nodes, scenario_knobs in scenarios(scales, knobs, args.variants):
+        count, times = measure(its, nodes, scenario_knobs, args.repetitions)
+        results[name] = {'nodes': count, 'knobs': scenario_knobs,
+                         'times': times}
+        print('{name:16} {nodes:>8} '.format(name=name, nodes=count) +
+              ' '.join('{0:>12.2f}'.format(times[phase] * 1000)
+                       for phase in PHASES))
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({'machine': machine(), 'scenarios': results},
+                      baseline_file, indent=2, sort_keys=True)
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('machine') != machine():
+            print('Warning: the baseline was measured on another machine '
+                  '({0})'.format(baseline.get('machine', 'unknown')))
+        regressions = compare(results, baseline.get('scenarios', {}),
+                              args.threshold)
+        if regressions:
+            print('Regressions against {0}:'.format(args.baseline))
+            for regression in regressions:
+                print('  ' + regression)
+            return 1
+        print('No regressions against {0}'.format(args.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
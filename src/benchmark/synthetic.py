@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Generator of synthetic configurations
+
+Generates configurations valid against a format by walking its ITS. The
+shape of the generated data is controlled by knobs:
+    array_length - number of items of every array (limited by the range
+        of the array)
+    depth - nesting depth up to which optional keys are generated; deeper
+        records contain only their obligatory keys
+    ref_density - probability that a record or an array is replaced by
+        a REF to a previously generated node of the same type
+    fanout - number of implementations of every abstract record which are
+        used (in turns) by the generated records
+
+@author: Tomas Krizek
+"""
+
+import json
+import random
+
+
+class SyntheticConfig:
+    """Generates configuration data for a root ITS."""
+
+    def __init__(self, its, array_length=2, depth=8, ref_density=0.0,
+                 fanout=1, seed=0):
+        self.its = its
+        self.array_length = array_length
+        self.depth = depth
+        self.ref_density = ref_density
+        self.fanout = fanout
+        self.seed = seed
+
+    def generate(self, max_nodes=None):
+        """
+        Returns the generated data in form of dicts and lists. Raises
+        TooManyNodes when the data would have more than max_nodes nodes.
+        """
+        return _Generator(self, max_nodes).generate()
+
+    def to_con(self, max_nodes=None):
+        """Returns the generated configuration in .con format."""
+        return json.dumps(self.generate(max_nodes), indent=1)
+
+    def count_nodes(self, max_nodes=None):
+        """Returns the number of nodes (references are counted as one)."""
+        generator = _Generator(self, max_nodes)
+        generator.generate()
+        return generator.nodes
+
+
+def scaled(its, nodes, **knobs):
+    """
+    Returns SyntheticConfig whose configuration has at least nodes nodes.
+    The array length is increased until the size is reached; other knobs
+    are kept.
+    """
+    config = SyntheticConfig(its, **knobs)
+    low, high = 1, 1
+    while config_size(config, high, nodes) < nodes:
+        low, high = high, high * 2
+        if high > 2 ** 24:
+            raise ValueError("Can not generate {nodes} nodes".format(nodes=nodes))
+    while low < high:
+        middle = (low + high) // 2
+        if config_size(config, middle, nodes) < nodes:
+            low = middle + 1
+        else:
+            high = middle
+    config.array_length = high
+    return config
+
+
+def config_size(config, array_length, limit):
+    """
+    Returns the number of nodes of config with given array length, or
+    limit if it would exceed it.
+    """
+    config.array_length = array_length
+    try:
+        return config.count_nodes(limit)
+    except TooManyNodes:
+        return limit
+
+
+class TooManyNodes(Exception):
+    pass
+
+
+class _Generator:
+    """Single run of the generation."""
+
+    def __init__(self, config, max_nodes):
+        self.config = config
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.random = random.Random(config.seed)
+        self.turns = {}  # id of abstract ITS -> number of its instances
+        self.generated = {}  # id of ITS -> paths of generated nodes
+
+    def generate(self):
+        return self._generate(self.config.its, '', 0)
+
+    def _generate(self, its, path, depth):
+        self.nodes = self.nodes + 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise TooManyNodes()
+        input_type = its.input_type
+        if input_type in ('Record', 'AbstractRecord', 'Array') and depth > 0:
+            reference = self._reference(its, path)
+            if reference is not None:
+                return {'REF': reference}
+        if input_type == 'AbstractRecord':
+            return self._generate_abstract(its, path, depth)
+        elif input_type == 'Record':
+            return self._generate_record(its, path, depth)
+        elif input_type == 'Array':
+            length = min(max(self.config.array_length, its.min), its.max)
+            return [self._generate(its.subtype, path + '/' + str(i), depth + 1)
+                    for i in range(int(length))]
+        elif input_type == 'Integer':
+            return int(min(max(1, its.min), its.max))
+        elif input_type == 'Double':
+            return float(min(max(0.5, its.min), its.max))
+        elif input_type == 'Bool':
+            return True
+        elif input_type == 'Selection':
+            return next(iter(its.values))
+        elif input_type == 'FileName':
+            return 'input/file.msh'
+        return 'text'
+
+    def _generate_abstract(self, its, path, depth):
+        self.generated.setdefault(id(its), []).append(path)
+        implementations = sorted(its.implementations)
+        turn = self.turns.get(id(its), 0)
+        self.turns[id(its)] = turn + 1
+        fanout = max(1, min(self.config.fanout, len(implementations)))
+        type_name = implementations[turn % fanout]
+        return self._generate_record(its.implementations[type_name], path,
+                                     depth)
+
+    def _generate_record(self, its, path, depth):
+        self.generated.setdefault(id(its), []).append(path)
+        record = {}
+        for key, spec in its.keys.items():
+            if key == 'TYPE':
+                self.nodes = self.nodes + 1
+                record[key] = its.type_name
+                continue
+            obligatory = spec.get('default', {}).get('type') == 'obligatory'
+            if obligatory or depth < self.config.depth:
+                record[key] = self._generate(spec['type'], path + '/' + key,
+                                             depth + 1)
+        return record
+
+    def _reference(self, its, path):
+        """Returns a path to refer to instead of generating its, or None."""
+        if self.config.ref_density <= 0.0:
+            return None
+        targets = [target for target in self.generated.get(id(its), ())
+                   if not (path + '/').startswith(target + '/')]  # not an ancestor
+        if targets and self.random.random() < self.config.ref_density:
+            return self.random.choice(targets)
+        if its.input_type == 'Array':
+            self.generated.setdefault(id(its), []).append(path)
+        return None
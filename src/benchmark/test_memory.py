@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Memory regression test of the DataNode tree structure.
+
+@author: Tomas Krizek
+"""
+
+import unittest
+
+from . import memory
+from data.model import DataNode
+
+
+class TestNodeFootprint(unittest.TestCase):
+
+    def test_footprint(self):
+        data = memory.generate_data(1000)
+        legacy = memory.node_footprint(memory.LegacyDataNode, data)
+        current = memory.node_footprint(DataNode, data)
+        self.assertLess(current, 0.8 * legacy)
+
+    def test_slots(self):
+        node = DataNode({'a': [1, 2]})
+        with self.assertRaises(AttributeError):
+            node.__dict__
+        self.assertEqual(node.get('/a/1').name, '1')
+        self.assertEqual(node.get('/a/1').path, '/a/1')
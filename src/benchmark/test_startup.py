@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Startup regression test of the CLI and the data package.
+
+@author: Tomas Krizek
+"""
+
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from . import startup
+
+# modules which no command needs for validation of a single file
+HEAVY_MODULES = ['concurrent.futures', 'multiprocessing', 'socketserver',
+                 'asyncio', 'ctypes', 'tracemalloc', 'tempfile']
+
+
+class TestStartup(unittest.TestCase):
+
+    def _loaded_modules(self, code):
+        process = subprocess.run(
+            [sys.executable, '-c', code + '\nimport sys\nprint(*sys.modules)'],
+            cwd=startup.SRC_DIR, stdout=subprocess.PIPE,
+            universal_newlines=True, check=True)
+        return set(process.stdout.split())
+
+    def test_deferred_imports(self):
+        modules = self._loaded_modules('import data')
+        self.assertNotIn('data.parser', modules)
+        self.assertNotIn('data.validation', modules)
+
+        modules = self._loaded_modules('from data import parse_con, Validator')
+        self.assertIn('data.parser', modules)
+        self.assertIn('data.validation.validator', modules)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_scenarios(self):
+        # import times are checked by running benchmark.startup, since they
+        # depend on the machine
+        with tempfile.TemporaryDirectory() as cache_home:
+            for name, args in startup.SCENARIOS:
+                with self.subTest(name):
+                    startup.import_times(args, cache_home)  # fills the caches
+                    imports = startup.import_times(args, cache_home)
+                    names = {module for module, self_time, cumulative, depth
+                             in imports}
+                    self.assertIn('data', names)
+                    for module in HEAVY_MODULES:
+                        self.assertNotIn(module, names)
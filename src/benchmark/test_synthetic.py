@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the synthetic configurations and the benchmark suite.
+
+@author: Tomas Krizek
+"""
+
+import unittest
+
+from . import suite
+from .synthetic import SyntheticConfig, scaled
+from data import parse_format, parse_con_string, Validator
+
+
+class TestSyntheticConfig(unittest.TestCase):
+
+    its = parse_format(suite.FORMAT_FILE)
+
+    def assertValid(self, config):
+        node = parse_con_string(config.to_con())
+        validator = Validator()
+        validator.autoconvert_and_validate(node, self.its)
+        self.assertEqual(validator.console_log, 'VALID')
+
+    def test_valid(self):
+        for knobs in [{}, {'depth': 2, 'array_length': 3},
+                      {'ref_density': 0.3}, {'fanout': 5},
+                      {'depth': 20, 'ref_density': 0.1, 'fanout': 10}]:
+            with self.subTest(**knobs):
+                self.assertValid(SyntheticConfig(self.its, **knobs))
+
+    def test_deterministic(self):
+        first = SyntheticConfig(self.its, ref_density=0.3, seed=1).to_con()
+        second = SyntheticConfig(self.its, ref_density=0.3, seed=1).to_con()
+        self.assertEqual(first, second)
+        self.assertIn('REF', first)
+
+    def test_scaled(self):
+        config = scaled(self.its, 5000, depth=4)
+        nodes = config.count_nodes()
+        self.assertGreaterEqual(nodes, 5000)
+        self.assertLess(nodes, 7500)
+        self.assertEqual(config.depth, 4)
+        self.assertValid(config)
+
+
+class TestSuite(unittest.TestCase):
+
+    def test_compare(self):
+        times = dict.fromkeys(suite.PHASES, 0.010)
+        baseline = {'a': {'times': dict(times)}}
+        slower = dict(times, validate=0.020)
+        self.assertEqual(suite.compare({'a': {'times': times}}, baseline, 1.25), [])
+        regressions = suite.compare({'a': {'times': slower}}, baseline, 1.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('a validate'))
+        self.assertEqual(suite.compare({'b': {'times': slower}}, baseline, 1.25), [])
+
+    def test_measure(self):
+        nodes, times = suite.measure(TestSyntheticConfig.its, 500, {}, 1)
+        self.assertGreaterEqual(nodes, 500)
+        self.assertEqual(sorted(times), sorted(suite.PHASES))
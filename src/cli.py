@@ -2,40 +2,203 @@
 """
 CLI Interface
 
+Modules of the data package are imported by the commands which need them,
+so that each invocation loads only what it uses.
+
 @author: Tomas Krizek
 """
 
-from data import parse_format
-from data import parse_con
-from data import autoconvert
-from data import Validator
+from data.format import parse_format, default_cache_dir
 
 from argparse import ArgumentParser
+import sys
+import time
 
 
-def validate(input_=None, format_=None):
-    its = parse_format(format_)
-    validator = Validator()
+def validate(input_=None, format_=None, cache_dir=None, max_errors=None,
+             aggregate=False, stream=False, results=None):
+    its = parse_format(format_, cache_dir)
+    if results is not None and not stream:
+        from data.batch import validate_file
+        result = validate_file(input_, its, max_errors, aggregate,
+                               results=results)
+        print(result.console_log)
+        return
+    from data import parse_con, Validator
+    from data.autoconverter import INPLACE
+    from data.validation.sinks import AggregatingSink, StreamSink
+    if stream:
+        sink = StreamSink(sys.stdout)
+    elif aggregate:
+        sink = AggregatingSink()
+    else:
+        sink = None
+    validator = Validator(sink, max_errors)
 
     input_data = parse_con(input_)
-    data = autoconvert(input_data, its)
-    validator.validate(data, its)
+    validator.autoconvert_and_validate(input_data, its, mode=INPLACE)
+
+    print(validator.console_log)
 
+
+def profile(input_=None, format_=None, cache_dir=None, memory=False,
+            output_format='text'):
+    """
+    Validates input phase by phase and prints the validation result. The
+    profile is printed to stderr.
+    """
+    from data.profiling import profile_file
+    its = parse_format(format_, cache_dir)
+    profile_, validator = profile_file(input_, its, memory)
     print(validator.console_log)
+    if output_format == 'json':
+        print(profile_.to_json(), file=sys.stderr)
+    else:
+        print(profile_.to_text(), file=sys.stderr)
+
+
+def validate_batch(inputs, format_=None, cache_dir=None, workers=None,
+                   max_errors=None, aggregate=False, subtree_cache=False,
+                   results=None):
+    """
+    Validates all input files in parallel. Results are printed as they are
+    finished, followed by the aggregate timing.
+    """
+    from data.batch import validate_files
+    start = time.perf_counter()
+    its = parse_format(format_, cache_dir)
+    valid = 0
+    total_time = 0.0
+    for result in validate_files(inputs, its, workers, max_errors,
+                                 aggregate, subtree_cache, results):
+        print(result.filename + ': ' + result.console_log, flush=True)
+        valid = valid + (1 if result.valid else 0)
+        total_time = total_time + result.time
+    print('{files} files: {valid} VALID, {invalid} INVALID in {wall:.2f} s '
+          '(validation time {total:.2f} s)'.format(
+              files=len(inputs), valid=valid, invalid=len(inputs) - valid,
+              wall=time.perf_counter() - start, total=total_time))
+
+
+def watch_file(input_=None, format_=None, cache_dir=None, max_errors=None,
+               aggregate=False):
+    """
+    Validates input whenever it or the format changes and prints the
+    changes of the errors, until interrupted.
+    """
+    from data.watch import WatchSession, watch
+    session = WatchSession(input_, format_, cache_dir, max_errors, aggregate)
+    try:
+        watch(session)
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(address, format_=None, cache_dir=None, results_dir=None,
+          allow_files=False):
+    """
+    Runs the validation daemon at address until it is stopped. Requests are
+    sent by client.py.
+    """
+    from data.daemon import ValidationDaemon
+    daemon = ValidationDaemon(address, format_, cache_dir, results_dir,
+                              allow_files)
+    print('Serving at {address}'.format(address=daemon.address), flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == "__main__":
     import os.path
     parser = ArgumentParser(description='Validation of flow123d configuration files.')
-    parser.add_argument('input',type=str,
-                       help='configuration file to validate (con)')
+    parser.add_argument('input', type=str, nargs='*',
+                       help='configuration files to validate (con), '
+                            'directories or glob patterns')
     parser.add_argument('-f', '--format' , type=str, dest='format',
                        help='format description file (json)')
+    parser.add_argument('-j', '--jobs', type=int, dest='jobs',
+                       help='number of worker processes for multiple inputs')
+    parser.add_argument('--no-cache', action='store_true', dest='no_cache',
+                       help='do not use the cache of parsed formats '
+                            'and validation results')
+    parser.add_argument('--no-result-cache', action='store_true',
+                       dest='no_result_cache',
+                       help='do not use the cache of validation results')
+    parser.add_argument('--clear-cache', action='store_true',
+                       dest='clear_cache',
+                       help='remove cached validation results first')
+    parser.add_argument('--max-errors', type=int, dest='max_errors',
+                       help='stop validation of a file after this many errors')
+    parser.add_argument('--aggregate', action='store_true',
+                       help='report errors repeated in array items only once')
+    parser.add_argument('--stream', action='store_true',
+                       help='print errors of a single input as they occur')
+    parser.add_argument('--subtree-cache', action='store_true',
+                       dest='subtree_cache',
+                       help='validate identical subtrees of multiple inputs once')
+    parser.add_argument('--profile', action='store_true',
+                       help='print the time spent in processing phases and '
+                            'validated types of a single input to stderr')
+    parser.add_argument('--profile-memory', action='store_true',
+                       dest='profile_memory',
+                       help='profile with peak memory of phases (slower)')
+    parser.add_argument('--profile-format', choices=['text', 'json'],
+                       default='text', dest='profile_format',
+                       help='output format of the profile')
+    parser.add_argument('--serve', type=str, dest='serve', metavar='ADDRESS',
+                       help='run as a daemon serving client.py at a Unix '
+                            'socket path or a loopback [host:]port')
+    parser.add_argument('--allow-files', action='store_true',
+                       dest='allow_files',
+                       help='let daemon clients name files (inputs and '
+                            'formats) read by the daemon')
+    parser.add_argument('--watch', action='store_true',
+                       help='validate a single input whenever it or the '
+                            'format is saved and print the changes of errors')
     args = parser.parse_args()
-    if args.input is None or not os.path.isfile(args.input):
-        parser.error('Invalid input file.')
     if args.format is None:
         parser.error('No format file specified.')
     if not os.path.isfile(args.format):
         parser.error('Invalid format file.')
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('Invalid number of jobs.')
+    if args.max_errors is not None and args.max_errors < 1:
+        parser.error('Invalid maximum number of errors.')
 
-    validate(args.input, args.format)
+    cache_dir = None if args.no_cache else default_cache_dir()
+    if args.clear_cache:
+        from data.results import clear_results
+        clear_results(default_cache_dir())
+    results_dir = None if args.no_result_cache else cache_dir
+    results = None
+    if results_dir is not None:
+        from data.results import ResultCache
+        results = ResultCache(results_dir, args.format,
+                              (args.max_errors, args.aggregate))
+    if args.serve is not None:
+        serve(args.serve, args.format, cache_dir, results_dir, args.allow_files)
+    elif not args.input:
+        parser.error('No input file specified.')
+    elif args.watch:
+        if len(args.input) != 1 or not os.path.isfile(args.input[0]):
+            parser.error('Watching requires a single input file.')
+        watch_file(args.input[0], args.format, cache_dir, args.max_errors,
+                   args.aggregate)
+    elif args.profile or args.profile_memory:
+        if len(args.input) != 1 or not os.path.isfile(args.input[0]):
+            parser.error('Profiling requires a single input file.')
+        profile(args.input[0], args.format, cache_dir, args.profile_memory,
+                args.profile_format)
+    elif len(args.input) == 1 and os.path.isfile(args.input[0]):
+        validate(args.input[0], args.format, cache_dir, args.max_errors,
+                 args.aggregate, args.stream, results)
+    else:
+        from data.batch import find_inputs
+        inputs = find_inputs(args.input)
+        if not inputs:
+            parser.error('Invalid input file.')
+        validate_batch(inputs, args.format, cache_dir, args.jobs,
+                       args.max_errors, args.aggregate, args.subtree_cache,
+                       results)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Client of the validation daemon
+
+Forwards configuration files to a running daemon (started by
+python cli.py --serve ADDRESS -f FORMAT) and prints its results in the
+same way as cli.py. The client imports only the standard library, so it
+starts quickly. The client reads the inputs and sends their content;
+input - is read from stdin. Other formats than the format of the daemon
+can be used only if the daemon was started with --allow-files.
+
+Exit status is 0 when all inputs are valid, 1 when some of them are
+invalid and 2 when the daemon can not be reached or fails.
+
+Usage: python client.py -a ADDRESS [options] input...
+
+@author: Tomas Krizek
+"""
+
+from argparse import ArgumentParser
+import json
+import os
+import socket
+import sys
+
+
+def connect(address):
+    """
+    Returns a socket connected to the daemon. Addresses containing a slash
+    are paths of Unix sockets, others are [host:]port.
+    """
+    if '/' in address:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(address)
+        return connection
+    host, _, port = address.rpartition(':')
+    return socket.create_connection((host or 'localhost', int(port)))
+
+
+def request(address, requests):
+    """Sends requests (dicts) to the daemon and returns its responses."""
+    with connect(address) as connection:
+        connection.sendall(b''.join(json.dumps(request_).encode('utf-8') + b'\n'
+                                    for request_ in requests))
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('rb') as stream:
+            return [json.loads(line.decode('utf-8')) for line in stream]
+
+
+def _input_request(input_, command, options):
+    """Returns the request of a single input."""
+    request_ = dict(options, command=command)
+    if input_ == '-':
+        request_['filename'] = '<stdin>'
+        request_['content'] = sys.stdin.read()
+    else:
+        request_['filename'] = os.path.abspath(input_)
+        with open(input_) as con_file:
+            request_['content'] = con_file.read()
+    return request_
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Client of the validation daemon.')
+    parser.add_argument('input', type=str, nargs='*',
+                        help='configuration files to validate (con), '
+                             '- for stdin')
+    parser.add_argument('-a', '--address', type=str,
+                        default=os.environ.get('GEOMOP_DAEMON'),
+                        help='path of the Unix socket or [host:]port of the '
+                             'daemon (defaults to $GEOMOP_DAEMON)')
+    parser.add_argument('-f', '--format', type=str, dest='format',
+                        help='format description file (json), defaults to '
+                             'the format of the daemon')
+    parser.add_argument('--max-errors', type=int, dest='max_errors',
+                        help='stop validation of a file after this many errors')
+    parser.add_argument('--aggregate', action='store_true',
+                        help='report errors repeated in array items only once')
+    parser.add_argument('--convert', action='store_true',
+                        help='print the inputs converted to yaml instead')
+    parser.add_argument('--ping', action='store_true',
+                        help='check that the daemon is running')
+    parser.add_argument('--shutdown', action='store_true',
+                        help='stop the daemon (over a Unix socket only)')
+    args = parser.parse_args(argv)
+    if args.address is None:
+        parser.error('No daemon address specified.')
+    if not (args.input or args.ping or args.shutdown):
+        parser.error('No input file specified.')
+
+    if args.ping or args.shutdown:
+        requests = [{'command': 'ping' if args.ping else 'shutdown'}]
+    else:
+        options = {'max_errors': args.max_errors, 'aggregate': args.aggregate}
+        if args.format is not None:
+            options['format'] = os.path.abspath(args.format)
+        command = 'convert' if args.convert else 'validate'
+        try:
+            requests = [_input_request(input_, command, options)
+                        for input_ in args.input]
+        except (OSError, ValueError) as error:
+            print(error, file=sys.stderr)
+            return 2
+    try:
+        responses = request(args.address, requests)
+    except (OSError, ValueError) as error:
+        print('Can not reach the daemon at {address}: {error}'.format(
+            address=args.address, error=error), file=sys.stderr)
+        return 2
+
+    names = args.input or [''] * len(requests)
+    status = 0
+    for name, response in zip(names, responses):
+        if 'error' in response:
+            print('{name}: {error}'.format(name=name, error=response['error']),
+                  file=sys.stderr)
+            status = 2
+        elif 'yaml' in response:
+            sys.stdout.write(response['yaml'])
+        elif 'console_log' in response:
+            if len(requests) > 1:
+                print(name + ': ' + response['console_log'])
+            else:
+                print(response['console_log'])
+            if not response['valid'] and status == 0:
+                status = 1
+    if len(responses) != len(requests):
+        print('The daemon closed the connection', file=sys.stderr)
+        status = 2
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
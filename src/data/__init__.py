@@ -1,5 +1,42 @@
-from .model import DataNode, RefError
-from .parser import parse_con
-from .format import parse_format
-from .validation import Validator, ValidationError
-from .autoconverter import autoconvert
\ No newline at end of file
+"""
+GeoMop model of configuration data
+
+The public names are imported from their modules on first use, so that
+importing the package (or a single name from it) loads only the modules
+which are needed.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'DataNode': 'model',
+    'LazyDataNode': 'model',
+    'RefError': 'model',
+    'parse_con': 'parser',
+    'parse_con_string': 'parser',
+    'parse_yaml': 'parser',
+    'parse_yaml_string': 'parser',
+    'ConDecodeError': 'con_decoder',
+    'parse_format': 'format',
+    'Validator': 'validation',
+    'ValidationError': 'validation',
+    'compile_plan': 'validation',
+    'autoconvert': 'autoconverter',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError("module {module!r} has no attribute {name!r}".format(
+            module=__name__, name=name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop asyncio interface
+
+Coroutines for parsing and validating configuration files from asyncio
+code. Files are read in the default executor of the loop, so the loop is
+never blocked by disk access. Decoding and validation are CPU bound; they
+run in a process pool whose workers receive the ITS once (as in
+data.batch), or in a thread pool when processes are not wanted.
+
+    async with AsyncValidator(its) as validator:
+        async for result in validator.validate_files(filenames):
+            ...
+
+@author: Tomas Krizek
+"""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import batch
+from .batch import FileResult, validate_content
+from .parser import parse_con_string
+from .validation.cache import ValidationCache
+
+
+async def read_file(filename):
+    """Returns the content of filename (bytes) without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _read_file, filename)
+
+
+async def parse_con_async(filename, lazy=False, its=None):
+    """
+    Parses a configuration file like parse_con. The file is read and
+    decoded outside of the loop thread.
+    """
+    content = await read_file(filename)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, parse_con_string, batch._text(content), lazy, its)
+
+
+class AsyncValidator:
+    """
+    Validates configuration files against a single format in an executor.
+
+    At most concurrency files are read or validated at once, so arbitrarily
+    many files can be passed to validate_files.
+    """
+
+    def __init__(self, its, workers=None, max_errors=None, aggregate=False,
+                 subtree_cache=False, results=None, processes=True,
+                 concurrency=None):
+        """
+        workers is the number of worker processes (or threads if processes
+        is not set), defaulting to the number of CPUs. concurrency defaults
+        to twice the number of workers, so files are read while others are
+        validated. Other options are the same as in batch.validate_files.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.concurrency = concurrency or 2 * workers
+        options = (max_errors, aggregate, subtree_cache, results)
+        if processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=batch._init_worker,
+                initargs=(its, options))
+            self._validate = batch._validate_worker_content
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._validate = functools.partial(
+                validate_content, its=its, max_errors=max_errors,
+                aggregate=aggregate,
+                cache=ValidationCache() if subtree_cache else None,
+                results=results)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts the executor down; pending validations are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def validate_content(self, content):
+        """Validates the content of a file (bytes); returns FileResult."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._validate,
+                                          content)
+
+    async def validate_file(self, filename):
+        """Validates a single file; returns its FileResult."""
+        start = time.perf_counter()
+        try:
+            content = await read_file(filename)
+        except OSError as error:
+            return FileResult(filename, False, failure=str(error),
+                              time=time.perf_counter() - start)
+        result = await self.validate_content(content)
+        result.filename = filename
+        result.time = time.perf_counter() - start
+        return result
+
+    async def validate_files(self, filenames):
+        """
+        Validates files; yields a FileResult for every file in the order of
+        completion. filenames can be any iterable or asynchronous iterable;
+        it is consumed as the validation progresses.
+        """
+        pending = set()
+        filenames = _aiter(filenames)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.concurrency:
+                    try:
+                        filename = await filenames.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                    else:
+                        pending.add(asyncio.ensure_future(
+                            self.validate_file(filename)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def validate_files_async(filenames, its, workers=None, **options):
+    """
+    Validates files against its and yields a FileResult for every file in
+    the order of completion. Options are those of AsyncValidator.
+    """
+    async with AsyncValidator(its, workers, **options) as validator:
+        async for result in validator.validate_files(filenames):
+            yield result
+
+
+def _read_file(filename):
+    with open(filename, 'rb') as con_file:
+        return con_file.read()
+
+
+async def _aiter(iterable):
+    """Returns an asynchronous iterator over a (possibly async) iterable."""
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
@@ -9,10 +9,15 @@ Ensures auto-conversion of data for specified format.
 
 from copy import deepcopy
 
-from .model import DataNode
+from .model import DataNode, NumericArrayNode
 
 
-def autoconvert(node, its=None):
+COPY = 'copy'
+INPLACE = 'inplace'
+COPY_ON_WRITE = 'cow'
+
+
+def autoconvert(node, its=None, mode=COPY):
     """
     Performs recursive auto-correction on root node.
 
@@ -23,11 +28,26 @@ def autoconvert(node, its=None):
            reducible_to_key. If present, create the Record.
         3. If AbstractRecord is expected and scalar/array is found, check if
            default_descendant fits rule 2.
+
+    Modes:
+        COPY - the whole tree is copied first and the copy is converted.
+        INPLACE - the tree is converted in place and returned.
+        COPY_ON_WRITE - only nodes on the paths to converted nodes are
+            copied, the rest of the tree (including referenced subtrees) is
+            shared with the original tree, which is left unchanged. Shared
+            nodes keep their parent in the original tree.
     """
     if its is None:
         its = node.its
 
-    root = deepcopy(node)  # references are kept, but duplicated
+    if mode == COPY_ON_WRITE:
+        return _autoconvert_cow(node, its, {})
+    elif mode == INPLACE:
+        root = node
+    elif mode == COPY:
+        root = deepcopy(node)  # references are kept, but duplicated
+    else:
+        raise ValueError("Unknown autoconvert mode {mode}".format(mode=mode))
 
     # TODO is try-except block needed?
     _autoconvert_crawl(root, its)
@@ -50,6 +70,8 @@ def _autoconvert_crawl(node, its):
                 return
         _autoconvert_crawl(node, its_concrete)
     elif its.input_type == 'Array':
+        if not _is_convertible(its.subtype):
+            return  # items of scalar types are never converted
         for i, item in enumerate(node.value):
             node.value[i] = _get_autoconverted(item, its.subtype)
             _autoconvert_crawl(node.value[i], its.subtype)
@@ -65,20 +87,150 @@ def _autoconvert_crawl(node, its):
     return
 
 
+def _autoconvert_cow(node, its, copies):
+    """
+    Recursively auto-converts node without modifying it. Returns node if
+    nothing was converted, otherwise a converted copy of node which shares
+    the unchanged children.
+
+    The converted copies are stored in copies by their original node, so
+    that a reference points to the same converted copy which replaces its
+    target in the tree.
+    """
+    if node in copies:
+        return copies[node]
+    if node.ref is not None:
+        target = _autoconvert_cow(node.ref, its, copies)
+        if target is node.ref:
+            return node
+        copy = _detached_node(node.parent, node._name)
+        copy.its = node.its
+        copy.ref = target
+        copies[node] = copy
+        return copy
+    if its.input_type == 'AbstractRecord':
+        try:
+            its_concrete = its.implementations[node.value['TYPE'].value]
+        except:
+            try:
+                its_concrete = its.default_descendant
+            except:
+                return node
+        return _autoconvert_cow(node, its_concrete, copies)
+    elif its.input_type == 'Array':
+        if not _is_convertible(its.subtype):
+            return node  # items of scalar types are never converted
+        items = node.value
+        if not isinstance(items, list):
+            return node
+        converted = [_autoconvert_cow(_get_autoconverted_copy(item, its.subtype),
+                                      its.subtype, copies) for item in items]
+        changed = [i for i, item in enumerate(items) if converted[i] is not item]
+    elif its.input_type == 'Record':
+        items = node.value
+        if not isinstance(items, dict):
+            return node
+        converted = dict(items)
+        for key, value in items.items():
+            try:
+                child_its = its.keys[key]['type']
+            except:
+                continue
+            else:
+                converted[key] = _autoconvert_cow(
+                    _get_autoconverted_copy(value, child_its), child_its,
+                    copies)
+        changed = [key for key in items if converted[key] is not items[key]]
+    else:
+        return node
+    if not changed:
+        return node
+    copy = _detached_node(node.parent, node._name)
+    copy.value = converted
+    copy.its = node.its
+    for key in changed:
+        converted[key].parent = copy
+    copies[node] = copy
+    return copy
+
+
+def _get_autoconverted_copy(node, its):
+    """
+    Auto-conversion of array and record types which leaves node unchanged.
+    The children of an expanded node change their position, so they are
+    copied before the expansion.
+    """
+    value = node.value
+    if its.input_type == 'Array' and not isinstance(value, list) or \
+            its.input_type.endswith('Record') and not isinstance(value, dict):
+        node = _copy_subtree(node, None, node._name, dereference=True)
+        return _get_autoconverted(node, its)
+    return node
+
+
+def _copy_subtree(node, parent, name, dereference=False):
+    """
+    Returns a copy of node and its descendants placed at parent. References
+    of the descendants are kept and point to the original nodes.
+    """
+    copy = _detached_node(parent, name)
+    copy.its = node.its
+    if node.ref is not None and not dereference:
+        copy.ref = node.ref
+        return copy
+    value = node.value
+    if isinstance(value, dict):
+        copy.value = {key: _copy_subtree(child, copy, key)
+                      for key, child in value.items()}
+    elif isinstance(value, list):
+        copy.value = [_copy_subtree(child, copy, i)
+                      for i, child in enumerate(value)]
+    else:
+        copy.value = value
+    return copy
+
+
+def _detached_node(parent, name):
+    """
+    Returns an empty node placed at parent which does not share the tree
+    state of parent, so that copies are not registered in the path index
+    or the tracked changes of the original tree.
+    """
+    node = DataNode(None, None, name)
+    node._parent = parent
+    return node
+
+
 def _get_autoconverted(node, its):
     """
     Auto-conversion of array and record types.
 
     Arrays are expanded to the expected dimension.
     Records are initialized from the reducible_to_key value.
+
+    Typed buffers are arrays already; they are not turned into item nodes.
     """
+    if its.input_type == 'Array':
+        target = node
+        while target.ref is not None:
+            target = target.ref
+        if isinstance(target, NumericArrayNode) and target.buffer is not None:
+            return node
     if its.input_type == 'Array' and not isinstance(node.value, list):
         dim = _get_expected_array_dimension(its)
-        return _expand_value_to_array(node, dim)
+        converted = _expand_value_to_array(node, dim)
     elif its.input_type.endswith('Record') and not isinstance(node.value, dict):
-        return _expand_reducible_to_key(node, its)
+        converted = _expand_reducible_to_key(node, its)
     else:
         return node
+    if node.its is not None:
+        converted.annotate(its)  # keep the annotations of annotated trees
+    return converted
+
+
+def _is_convertible(its):
+    """Returns True if nodes expected to be of type its can be converted."""
+    return its.input_type == 'Array' or its.input_type.endswith('Record')
 
 
 def _get_expected_array_dimension(its):
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop batch validation
+
+Validates many configuration files against a single format. The format
+is parsed once and handed to a pool of worker processes; results are
+yielded as soon as the workers finish them.
+
+@author: Tomas Krizek
+"""
+
+import glob
+import io
+import os
+import time
+
+from .validation.sinks import render_log
+
+
+def find_inputs(patterns, extension='.con'):
+    """
+    Returns a sorted list of input files. Patterns can be file names,
+    directories (all files with extension inside are used) or globs.
+    """
+    filenames = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*' + extension)
+        matches = glob.glob(pattern)
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        filenames.update(match for match in matches if os.path.isfile(match))
+    return sorted(filenames)
+
+
+def validate_files(filenames, its, workers=None, max_errors=None,
+                   aggregate=False, subtree_cache=False, results=None):
+    """
+    Validates files against its. Yields a FileResult for every file in the
+    order of completion.
+
+    workers is the number of worker processes (defaults to the number of
+    CPUs). With a single worker, files are validated in this process.
+    Validation of a file is terminated after max_errors errors; with
+    aggregate, errors repeated across array items are reported once. With
+    subtree_cache, each worker validates identical subtrees of its files
+    only once. results is a ResultCache of whole file results.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    options = (max_errors, aggregate, subtree_cache, results)
+    if workers == 1:
+        _init_worker(its, options)
+        for filename in filenames:
+            yield _validate_file(filename)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(its, options)) as executor:
+        futures = {executor.submit(_validate_file, filename): filename
+                   for filename in filenames}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as error:  # the worker failed (e.g. it was killed)
+                yield FileResult(futures[future], False,
+                                 failure=_failure_message(error))
+
+
+class FileResult:
+    """
+    Result of a validation of a single file.
+
+    Errors are kept as (path, message) pairs, so the result can be passed
+    between processes. Files which could not be parsed or validated have no
+    errors but a failure message.
+    """
+
+    def __init__(self, filename, valid, errors=(), failure=None, time=0.0,
+                 stopped_after=None):
+        self.filename = filename
+        self.valid = valid
+        self.errors = errors
+        self.failure = failure
+        self.time = time
+        self.stopped_after = stopped_after
+        self.cached = False  # served from a ResultCache
+
+    @property
+    def console_log(self):
+        if self.failure is not None:
+            return ('VALID' if self.valid else 'INVALID') + '\n' + self.failure
+        return render_log(self.valid, self.errors, self.stopped_after)
+
+
+def validate_file(filename, its, max_errors=None, aggregate=False,
+                  cache=None, results=None):
+    """
+    Validates a single file against its and returns its FileResult.
+
+    cache is a ValidationCache of subtree results. results is a ResultCache
+    of whole file results; a cached result is returned without parsing
+    the file.
+    """
+    start = time.perf_counter()
+    try:
+        with open(filename, 'rb') as con_file:
+            content = con_file.read()
+    except OSError as error:
+        return FileResult(filename, False, failure=str(error),
+                          time=time.perf_counter() - start)
+    result = validate_content(content, its, max_errors, aggregate, cache,
+                              results)
+    result.filename = filename
+    result.time = time.perf_counter() - start
+    return result
+
+
+def validate_content(content, its, max_errors=None, aggregate=False,
+                     cache=None, results=None):
+    """
+    Validates the content of a file (bytes) against its and returns its
+    FileResult (without a filename). Options are the same as in
+    validate_file.
+    """
+    start = time.perf_counter()
+    result = None if results is None else results.get(content)
+    if result is not None:
+        result.cached = True
+    else:
+        result = _validate_content(content, its, max_errors, aggregate, cache)
+        if results is not None:
+            results.put(content, result)
+    result.time = time.perf_counter() - start
+    return result
+
+
+def _validate_content(content, its, max_errors, aggregate, cache):
+    """Validates the content of a file (bytes) against its."""
+    # not needed for results served from the cache
+    from .parser import parse_con_string
+    from .validation.validator import Validator
+    from .validation.sinks import AggregatingSink
+    from .autoconverter import INPLACE
+    try:
+        data = parse_con_string(_text(content))
+    except Exception as error:
+        return FileResult(None, False, failure=str(error))
+    validator = Validator(AggregatingSink() if aggregate else None, max_errors,
+                          cache)
+    try:
+        validator.autoconvert_and_validate(data, its, mode=INPLACE)
+    except Exception as error:
+        return FileResult(None, False, failure=_failure_message(error))
+    errors = tuple((path, str(error)) for path, error in validator.errors)
+    return FileResult(None, validator.valid, errors,
+                      stopped_after=(validator.error_count
+                                     if validator.stopped else None))
+
+
+def _text(content):
+    """Decodes content in the same way as a file opened in text mode."""
+    return io.TextIOWrapper(io.BytesIO(content)).read()
+
+
+def _failure_message(error):
+    """Returns the failure message of an unexpected exception."""
+    return 'Validation failed: {name}: {error}'.format(
+        name=type(error).__name__, error=error)
+
+
+_its = None  # ITS of the worker process
+_options = (None, False, False, None)  # validate_files options of the worker process
+_cache = None  # subtree cache of the worker process
+
+
+def _init_worker(its, options=(None, False, False, None)):
+    global _its, _options, _cache
+    from .validation.cache import ValidationCache
+    _its = its
+    _options = options
+    _cache = ValidationCache() if options[2] else None
+
+
+def _validate_file(filename):
+    """Validates a single file against the ITS of the worker."""
+    max_errors, aggregate, subtree_cache, results = _options
+    return validate_file(filename, _its, max_errors, aggregate, _cache, results)
+
+
+def _validate_worker_content(content):
+    """Validates the content of a file against the ITS of the worker."""
+    max_errors, aggregate, subtree_cache, results = _options
+    return validate_content(content, _its, max_errors, aggregate, _cache,
+                            results)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+GeomMop .con format decoder
+
+Single-pass decoder of the .con format (as specified by Flow123d manual
+v1.8.2). The format is a relaxed JSON: keys may be unquoted and separated
+from values by either '=' or ':', comments (// and /* */) are allowed and
+trailing commas are tolerated.
+
+The input text is tokenized incrementally and the resulting structure of
+dicts, lists and scalar values is built while reading the tokens.
+
+@author: Tomas Krizek
+"""
+
+import re
+from json.decoder import scanstring
+
+
+_TOKEN = re.compile(r"""
+    (?:\s|//[^\n]*|/\*.*?\*/)*             # whitespace and comments
+    (?:
+        (?P<punct>[{}\[\],=:])
+        |(?P<quote>["'])
+        |(?P<number>[-+]?(?:\d+(?P<frac>\.\d*)?|(?P<dot>\.)\d+)(?P<exp>[eE][-+]?\d+)?)
+        |(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+        |(?P<eof>\Z)
+    )
+    """, re.VERBOSE | re.DOTALL)
+
+_SKIP = re.compile(r'(?:\s|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+
+_SINGLE_QUOTED = re.compile(r"((?:[^'\\]|\\.)*)'", re.DOTALL)
+
+_ESCAPE = re.compile(r'\\(u[0-9a-fA-F]{4}|.)', re.DOTALL)
+
+_ESCAPES = {
+    '"': '"', "'": "'", '\\': '\\', '/': '/',
+    'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'
+}
+
+_CONSTANTS = {
+    'true': True,
+    'false': False,
+    'null': None,
+    'NaN': float('nan'),
+    'Infinity': float('inf')
+}
+
+
+def decode_con(con):
+    """Reads .con format and returns read data in form of dicts and lists."""
+    return _ConDecoder(con).decode()
+
+
+class _ConDecoder:
+    """
+    Recursive descent parser of the .con format. Tokens are read lazily
+    from the input text, so the text is scanned only once.
+    """
+
+    def __init__(self, con):
+        self._con = con
+        self._tokens = self._tokenize()
+
+    def decode(self):
+        """Returns the decoded value of the whole input."""
+        value = self._parse_value(next(self._tokens))
+        kind, token, pos = next(self._tokens)
+        if kind != 'eof':
+            raise self._error("Extra data", pos)
+        return value
+
+    def _tokenize(self):
+        """
+        Generates tokens in form of (kind, value, position). Kind is one of
+        'punct', 'string', 'number', 'name' or 'eof'.
+        """
+        con = self._con
+        match = _TOKEN.match
+        pos = 0
+        while True:
+            m = match(con, pos)
+            if m is None:
+                pos = _SKIP.match(con, pos).end()
+                raise self._error("Unexpected character {char!r}".format(
+                    char=con[pos]), pos)
+            kind = m.lastgroup
+            start = m.start(kind)
+            pos = m.end()
+            if kind == 'quote':
+                value, pos = self._read_string(m.group(kind), pos, start)
+                yield 'string', value, start
+            elif kind == 'number':
+                number = m.group(kind)
+                if m.group('frac') is None and m.group('dot') is None \
+                        and m.group('exp') is None:
+                    yield kind, int(number), start
+                else:
+                    yield kind, float(number), start
+            elif kind == 'eof':
+                yield kind, None, start
+                return
+            else:
+                yield kind, m.group(kind), start
+
+    def _read_string(self, quote, pos, start):
+        """Reads a string body starting after its opening quote."""
+        con = self._con
+        if quote == '"':
+            try:
+                return scanstring(con, pos, False)
+            except ValueError:
+                raise self._error("Unterminated string", start)
+        m = _SINGLE_QUOTED.match(con, pos)
+        if m is None:
+            raise self._error("Unterminated string", start)
+        value = m.group(1)
+        if '\\' in value:
+            value = _ESCAPE.sub(_unescape, value)
+        return value, m.end()
+
+    def _parse_value(self, token):
+        """Parses a value beginning with the given token."""
+        kind, value, pos = token
+        if kind == 'punct':
+            if value == '{':
+                return self._parse_record()
+            elif value == '[':
+                return self._parse_array()
+        elif kind == 'string' or kind == 'number':
+            return value
+        elif kind == 'name':
+            try:
+                return _CONSTANTS[value]
+            except KeyError:
+                pass
+        raise self._error(_unexpected(kind, value), pos)
+
+    def _parse_record(self):
+        """Parses the members of a record after its opening brace."""
+        record = {}
+        tokens = self._tokens
+        kind, value, pos = next(tokens)
+        while not (kind == 'punct' and value == '}'):
+            if kind != 'name' and kind != 'string':
+                raise self._error(_unexpected(kind, value), pos)
+            key = value
+            kind, value, pos = next(tokens)
+            if kind != 'punct' or value not in ('=', ':'):
+                raise self._error("Expecting '=' after key {key}".format(
+                    key=key), pos)
+            record[key] = self._parse_value(next(tokens))
+            kind, value, pos = next(tokens)
+            if kind == 'punct' and value == ',':
+                kind, value, pos = next(tokens)
+            elif not (kind == 'punct' and value == '}'):
+                raise self._error("Expecting ',' or '}'", pos)
+        return record
+
+    def _parse_array(self):
+        """Parses the items of an array after its opening bracket."""
+        array = []
+        tokens = self._tokens
+        token = next(tokens)
+        while not (token[0] == 'punct' and token[1] == ']'):
+            array.append(self._parse_value(token))
+            kind, value, pos = next(tokens)
+            if kind == 'punct' and value == ',':
+                token = next(tokens)
+            elif kind == 'punct' and value == ']':
+                break
+            else:
+                raise self._error("Expecting ',' or ']'", pos)
+        return array
+
+    def _error(self, message, pos):
+        """Returns ConDecodeError located at given position."""
+        line = self._con.count('\n', 0, pos) + 1
+        column = pos - self._con.rfind('\n', 0, pos)
+        return ConDecodeError(message, line, column)
+
+
+def _unescape(match):
+    """Replaces a single escape sequence."""
+    char = match.group(1)
+    if len(char) == 5:  # \uXXXX
+        return chr(int(char[1:], 16))
+    return _ESCAPES.get(char, char)
+
+
+def _unexpected(kind, value):
+    """Returns message for an unexpected token."""
+    if kind == 'eof':
+        return "Unexpected end of input"
+    return "Unexpected {value!r}".format(value=value)
+
+
+class ConDecodeError(Exception):
+    """Exception represents syntax error in configuration file."""
+    def __init__(self, message, line, column):
+        self.line = line
+        self.column = column
+        message = "{message} at line {line}, column {column}".format(
+            message=message, line=line, column=column)
+        super(ConDecodeError, self).__init__(message)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop validation daemon
+
+A long running process which keeps parsed formats and their compiled
+validation plans in memory and serves requests over a Unix socket or
+a localhost TCP port. Requests and responses are JSON objects, one per
+line:
+
+    {"command": "validate", "filename": ..., "content": ..., "format": ...,
+     "max_errors": ..., "aggregate": ...}
+        -> {"valid": ..., "errors": [[path, message], ...], "failure": ...,
+            "stopped_after": ..., "console_log": ..., "cached": ...,
+            "time": ...}
+    {"command": "convert", "filename": ..., "content": ...}
+        -> {"yaml": ...}
+    {"command": "ping"} -> {"pong": true}
+    {"command": "shutdown"} -> {"shutdown": true}
+
+The daemon does not authenticate its clients. It listens only on a Unix
+socket accessible by its owner or on a loopback address, and by default
+it validates only the content sent by the client with the format it was
+started with. Reading of the files named by filename and format is allowed
+by allow_files (only for trusted local users, the files are read with the
+permissions of the daemon). The shutdown command is accepted only over
+a Unix socket. A format is parsed again when its file changes. Failed
+requests are answered by {"error": message}.
+
+Every connection is served by its own thread and can send any number of
+requests, which are answered in order.
+
+@author: Tomas Krizek
+"""
+
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+from .batch import validate_content, _text
+from .format import parse_format
+from .parser import _decode_con
+from .results import ResultCache
+from .validation import compile_plan
+
+
+def parse_address(address):
+    """
+    Returns (family, address) of a daemon address. Addresses containing
+    a slash are paths of Unix sockets, others are [host:]port with host
+    defaulting to localhost. Only loopback hosts are accepted.
+    """
+    if '/' in address:
+        return 'unix', address
+    host, _, port = address.rpartition(':')
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError("Invalid daemon address {address}".format(address=address))
+    host = host or 'localhost'
+    if not _is_loopback(host):
+        raise ValueError("The daemon listens on loopback addresses only, "
+                         "not {host}".format(host=host))
+    return 'tcp', (host, port)
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # host names other than localhost are not resolved
+
+
+class ValidationDaemon:
+    """Serves validate and convert requests with warm formats."""
+
+    def __init__(self, address, format_filename=None, format_cache_dir=None,
+                 results_dir=None, allow_files=False):
+        """
+        address is a path of a Unix socket or [host:]port. format_filename
+        is the default format, which is parsed right away. Parsed formats
+        are cached in format_cache_dir and validation results in results_dir
+        (each unless it is None). Unless allow_files is set, requests have
+        to contain the content and can not name other formats.
+        """
+        self.format_filename = format_filename
+        self.format_cache_dir = format_cache_dir
+        self.results_dir = results_dir
+        self.allow_files = allow_files
+        self._formats = {}  # absolute format filename -> _Format
+        self._lock = threading.Lock()
+        if format_filename is not None:
+            self.get_format()  # warm up before accepting requests
+        family, self.address = parse_address(address)
+        if family == 'unix':
+            if _UnixServer is None:
+                raise ValueError("Unix sockets are not supported, use a port")
+            _remove_stale_socket(self.address)
+            server_class = _UnixServer
+        else:
+            server_class = _TCPServer
+        self._server = server_class(self.address, _RequestHandler,
+                                    bind_and_activate=False)
+        try:
+            self._server.server_bind()
+            if family == 'unix':
+                os.chmod(self.address, 0o600)  # before connections are accepted
+            self._server.server_activate()
+        except OSError:
+            self._server.server_close()
+            raise
+        self._server.validation_daemon = self
+        if family == 'tcp':
+            self.address = self._server.server_address
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Serves requests until shutdown() or a shutdown request, which is
+        noticed within poll_interval seconds.
+        """
+        try:
+            self._server.serve_forever(poll_interval)
+        finally:
+            self._server.server_close()
+            if isinstance(self.address, str) and _is_socket(self.address):
+                os.unlink(self.address)
+
+    def shutdown(self):
+        """Stops serve_forever() (called from another thread)."""
+        self._server.shutdown()
+
+    def handle(self, request, owner=True):
+        """
+        Returns the response to a request (dict). owner tells whether the
+        client is known to be the owner of the daemon (connected by the Unix
+        socket).
+        """
+        try:
+            command = request.get('command', 'validate')
+            if command == 'validate':
+                return self._validate(request)
+            elif command == 'convert':
+                return self._convert(request)
+            elif command == 'ping':
+                return {'pong': True}
+            elif command == 'shutdown':
+                if not owner:
+                    raise ValueError("Shutdown is accepted only over a Unix socket")
+                threading.Thread(target=self.shutdown).start()
+                return {'shutdown': True}
+            raise ValueError("Unknown command {command}".format(command=command))
+        except Exception as error:
+            return {'error': str(error)}
+
+    def _validate(self, request):
+        format_filename = request.get('format')
+        if format_filename is not None and not self.allow_files:
+            if self.format_filename is None or os.path.abspath(format_filename) \
+                    != os.path.abspath(self.format_filename):
+                raise ValueError("Formats other than the format of the daemon "
+                                 "are not allowed")
+        format_ = self.get_format(format_filename)
+        max_errors = request.get('max_errors')
+        aggregate = bool(request.get('aggregate', False))
+        results = format_.results((max_errors, aggregate), self.results_dir)
+        result = validate_content(self._content(request), format_.plan,
+                                  max_errors, aggregate, results=results)
+        return {
+            'filename': request.get('filename'),
+            'valid': result.valid,
+            'errors': [list(error) for error in result.errors],
+            'failure': result.failure,
+            'stopped_after': result.stopped_after,
+            'console_log': result.console_log,
+            'cached': result.cached,
+            'time': result.time}
+
+    def _convert(self, request):
+        import yaml
+        data = _decode_con(_text(self._content(request)))
+        return {'yaml': yaml.dump(data)}
+
+    def get_format(self, filename=None):
+        """Returns the _Format of filename, parsed again if it changed."""
+        if filename is None:
+            filename = self.format_filename
+            if filename is None:
+                raise ValueError("No format file specified")
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            format_ = self._formats.get(filename)
+            if format_ is None or format_.version != version:
+                format_ = _Format(filename, version, self.format_cache_dir)
+                self._formats[filename] = format_
+        return format_
+
+    def _content(self, request):
+        """Returns the content of the requested file (bytes)."""
+        content = request.get('content')
+        if content is not None:
+            return content.encode('utf-8')
+        filename = request.get('filename')
+        if filename is None:
+            raise ValueError("No input file specified")
+        if not self.allow_files:
+            raise ValueError("Reading of files is not allowed, send the content")
+        with open(filename, 'rb') as con_file:
+            return con_file.read()
+
+
+class _Format:
+    """Parsed format with its compiled plan and result caches."""
+
+    def __init__(self, filename, version, cache_dir):
+        self.filename = filename
+        self.version = version
+        self.plan = compile_plan(parse_format(filename, cache_dir))
+        self._results = {}  # options -> ResultCache
+        self._lock = threading.Lock()
+
+    def results(self, options, results_dir):
+        """Returns the ResultCache for options (None without results_dir)."""
+        if results_dir is None:
+            return None
+        with self._lock:
+            try:
+                return self._results[options]
+            except KeyError:
+                results = ResultCache(results_dir, self.filename, options)
+                self._results[options] = results
+                return results
+
+
+def _is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except OSError:
+        return False
+
+
+def _remove_stale_socket(path):
+    """
+    Removes the socket at path left by a daemon which was killed. Raises
+    an error if path is not a socket or a daemon is still listening at it.
+    """
+    if not os.path.lexists(path):
+        return
+    if not _is_socket(path):
+        raise ValueError("{path} exists and is not a socket".format(path=path))
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise ValueError("A daemon is already running at {path}".format(path=path))
+    finally:
+        connection.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers the requests of a single connection."""
+
+    def handle(self):
+        daemon = self.server.validation_daemon
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except ValueError as error:
+                response = {'error': 'Invalid request: {0}'.format(error)}
+            else:
+                response = daemon.handle(request, self.server.owner_only)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    owner_only = False  # any local user can connect
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        owner_only = True  # the socket is accessible by its owner only
+else:
+    _UnixServer = None  # Unix sockets are not available (Windows)
@@ -6,11 +6,78 @@ Contains format specification class and methods to parse it from JSON.
 """
 
 import json
+import os
 
+CACHE_VERSION = 1  # increase when the cached classes change
 
-def parse_format(filename):
-    """Return root ITS."""
-    return _FormatSpec(json.load(open(filename))).its()
+
+def parse_format(filename, cache_dir=None):
+    """
+    Return root ITS.
+
+    If cache_dir is specified, the linked format specification is cached
+    there. The cache entry is keyed by the hash of the format file content
+    and CACHE_VERSION, so a changed file is never served from the cache.
+    """
+    with open(filename, 'rb') as format_file:
+        content = format_file.read()
+    if cache_dir is None:
+        return _FormatSpec(json.loads(content.decode('utf-8'))).its()
+    return _load_cached(content, cache_dir).its()
+
+
+def default_cache_dir():
+    """Returns the user cache directory of GeoMop."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'geomop')
+
+
+def _load_cached(content, cache_dir):
+    """
+    Returns _FormatSpec of content from cache. On a cache miss, the format
+    is parsed and stored in the cache.
+    """
+    import hashlib
+    import pickle
+    key = hashlib.sha256(content)
+    key.update('\0{version}'.format(version=CACHE_VERSION).encode())
+    filename = os.path.join(cache_dir, 'format-{key}.pickle'.format(
+        key=key.hexdigest()))
+    try:
+        with open(filename, 'rb') as cache_file:
+            version, spec = pickle.load(cache_file)
+    except (OSError, EOFError, ValueError, TypeError, AttributeError,
+            ImportError, IndexError, pickle.UnpicklingError):
+        pass  # missing or corrupted entry
+    else:
+        if version == CACHE_VERSION:
+            return spec
+    spec = _FormatSpec(json.loads(content.decode('utf-8')))
+    try:
+        _store_atomically(filename, (CACHE_VERSION, spec))
+    except OSError:
+        pass  # cache is not writable, continue without it
+    return spec
+
+
+def _store_atomically(filename, data):
+    """
+    Pickles data into filename. The file is written under a temporary name
+    first, so concurrent readers never see a partially written file.
+    """
+    import pickle
+    import tempfile
+    directory = os.path.dirname(filename)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            pickle.dump(data, temp_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_name, filename)
+    except:
+        os.unlink(temp_name)
+        raise
 
 
 class _FormatSpec:
@@ -10,9 +10,25 @@ Original data consist of records, arrays and scalar values. A node is
 constructed for each scalar, item in array and key in record. Each node
 has a path that indicates its position in the tree.
 
+Nodes are slotted to keep the per-node memory overhead low. Record keys
+are interned and array items store their integer index instead of a
+string name; the name is derived from it on demand.
+
+Long arrays of numbers are kept in a typed buffer (NumericArrayNode).
+LazyDataNode creates the nodes of a subtree only when it is accessed.
+
+Paths are cached on nodes and invalidated when a node is moved. An optional
+path index maps absolute paths to nodes for constant time lookups. Changes
+of node values can be tracked, so that only the changed parts of a tree
+are processed again (e.g. revalidated). Structural hashes of subtrees can
+be cached to recognize identical subtrees.
+
 @author: Tomas Krizek
 """
 
+from array import array
+from sys import intern
+
 
 class DataNode:
     """
@@ -21,17 +37,57 @@ class DataNode:
     The complete tree is represented by its root node.
     """
 
-    def __init__(self, data, parent=None, name=''):
+    __slots__ = ['_ref', '_parent', '_name', '_value', '_path', '_tree',
+                 'its']
+
+    def __init__(self, data, parent=None, name='', its=None):
         """
         Recursively constructs the tree structure from data.
 
         parent and name parameters are to be ommitted for the root node.
+        If its is given, the nodes are annotated with their input types
+        while they are created (see annotate).
         """
         self._ref = None
-        self.parent = parent
+        self._path = None
+        self._parent = parent
+        self.its = its if its is None else _concrete_its(data, its)
+        self._tree = tree = getattr(parent, '_tree', None)
         self.name = name
+        if tree is not None and tree.index is not None:
+            tree.index[self.path] = self
         self._initialize_value(data)
 
+    @property
+    def parent(self):
+        """Returns the parent node (or None for the root)."""
+        return self._parent
+
+    @parent.setter
+    def parent(self, value):
+        """Sets the parent node. Invalidates the cached paths."""
+        self._parent = value
+        self._invalidate_path()
+
+    @property
+    def name(self):
+        """
+        Returns the name of this node - its key in the parent record or
+        its index in the parent array.
+        """
+        name = self._name
+        if name.__class__ is int:
+            return str(name)
+        return name
+
+    @name.setter
+    def name(self, value):
+        """Sets the name. Integer names are kept as array indices."""
+        if value.__class__ is str:
+            value = intern(value)
+        self._name = value
+        self._invalidate_path()
+
     @property
     def value(self):
         """
@@ -51,10 +107,12 @@ class DataNode:
 
     @value.setter
     def value(self, value):
-        """Setter for value. Resolves references."""
+        """Setter for value. Resolves references. Records the change."""
         ref = self._ref
         if ref is None:
             self._value = value
+            if self._tree is not None:
+                self._record_change()
         else:
             # multi-level reference, resolve recursively
             ref.value = value
@@ -76,54 +134,312 @@ class DataNode:
         tree up to the root node. An item in path can eithery be an index
         or a key, representing array or a record, respectively.
 
+        The path is cached until the node or any of its ancestors is moved.
+
         TODO issue with references:
             if this is a reference, the original path is returned instead of
             the actual path
         """
+        path = self._path
+        if path is not None:
+            return path
         try:
-            path = self.parent.path
+            path = self._parent.path
         except AttributeError:
             path = ''
         if not path.endswith('/'):  # ensure only single slash
             path = path + '/'
-        return path + self.name
+        path = path + self.name
+        self._path = path
+        return path
+
+    def _invalidate_path(self):
+        """
+        Clears the cached path of this node and its descendants. A node
+        never has its path cached unless its parent has as well, so only
+        the cached part of the subtree is visited.
+        """
+        if self._path is None:
+            return
+        self._path = None
+        for child in self._children():
+            child._invalidate_path()
+
+    def _children(self):
+        """Returns the child nodes (not following the reference)."""
+        value = self._value
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, list):
+            return ()
+        return [child for child in value if isinstance(child, DataNode)]
+
+    def build_path_index(self):
+        """
+        Builds the path index of the tree below this node. While the index
+        exists, get() looks nodes up by their absolute path in constant
+        time.
+
+        The index is kept up to date when nodes are created or moved by
+        the tree itself. Direct modifications of value dicts and lists are
+        not tracked; build the index again after making them.
+        """
+        index = {}
+        self._set_tree(_TreeState.create(self._tree, index=index))
+        return index
+
+    def drop_path_index(self):
+        """Removes the path index of the tree below this node."""
+        self._set_tree(_TreeState.create(self._tree, index=None))
+
+    def track_changes(self):
+        """
+        Starts tracking changes of the tree below this node. A node is
+        changed when its value is set or a child node is created in it by
+        _create_child_node(). Direct modifications of value dicts and lists
+        are not tracked.
+        """
+        self._set_tree(_TreeState.create(self._tree, changes=set()))
+
+    def drop_change_tracking(self):
+        """Stops tracking changes of the tree below this node."""
+        self._set_tree(_TreeState.create(self._tree, changes=None))
+
+    def pop_changes(self):
+        """
+        Returns the set of nodes changed since the last call (or since
+        the tracking started) and forgets them.
+        """
+        tree = self._tree
+        if tree is None or tree.changes is None:
+            raise ValueError("Changes of {node} are not tracked".format(node=self))
+        changes = set(tree.changes)
+        tree.changes.clear()
+        return changes
+
+    def _record_change(self):
+        """
+        Records a change of this node: adds it to the tracked changes and
+        forgets the cached hashes of the node and its ancestors.
+        """
+        tree = self._tree
+        if tree.changes is not None:
+            tree.changes.add(self)
+        hashes = tree.hashes
+        if hashes:
+            node = self
+            while node is not None:
+                hashes.pop(node, None)
+                node = node._parent
+
+    def build_hash_cache(self):
+        """
+        Starts caching the structural hashes of the subtrees below this
+        node. A cached hash is forgotten when the node or any of its
+        descendants is changed (in the same way as changes are tracked).
+        """
+        self._set_tree(_TreeState.create(self._tree, hashes={}))
+
+    def drop_hash_cache(self):
+        """Stops caching the structural hashes of the tree below this node."""
+        self._set_tree(_TreeState.create(self._tree, hashes=None))
+
+    def subtree_hash(self):
+        """
+        Returns the structural hash of the subtree of this node (16 bytes).
+        Subtrees with equal values have equal hashes regardless of their
+        position, names of their nodes or references used to build them.
+        """
+        tree = self._tree
+        encoding = self._subtree_hash(None if tree is None else tree.hashes)[0]
+        if encoding[:1] == b'#':
+            return encoding[1:]
+        return _digest(encoding)
+
+    def _subtree_hash(self, hashes):
+        """
+        Returns the encoding of the subtree and whether it can be cached.
+        Records and arrays are encoded by b'#' and the digest of their
+        contents, scalars directly by their value (they are not cached).
+        Hashes of subtrees containing references are not cached, since
+        they change with the referred nodes.
+        """
+        if hashes is not None:
+            try:
+                return hashes[self], True
+            except KeyError:
+                pass
+        cacheable = self._ref is None
+        value = self.value
+        if isinstance(value, dict):
+            parts = [b'{']
+            for key in sorted(value):
+                child_hash, child_cacheable = value[key]._subtree_hash(hashes)
+                parts.append(key.encode())
+                parts.append(child_hash)
+                cacheable = cacheable and child_cacheable
+        elif isinstance(value, list):
+            buffer = None
+            if len(value) >= NumericArrayNode.MIN_LENGTH:
+                buffer = _numeric_buffer([item.value for item in value])
+            if buffer is not None:
+                parts = [_buffer_encoding(buffer)]
+                cacheable = cacheable and all(item._ref is None for item in value)
+            else:
+                parts = [b'[']
+                for item in value:
+                    item_hash, item_cacheable = item._subtree_hash(hashes)
+                    parts.append(item_hash)
+                    cacheable = cacheable and item_cacheable
+        else:
+            return _scalar_encoding(value), cacheable
+        encoding = b'#' + _digest(b''.join(parts))
+        if cacheable and hashes is not None:
+            hashes[self] = encoding
+        return encoding, cacheable
+
+    def annotate(self, its):
+        """
+        Annotates the subtree of this node with input types: attribute its
+        of every node is set to the InputTypeSpec expected at its position.
+        Abstract records are annotated with their concrete implementation,
+        selected by TYPE or the default descendant.
+
+        Referred subtrees are annotated at their own position and nodes of
+        unknown keys are left unannotated. Child nodes which do not exist
+        yet (lazy nodes, typed buffers) are annotated when they are created.
+        Modifications of the tree do not update the annotations.
+
+        Trees are annotated without a separate pass when the root ITS is
+        given to the constructor (or to the parser).
+        """
+        nodes = [(self, its)]
+        while nodes:
+            node, its = nodes.pop()
+            if its.input_type == 'AbstractRecord':  # needs TYPE of the value
+                its = _concrete_its(node.value, its)
+            node.its = its
+            if node._ref is None:
+                nodes.extend(node._annotated_children(its))
+
+    def _annotated_children(self, its):
+        """Returns (child node, ITS) pairs of the existing child nodes."""
+        value = self._value
+        input_type = its.input_type
+        if input_type == 'Record' and isinstance(value, dict):
+            keys = its.keys
+            return [(child, keys[key]['type'])
+                    for key, child in value.items() if key in keys]
+        elif input_type == 'Array' and isinstance(value, list):
+            subtype = its.subtype
+            return [(item, subtype) for item in value]
+        return ()
+
+    def _set_tree(self, tree):
+        """
+        Assigns tree state to the subtree and registers its nodes in the
+        path index.
+        """
+        index = None if tree is None else tree.index
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            node._tree = tree
+            if index is not None:
+                index[node.path] = node
+            nodes.extend(node._children())
+
+    def _unregister_index(self):
+        """Removes the subtree of this node from its index."""
+        index = self._tree.index
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            if index.get(node.path) is node:
+                del index[node.path]
+            nodes.extend(node._children())
 
     def _initialize_value(self, data):
-        """Ensures the creation of child nodes for dicts and lists."""
+        """
+        Ensures the creation of child nodes for dicts and lists. Child nodes
+        of an annotated node are annotated.
+        """
         # TODO split value and children
+        its = self.its
         if isinstance(data, dict):
-            self.value = {}
-            for key, value in data.items():
-                self.value[key] = self._create_child_node(value, key)
+            self._value = value = {}
+            if its is None or its.input_type != 'Record':
+                for key, item in data.items():
+                    key = intern(key)
+                    value[key] = self._new_child_node(item, key)
+            else:
+                keys = its.keys
+                for key, item in data.items():
+                    key = intern(key)
+                    spec = keys.get(key)
+                    value[key] = self._new_child_node(
+                        item, key, None if spec is None else spec['type'])
         elif isinstance(data, list):
-            self.value = []
+            self._value = value = []
+            subtype = _item_its(its)
             for i, item in enumerate(data):
-                self.value.append(self._create_child_node(item, str(i)))
+                value.append(self._new_child_node(item, i, subtype))
         else:
-            self.value = data
+            self._value = data
 
     def _create_child_node(self, data, name):
         """
         Creates a child DataNode instance. If provided data is already
         a DataNode, it will use the existing instance and change its
         position in the tree by manipulating parent and name.
+
+        This node is recorded as changed when changes are tracked.
+        """
+        if self._tree is not None:
+            self._record_change()
+        return self._new_child_node(data, name)
+
+    def _new_child_node(self, data, name, its=None):
+        """
+        Creates a child node of data without recording a change. The node
+        is annotated with its if given.
+
+        Long homogeneous arrays of numbers are stored in a NumericArrayNode.
         """
         if isinstance(data, DataNode):
+            tree = data._tree
+            if tree is not None and tree.index is not None:
+                data._unregister_index()
             data.parent = self
             data.name = name
+            if tree is not None or self._tree is not None:
+                data._set_tree(self._tree)
+            if its is not None:
+                data.annotate(its)
             return data
-        else:
-            return DataNode(data, self, name)
+        elif isinstance(data, list) and \
+                len(data) >= NumericArrayNode.MIN_LENGTH:
+            buffer = _numeric_buffer(data)
+            if buffer is not None:
+                return NumericArrayNode(buffer, self, name, its)
+        return type(self)(data, self, name, its)
 
     def get(self, path):
         """
         Returns node at specified path. Supports both relative and
         absolute paths.
         """
-        if path.startswith(self.path):  # absolute path
-            path = path[len(self.path):]
+        location = self.path
+        if path.startswith(location):  # absolute path
+            path = path[len(location):]
         elif path.startswith('/'):  # absolute path with different location
-            raise LookupError("Can't resolve {path} from node {location}".format(path=path, location=self.path))
+            raise LookupError("Can't resolve {path} from node {location}".format(path=path, location=location))
+        index = None if self._tree is None else self._tree.index
+        if index is not None:
+            try:
+                return index[location.rstrip('/') + '/' + path.lstrip('/')]
+            except KeyError:
+                pass  # not a normalized path, walk the tree
         node = self
         for key in path.split('/'):
             if not key or key == '.':
@@ -131,13 +447,15 @@ class DataNode:
             elif key == '..':
                 node = node.parent
                 continue
+            value = node.value
+            if isinstance(value, list):
+                try:
+                    key = int(key)
+                except ValueError:
+                    pass
             try:
-                key = int(key)
-            except ValueError:
-                pass
-            try:
-                node = node.value[key]
-            except LookupError:
+                node = value[key]
+            except (LookupError, TypeError):
                 raise LookupError("Node {key} does not exist in {location}".format(key=key, location=node.path))
         return node
 
@@ -146,6 +464,234 @@ class DataNode:
         return 'DataNode({location}{ref_text})'.format(location=self.path, ref_text=ref_text)
 
 
+class LazyDataNode(DataNode):
+    """
+    Represents a node whose child nodes are created on first access.
+
+    The decoded dict or list is kept until the value of the node is
+    requested. Then a lazy child node is created for each of its items.
+    Parts of the tree which are never accessed are never constructed.
+    """
+
+    __slots__ = ['_data']
+
+    @property
+    def value(self):
+        """
+        Returns the contents of a node. Child nodes are created on first
+        access.
+
+        If this node refers to another, its value is returned instead.
+        """
+        ref = self._ref
+        if ref is None:
+            if self._data is not None:
+                self._materialize()
+            return self._value
+        else:
+            # multi-level reference, resolve recursively
+            return ref.value
+
+    @value.setter
+    def value(self, value):
+        """Setter for value. Resolves references."""
+        if self._ref is None:
+            self._data = None
+        DataNode.value.fset(self, value)
+
+    def _initialize_value(self, data):
+        """Postpones the creation of child nodes for dicts and lists."""
+        if isinstance(data, (dict, list)):
+            self._data = data
+            self._value = None
+        else:
+            self._data = None
+            self._value = data
+
+    def _materialize(self):
+        """Creates the child nodes from the kept data."""
+        data = self._data
+        self._data = None
+        DataNode._initialize_value(self, data)
+
+
+class NumericArrayNode(DataNode):
+    """
+    Represents an array of numbers stored in a single typed buffer.
+
+    Integers and floats are kept in array.array of type 'q' and 'd',
+    respectively, instead of a node per item. The item nodes are created
+    when the value of the node is accessed, which drops the buffer. Bulk
+    operations, such as the validation of the items, use the buffer
+    directly.
+    """
+
+    __slots__ = ['_buffer']
+
+    MIN_LENGTH = 32  # shorter arrays are not worth a buffer
+
+    @property
+    def buffer(self):
+        """Returns the typed buffer, or None once item nodes exist."""
+        return self._buffer
+
+    @property
+    def value(self):
+        """
+        Returns the contents of a node. Item nodes are created on first
+        access.
+
+        If this node refers to another, its value is returned instead.
+        """
+        ref = self._ref
+        if ref is None:
+            if self._buffer is not None:
+                self._materialize()
+            return self._value
+        else:
+            # multi-level reference, resolve recursively
+            return ref.value
+
+    @value.setter
+    def value(self, value):
+        """Setter for value. Resolves references."""
+        if self._ref is None:
+            self._buffer = None
+        DataNode.value.fset(self, value)
+
+    def _subtree_hash(self, hashes):
+        """Hashes the buffer directly (equally to the materialized items)."""
+        if self._ref is not None or self._buffer is None:
+            return DataNode._subtree_hash(self, hashes)
+        encoding = _buffer_encoding(self._buffer)
+        return b'#' + _digest(encoding), True
+
+    def _initialize_value(self, data):
+        """Keeps typed buffers, initializes other data as usual."""
+        if isinstance(data, array):
+            self._buffer = data
+            self._value = None
+        else:
+            self._buffer = None
+            DataNode._initialize_value(self, data)
+
+    def _materialize(self):
+        """Creates the item nodes from the buffer."""
+        items = self._buffer.tolist()
+        self._buffer = None
+        subtype = _item_its(self.its)
+        self._value = [DataNode(item, self, i, subtype)
+                       for i, item in enumerate(items)]
+
+
+def _concrete_its(value, its):
+    """
+    Returns the implementation of an abstract record its selected by the
+    TYPE of value (a node value or data), or its itself for other input
+    types.
+    """
+    if its.input_type != 'AbstractRecord':
+        return its
+    try:
+        type_name = value['TYPE']
+        if isinstance(type_name, DataNode):
+            type_name = type_name.value
+        return its.implementations[type_name]
+    except (KeyError, TypeError, AttributeError):
+        return getattr(its, 'default_descendant', its)
+
+
+def _item_its(its):
+    """Returns the ITS of the items of an array of type its (or None)."""
+    if its is not None and its.input_type == 'Array':
+        return its.subtype
+    return None
+
+
+def _child_its(node, name):
+    """
+    Returns the ITS expected at child name of an annotated node (or None).
+    """
+    its = node.its
+    if its is None:
+        return None
+    value = node._value
+    if isinstance(value, dict) and its.input_type == 'Record':
+        spec = its.keys.get(name)
+        return None if spec is None else spec['type']
+    elif isinstance(value, list):
+        return _item_its(its)
+    return None
+
+
+def _numeric_buffer(data):
+    """
+    Returns a typed buffer of data if it contains only integers or only
+    floats, None otherwise.
+    """
+    types = set(map(type, data))
+    if types == {float}:
+        return array('d', data)
+    elif types == {int}:
+        try:
+            return array('q', data)
+        except OverflowError:
+            return None
+    return None
+
+
+_blake2b = None  # hashlib.blake2b, imported when a hash is computed first
+
+
+def _digest(data):
+    """Returns the 16 bytes long BLAKE2b digest of data."""
+    global _blake2b
+    if _blake2b is None:
+        from hashlib import blake2b as _blake2b  # loads OpenSSL, ~2 ms
+    return _blake2b(data, digest_size=16).digest()
+
+
+def _buffer_encoding(buffer):
+    """Returns bytes which identify the contents of a typed buffer."""
+    return b'(' + buffer.typecode.encode() + buffer.tobytes()
+
+
+def _scalar_encoding(value):
+    """
+    Returns bytes which identify a scalar value including its type. The
+    encoding is terminated by a zero byte, which never occurs in repr.
+    """
+    return ('=' + value.__class__.__name__ + ':' + repr(value) + '\0').encode()
+
+
+class _TreeState:
+    """
+    State shared by the nodes of a tree: the path index, the set of changed
+    nodes and the cached subtree hashes. Each of them is None unless it is
+    used.
+    """
+
+    __slots__ = ['index', 'changes', 'hashes']
+
+    def __init__(self, index=None, changes=None, hashes=None):
+        self.index = index
+        self.changes = changes
+        self.hashes = hashes
+
+    @classmethod
+    def create(cls, tree, **attributes):
+        """
+        Returns a new state with attributes of tree replaced by given
+        attributes, or None if it would be empty.
+        """
+        if tree is not None:
+            for name in cls.__slots__:
+                attributes.setdefault(name, getattr(tree, name))
+        if all(value is None for value in attributes.values()):
+            return None
+        return cls(**attributes)
+
+
 class RefError(Exception):
     """Exception represents invalid references in configuration file."""
     def __init__(self, message):
@@ -3,76 +3,170 @@
 GeomMop configuration file parsers
 
 This file contains the parsing functions for configuration files of Flow123d.
-Currently supports .con format (as specified by Flow123d manual v1.8.2).
-
-Future support for .yaml files for Flow123d v2 is planned.
+Supports .con format (as specified by Flow123d manual v1.8.2) and .yaml
+files of Flow123d v2 (requires PyYAML).
 
 @author: Tomas Krizek
 """
 
-import demjson
-import re
-from copy import copy
-
-from .model import DataNode, RefError
+from .model import DataNode, LazyDataNode, RefError, _child_its
+from .con_decoder import decode_con
 
 
-def parse_con(filename):
+def parse_con(filename, lazy=False, its=None):
     """
     Parses a configuration file of Flow123d in .con format with given filename.
     If the input file includes references, they are resolved and represented
     by actual python references in the output.
 
+    If lazy is set, the nodes are created on first access (LazyDataNode).
+    If the root ITS is given, every node is annotated with its input type
+    (see DataNode.annotate) while the tree is built.
+
+    Returns the root of the resulting tree DataNode structure.
+    """
+    with open(filename) as con_file:
+        return parse_con_string(con_file.read(), lazy, its)
+
+
+def parse_con_string(con, lazy=False, its=None):
+    """
+    Parses the text of a configuration file in .con format. Same as
+    parse_con for already read files.
+    """
+    return _resolve_references(_decode_con(con), lazy, its)
+
+
+def parse_yaml(filename, its=None):
+    """
+    Parses a configuration file in .yaml format with given filename.
+    Anchors and aliases (as well as REF keys) are represented by actual
+    python references in the output, so the tree is the same as the tree
+    of the equivalent .con file. The C loader of libyaml is used when
+    available.
+
+    If the root ITS is given, every node is annotated with its input type
+    while the tree is built.
+
     Returns the root of the resulting tree DataNode structure.
     """
-    con = open(filename).read()
-    data = _decode_con(con)
-    return _resolve_references(data)
+    with open(filename) as yaml_file:
+        return parse_yaml_string(yaml_file.read(), its)
+
+
+def parse_yaml_string(text, its=None):
+    """
+    Parses the text of a configuration file in .yaml format. Same as
+    parse_yaml for already read files.
+    """
+    from .yaml_codec import decode_yaml
+    root, refs = decode_yaml(text, its=its)
+    if refs:
+        root = _ReferenceResolver(root, refs).resolve()
+    return root
 
 
 def con_to_yaml(filename_in, filename_out):
     """
     Converts the con file into yaml file.
-    Does not resolve references.
+    Does not resolve references. The yaml file is written while the data
+    is walked, without building the whole document first.
     """
-    import yaml
+    from .yaml_codec import encode_yaml
     with open(filename_in) as con_file:
-        con = con_file.read()
-        data = _decode_con(con)
-        with open(filename_out, 'w') as stream:
-            yaml.dump(data, stream)
+        data = _decode_con(con_file.read())
+    with open(filename_out, 'w') as stream:
+        encode_yaml(data, stream)
 
 
-def _resolve_references(data):
+def _resolve_references(data, lazy=False, its=None):
     """
     Resolves references in data. Replaces REF keys with actual Python
-    references.
+    references. The nodes are annotated if the root its is given.
     """
     refs = _extract_references(data)
-    root = DataNode(data)
-    while len(refs) > 0:
-        length = len(refs)
-        for path, ref_path in copy(refs).items():
-            try:
-                node = root.get(path)
-                if ref_path.startswith('/'):  # absolute ref
-                    node.ref = root.get(ref_path)
-                else:  # relative ref
-                    node.ref = node.get(ref_path)
-            except LookupError:
+    root = LazyDataNode(data, its=its) if lazy else DataNode(data, its=its)
+    return _ReferenceResolver(root, refs).resolve()
+
+
+class _ReferenceResolver:
+    """
+    Resolves references in dependency order.
+
+    A reference depends on every reference that is crossed while looking up
+    its target, and on the target itself. Dependencies are resolved first
+    (depth-first), so each reference is resolved exactly once. A reference
+    that is reached again while its own dependencies are being resolved
+    forms a cycle.
+    """
+
+    def __init__(self, root, refs):
+        self._root = root
+        self._pending = {}  # node -> (path, ref_path)
+        for path, ref_path in refs.items():
+            self._pending[root.get(path)] = (path, ref_path)
+        self._resolving = []  # stack of nodes being resolved
+
+    def resolve(self):
+        """Resolves all references and returns the root node."""
+        while self._pending:
+            node = next(iter(self._pending))
+            self._resolve(node)
+        return self._root
+
+    def _resolve(self, node):
+        """Resolves the reference of node, including its dependencies."""
+        path, ref_path = self._pending[node]
+        if node in self._resolving:
+            cycle = self._resolving[self._resolving.index(node):] + [node]
+            raise RefError("Circular reference: {cycle}".format(
+                cycle=' -> '.join(self._pending[item][0] for item in cycle)))
+        self._resolving.append(node)
+        node.ref = self._lookup(node, path, ref_path)
+        if node.its is not None:
+            # implementation of an abstract record is selected by the target
+            node.annotate(_child_its(node.parent, node._name))
+        self._resolving.pop()
+        del self._pending[node]
+
+    def _lookup(self, node, path, ref_path):
+        """
+        Returns the node referenced by ref_path from node. Unresolved
+        references on the way are resolved first.
+        """
+        if ref_path.startswith('/'):  # absolute ref
+            node = self._root
+        for key in ref_path.split('/'):
+            if not key or key == '.':
                 continue
-            else: del refs[path]
-        if length == len(refs):
-            # no reference removed -> impossible to resolve references
-            raise RefError("Can not resolve references.")
-    return root
+            elif key == '..':
+                node = node.parent
+                if node is None:
+                    raise self._lookup_error(path, ref_path)
+                continue
+            if node in self._pending:
+                self._resolve(node)
+            try:
+                key = int(key)
+            except ValueError:
+                pass
+            try:
+                node = node.value[key]
+            except (LookupError, TypeError):
+                raise self._lookup_error(path, ref_path)
+        if node in self._pending:
+            self._resolve(node)
+        return node
+
+    @staticmethod
+    def _lookup_error(path, ref_path):
+        return RefError("Can not resolve reference {path} -> {ref_path}".format(
+            path=path, ref_path=ref_path))
 
 
 def _decode_con(con):
     """Reads .con format and returns read data in form of dicts and lists."""
-    pattern = re.compile(r"\s?=\s?")  # TODO can I replace = simply like this?
-    con = pattern.sub(':', con)
-    return demjson.decode(con)
+    return decode_con(con)
 
 
 def _extract_references(json):
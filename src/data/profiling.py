@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop profiling of configuration file processing
+
+Measures the phases of processing a configuration file separately: reading,
+decoding, building the node tree, resolving references, auto-conversion and
+validation. Each phase reports its wall time, the number of nodes and
+references and (optionally) its peak memory allocation measured by
+tracemalloc. The validator additionally reports the time spent in every
+input type.
+
+@author: Tomas Krizek
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from . import autoconverter
+from .model import DataNode
+from .parser import _decode_con, _extract_references, _ReferenceResolver
+from .validation import Validator
+
+
+class Profile:
+    """Measurements of the phases of a single run."""
+
+    def __init__(self, memory=False):
+        """If memory is set, peak allocations are traced by tracemalloc."""
+        self.memory = memory
+        self.phases = []
+        self.types = {}  # type key -> [calls, cumulative time, own time]
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measures the code inside the with statement as a phase. Yields the
+        dict of the phase, so that counts can be added to it.
+        """
+        record = {'name': name}
+        if self.memory:
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['time'] = time.perf_counter() - start
+            if self.memory:
+                record['peak_memory'] = tracemalloc.get_traced_memory()[1] - start_memory
+            self.phases.append(record)
+
+    @property
+    def total_time(self):
+        return sum(record['time'] for record in self.phases)
+
+    def to_dict(self):
+        """Returns the measurements as a dict serializable to JSON."""
+        return {
+            'total_time': self.total_time,
+            'phases': self.phases,
+            'types': [
+                {'type': key, 'calls': calls, 'time': cumulative,
+                 'own_time': own}
+                for key, (calls, cumulative, own) in self._sorted_types()]
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_text(self, types=20):
+        """
+        Returns a human readable report. At most types input types with
+        the highest own time are listed.
+        """
+        lines = ['{name:<12} {time:>10} {nodes:>10} {refs:>8} {memory:>12}'.format(
+            name='phase', time='time [ms]', nodes='nodes', refs='refs',
+            memory='peak [kB]')]
+        for record in self.phases:
+            memory = record.get('peak_memory')
+            lines.append('{name:<12} {time:>10.2f} {nodes:>10} {refs:>8} {memory:>12}'.format(
+                name=record['name'], time=record['time'] * 1000,
+                nodes=record.get('nodes', ''), refs=record.get('references', ''),
+                memory='' if memory is None else '{0:.1f}'.format(memory / 1024)))
+        lines.append('{name:<12} {time:>10.2f}'.format(
+            name='total', time=self.total_time * 1000))
+        if self.types:
+            lines.append('')
+            lines.append('{type:<40} {calls:>8} {time:>10} {own:>10}'.format(
+                type='validated type', calls='calls', time='time [ms]',
+                own='own [ms]'))
+            for key, (calls, cumulative, own) in self._sorted_types()[:types]:
+                lines.append('{type:<40} {calls:>8} {time:>10.2f} {own:>10.2f}'.format(
+                    type=key, calls=calls, time=cumulative * 1000, own=own * 1000))
+        return '\n'.join(lines)
+
+    def _sorted_types(self):
+        return sorted(self.types.items(), key=(lambda item: -item[1][2]))
+
+
+class ProfilingValidator(Validator):
+    """
+    Validator which measures the time spent in the validation of nodes of
+    every input type. The cumulative time of a type includes the validation
+    of descendant nodes, the own time does not.
+    """
+
+    def __init__(self, types=None):
+        super(ProfilingValidator, self).__init__()
+        self.types = {} if types is None else types
+        self._child_time = [0.0]
+
+    def _validate_node(self, node, its_plan, location=None):
+        child_time = self._child_time
+        child_time.append(0.0)
+        start = time.perf_counter()
+        try:
+            Validator._validate_node(self, node, its_plan, location)
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - child_time.pop()
+            child_time[-1] = child_time[-1] + elapsed
+            key = type_key(its_plan.its)
+            try:
+                stats = self.types[key]
+            except KeyError:
+                stats = self.types[key] = [0, 0.0, 0.0]
+            stats[0] = stats[0] + 1
+            stats[1] = stats[1] + elapsed
+            stats[2] = stats[2] + own
+
+
+def type_key(its):
+    """Returns the key of its in the type histogram."""
+    name = getattr(its, 'type_name', None) or getattr(its, 'name', None)
+    if name is None:
+        return its.input_type
+    return '{input_type} {name}'.format(input_type=its.input_type, name=name)
+
+
+def profile_file(filename, its, memory=False):
+    """
+    Parses, auto-converts and validates filename against its phase by
+    phase. Returns the Profile and the validator.
+    """
+    profile = Profile(memory)
+    with _tracing(memory):
+        with profile.phase('read') as record:
+            with open(filename) as con_file:
+                con = con_file.read()
+            record['bytes'] = len(con)
+        validator = _profile_phases(profile, con, its)
+    return profile, validator
+
+
+def profile_string(con, its, memory=False):
+    """
+    Parses, auto-converts and validates the configuration string con
+    against its phase by phase. Returns the Profile and the validator.
+    """
+    profile = Profile(memory)
+    with _tracing(memory):
+        validator = _profile_phases(profile, con, its)
+    return profile, validator
+
+
+@contextmanager
+def _tracing(memory):
+    """Traces memory allocations inside the with statement if requested."""
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+
+def _profile_phases(profile, con, its):
+    """Measures the phases from decoding con to validation."""
+    with profile.phase('decode'):
+        data = _decode_con(con)
+    with profile.phase('build') as record:
+        refs = _extract_references(data)
+        root = DataNode(data)
+    record['nodes'] = count_nodes(root)
+    record['references'] = len(refs)
+    with profile.phase('resolve') as record:
+        root = _ReferenceResolver(root, refs).resolve()
+    record['references'] = len(refs)
+    with profile.phase('autoconvert') as record:
+        root = autoconverter.autoconvert(root, its, mode=autoconverter.INPLACE)
+    record['nodes'] = count_nodes(root)
+    validator = ProfilingValidator(profile.types)
+    with profile.phase('validate') as record:
+        validator.validate(root, its)
+    record['nodes'] = sum(stats[0] for stats in profile.types.values())
+    record['errors'] = validator.error_count
+    return validator
+
+
+def count_nodes(root):
+    """Returns the number of nodes of the tree (not following references)."""
+    count = 0
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        count = count + 1
+        nodes.extend(node._children())
+    return count
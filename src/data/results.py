@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop validation result cache
+
+Stores results of whole file validations on disk. An entry is keyed by the
+hash of the configuration file content, the hash of the format file
+content, the validation options and RESULT_CACHE_VERSION, so a result is
+served only for unchanged inputs validated the same way.
+
+@author: Tomas Krizek
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+
+from .format import _store_atomically
+
+RESULT_CACHE_VERSION = 1  # increase when the cached results change
+
+
+class ResultCache:
+    """
+    On-disk cache of validation results (FileResult) of a single format.
+    """
+
+    def __init__(self, cache_dir, format_filename, options=()):
+        """
+        Results are stored in the results subdirectory of cache_dir. options
+        are the validation options which change the result.
+        """
+        self.directory = os.path.join(cache_dir, 'results')
+        with open(format_filename, 'rb') as format_file:
+            key = hashlib.sha256(format_file.read())
+        key.update('\0{version}\0{options!r}'.format(
+            version=RESULT_CACHE_VERSION, options=tuple(options)).encode())
+        self._format_key = key.digest()
+
+    def get(self, content):
+        """
+        Returns the cached result of a file with content (bytes), or None
+        if it is not cached.
+        """
+        try:
+            with open(self._filename(content), 'rb') as cache_file:
+                version, result = pickle.load(cache_file)
+        except (OSError, EOFError, ValueError, TypeError, AttributeError,
+                ImportError, IndexError, pickle.UnpicklingError):
+            return None  # missing or corrupted entry
+        if version != RESULT_CACHE_VERSION:
+            return None
+        return result
+
+    def put(self, content, result):
+        """Stores the result of a file with content (bytes)."""
+        try:
+            _store_atomically(self._filename(content),
+                              (RESULT_CACHE_VERSION, result))
+        except OSError:
+            pass  # cache is not writable, continue without it
+
+    def clear(self):
+        """Removes all cached results (of all formats)."""
+        clear_results(os.path.dirname(self.directory))
+
+    def _filename(self, content):
+        key = hashlib.sha256(self._format_key)
+        key.update(content)
+        return os.path.join(self.directory, 'result-{key}.pickle'.format(
+            key=key.hexdigest()))
+
+
+def clear_results(cache_dir):
+    """Removes all cached results from cache_dir."""
+    pattern = os.path.join(cache_dir, 'results', 'result-*.pickle')
+    for filename in glob.glob(pattern):
+        try:
+            os.unlink(filename)
+        except OSError:
+            pass
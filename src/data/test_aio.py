@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the asyncio interface.
+
+@author: Tomas Krizek
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from . import aio
+from .format import parse_format
+
+
+class TestAsyncValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        format_file = self._write('format.json',
+            '[{"id": "root", "input_type": "Record", "type_name": "Root", '
+            '"keys": [{"key": "count", "type": "int"}]}, '
+            '{"id": "int", "input_type": "Integer", "range": [0, 3]}]')
+        self.its = parse_format(format_file)
+        self.inputs = [self._write('input{0}.con'.format(count),
+                                   '{{ count = {0} }}'.format(count))
+                       for count in range(6)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, 'w') as file_:
+            file_.write(content)
+        return filename
+
+    def _collect(self, filenames, **options):
+        async def collect():
+            return [result async for result in
+                    aio.validate_files_async(filenames, self.its, **options)]
+        return asyncio.run(collect())
+
+    def test_threads(self):
+        results = self._collect(self.inputs, workers=2, processes=False,
+                                concurrency=3)
+        self.assertEqual(sorted((os.path.basename(result.filename), result.valid)
+                                for result in results),
+                         [('input0.con', True), ('input1.con', True),
+                          ('input2.con', True), ('input3.con', True),
+                          ('input4.con', False), ('input5.con', False)])
+
+    def test_processes(self):
+        results = self._collect(self.inputs[3:5], workers=2)
+        valid = {os.path.basename(result.filename): result.valid
+                 for result in results}
+        self.assertEqual(valid, {'input3.con': True, 'input4.con': False})
+
+    def test_async_iterable(self):
+        async def filenames():
+            for filename in self.inputs[:2]:
+                await asyncio.sleep(0)
+                yield filename
+            yield os.path.join(self.directory.name, 'missing.con')
+
+        results = self._collect(filenames(), processes=False)
+        self.assertEqual(len(results), 3)
+        failed = [result for result in results if result.failure is not None]
+        self.assertEqual(len(failed), 1)
+        self.assertIn('missing.con', failed[0].failure)
+
+    def test_parse_con_async(self):
+        root = asyncio.run(aio.parse_con_async(self.inputs[2], its=self.its))
+        self.assertEqual(root.get('/count').value, 2)
+        self.assertIs(root.its, self.its)
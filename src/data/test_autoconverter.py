@@ -123,3 +123,109 @@ class Testautoconvert(unittest.TestCase):
 
         self.assertEqual(converted.get('/path/0/0/a').value, 2)
 
+    def test_autoconvert_modes(self):
+        its_array = Mock(
+            input_type='Array',
+            subtype=Mock(input_type='Integer'))
+        its_record = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={'x': {'type': its_array}},
+            type_name='Inner')
+        its = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={
+                'path': {'type': its_array},
+                'same': {'type': its_array},
+                'inner': {'type': its_record},
+                'other': {'type': its_record}},
+            type_name='Root')
+
+        def create_root():
+            root = DataNode({'path': 2, 'same': [1], 'inner': {'x': 3},
+                             'other': {'x': [4]}})
+            root.value['ref'] = root._create_child_node(DataNode(None), 'ref')
+            root.value['ref'].ref = root.value['other']
+            return root
+
+        # copy-on-write
+        root = create_root()
+        converted = ac.autoconvert(root, its, mode=ac.COPY_ON_WRITE)
+        self.assertEqual(converted.get('/path/0').value, 2)
+        self.assertEqual(converted.get('/inner/x/0').value, 3)
+        self.assertEqual(converted.get('/inner/x/0').path, '/inner/x/0')
+        self.assertEqual(root.get('/path').value, 2)
+        self.assertEqual(root.get('/inner/x').value, 3)
+        self.assertIsNot(converted, root)
+        self.assertIs(converted.value['same'], root.value['same'])
+        self.assertIs(converted.value['other'], root.value['other'])
+        self.assertIs(converted.value['ref'].ref, root.value['other'])
+
+        # unchanged tree is not copied at all
+        self.assertIs(ac.autoconvert(converted, its, mode=ac.COPY_ON_WRITE),
+                      converted)
+
+        # the index and tracked changes of the original tree are kept intact
+        root = create_root()
+        root.build_path_index()
+        root.track_changes()
+        inner = root.value['inner']
+        converted = ac.autoconvert(root, its, mode=ac.COPY_ON_WRITE)
+        self.assertEqual(converted.get('/path/0').value, 2)
+        self.assertEqual(converted.get('/inner/x/0').value, 3)
+        self.assertEqual(root.get('/path').value, 2)
+        self.assertIs(root.get('/inner'), inner)
+        self.assertEqual(root.get('/inner/x').value, 3)
+        self.assertIs(root.get('/inner/x'), inner.value['x'])
+        self.assertEqual(root.pop_changes(), set())
+        self.assertIsNone(converted._tree)
+
+        # in place
+        root = create_root()
+        converted = ac.autoconvert(root, its, mode=ac.INPLACE)
+        self.assertIs(converted, root)
+        self.assertEqual(root.get('/path/0').value, 2)
+        self.assertEqual(root.get('/inner/x/0').path, '/inner/x/0')
+
+        with self.assertRaises(ValueError):
+            ac.autoconvert(root, its, mode='invalid')
+
+    def test_autoconvert_cow_reference(self):
+        its_array = Mock(
+            input_type='Array',
+            subtype=Mock(input_type='Integer'))
+        its_record = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={'x': {'type': its_array}},
+            type_name='Inner')
+        its = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={'ref': {'type': its_record}, 'other': {'type': its_record}},
+            type_name='Root')
+        root = DataNode({'ref': None, 'other': {'x': 3}})
+        root.value['ref'].ref = root.value['other']
+
+        converted = ac.autoconvert(root, its, mode=ac.COPY_ON_WRITE)
+        self.assertIs(converted.value['ref'].ref, converted.value['other'])
+        self.assertIs(converted.value['other'].parent, converted)
+        self.assertEqual(converted.get('/ref/x/0').value, 3)
+        self.assertIs(root.value['ref'].ref, root.value['other'])
+        self.assertEqual(root.get('/other/x').value, 3)
+
+    def test_autoconvert_annotated(self):
+        its_int = Mock(input_type='Integer')
+        its_array = Mock(input_type='Array', subtype=its_int)
+        its = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={'path': {'type': its_array}},
+            type_name='Root')
+
+        root = DataNode({'path': 2})
+        root.annotate(its)
+        converted = ac.autoconvert(root, mode=ac.INPLACE)
+        self.assertIs(converted.get('/path').its, its_array)
+        self.assertIs(converted.get('/path/0').its, its_int)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for batch validation.
+
+@author: Tomas Krizek
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from . import batch
+from .format import parse_format
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = {
+            'valid.con': '{ count = 1 }',
+            'invalid.con': '{ count = "x" }',
+            'broken.con': '{ count = ',
+            'bad_type.con': '{ count = 1, problem = { TYPE = [1, 2] } }',
+        }
+        for name, content in self.files.items():
+            with open(os.path.join(self.directory.name, name), 'w') as file_:
+                file_.write(content)
+        with open(os.path.join(self.directory.name, 'other.txt'), 'w'):
+            pass
+        format_file = os.path.join(self.directory.name, 'format.json')
+        with open(format_file, 'w') as file_:
+            file_.write('[{"id": "root", "input_type": "Record", '
+                        '"type_name": "Root", "keys": '
+                        '[{"key": "count", "type": "int"}, '
+                        '{"key": "problem", "type": "problem"}]}, '
+                        '{"id": "int", "input_type": "Integer"}, '
+                        '{"id": "problem", "input_type": "AbstractRecord", '
+                        '"name": "Problem", "implementations": []}]')
+        self.its = parse_format(format_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_find_inputs(self):
+        directory = self.directory.name
+        expected = sorted(os.path.join(directory, name) for name in self.files)
+        self.assertEqual(batch.find_inputs([directory]), expected)
+        self.assertEqual(batch.find_inputs([os.path.join(directory, '*.con')]),
+                         expected)
+        self.assertEqual(
+            batch.find_inputs([os.path.join(directory, 'valid.con')] * 2),
+            [os.path.join(directory, 'valid.con')])
+
+    def test_validate_files(self):
+        filenames = batch.find_inputs([self.directory.name])
+        for workers in [1, 2]:
+            results = {os.path.basename(result.filename): result for result in
+                       batch.validate_files(filenames, self.its, workers)}
+            self.assertEqual(sorted(results), sorted(self.files))
+            self.assertEqual(results['valid.con'].valid, True)
+            self.assertEqual(results['valid.con'].console_log, 'VALID')
+            self.assertEqual(results['invalid.con'].valid, False)
+            self.assertEqual(results['invalid.con'].errors,
+                             (('/count', 'Expecting type Integer'),))
+            self.assertEqual(results['broken.con'].valid, False)
+            self.assertIsNotNone(results['broken.con'].failure)
+            self.assertEqual(results['bad_type.con'].valid, False)
+            (path, message), = results['bad_type.con'].errors
+            self.assertEqual(path, '/problem')
+            self.assertTrue(message.startswith('Invalid TYPE'))
+
+    def test_validation_failure(self):
+        # exceptions of the validation do not abort the batch
+        filename = os.path.join(self.directory.name, 'valid.con')
+        with patch('data.validation.validator.Validator.autoconvert_and_validate',
+                   side_effect=TypeError('unexpected')):
+            result = batch.validate_file(filename, self.its)
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.failure, 'Validation failed: TypeError: unexpected')
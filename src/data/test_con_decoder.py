@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for .con format decoder.
+
+@author: Tomas Krizek
+"""
+
+import unittest
+
+from .con_decoder import decode_con, ConDecodeError
+
+
+class TestConDecoder(unittest.TestCase):
+
+    def test_scalars(self):
+        self.assertEqual(decode_con('3'), 3)
+        self.assertIsInstance(decode_con('3'), int)
+        self.assertEqual(decode_con('-2.5'), -2.5)
+        self.assertEqual(decode_con('1e-12'), 1e-12)
+        self.assertIsInstance(decode_con('1e3'), float)
+        self.assertEqual(decode_con('.5'), 0.5)
+        self.assertEqual(decode_con('true'), True)
+        self.assertEqual(decode_con('false'), False)
+        self.assertEqual(decode_con('null'), None)
+        self.assertEqual(decode_con('"abc"'), 'abc')
+        self.assertEqual(decode_con("'abc'"), 'abc')
+
+    def test_record(self):
+        con = """
+        {
+          problem = {
+            TYPE = "SequentialCoupling",
+            "quoted": 1,
+            array = [1, 2.0, "x"],
+          }
+        }
+        """
+        data = decode_con(con)
+        self.assertEqual(data, {
+            'problem': {
+                'TYPE': 'SequentialCoupling',
+                'quoted': 1,
+                'array': [1, 2.0, 'x']}})
+
+    def test_strings(self):
+        data = decode_con('{ a = "x = y", b = "line\nbreak", c = "\\"q\\"",'
+                          " d = 'it\\'s' }")
+        self.assertEqual(data['a'], 'x = y')
+        self.assertEqual(data['b'], 'line\nbreak')
+        self.assertEqual(data['c'], '"q"')
+        self.assertEqual(data['d'], "it's")
+
+    def test_comments(self):
+        con = """
+        {
+          a = 1,  // comment = 2
+          /* b = 2,
+             c = 3, */
+          d = [ 4 /* inline */ ]
+        }
+        """
+        self.assertEqual(decode_con(con), {'a': 1, 'd': [4]})
+
+    def test_errors(self):
+        with self.assertRaises(ConDecodeError):
+            decode_con('{ a = 1')
+        with self.assertRaises(ConDecodeError):
+            decode_con('{ a 1 }')
+        with self.assertRaises(ConDecodeError):
+            decode_con('[1 2]')
+        with self.assertRaises(ConDecodeError):
+            decode_con('{ a = "unterminated }')
+        with self.assertRaises(ConDecodeError):
+            decode_con('{ a = value }')
+        with self.assertRaises(ConDecodeError):
+            decode_con('{} {}')
+
+        try:
+            decode_con('{\n  a = 1,\n  b = ?\n}')
+        except ConDecodeError as error:
+            self.assertEqual(error.line, 3)
+            self.assertEqual(error.column, 7)
+
+    def test_long_whitespace(self):
+        # a long whitespace run before an invalid character must fail in
+        # linear time, not backtrack over every split of the run
+        with self.assertRaises(ConDecodeError) as context:
+            decode_con('{a = 1,' + ' ' * 10000 + '@}')
+        self.assertEqual(context.exception.column, 10008)
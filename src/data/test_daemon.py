@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the validation daemon.
+
+@author: Tomas Krizek
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from .daemon import ValidationDaemon, parse_address
+
+FORMAT = ('[{{"id": "root", "input_type": "Record", "type_name": "Root", '
+          '"keys": [{{"key": "count", "type": "int"}}]}}, '
+          '{{"id": "int", "input_type": "Integer", "range": [0, {max}]}}]')
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.format = self._write('format.json', FORMAT.format(max=3))
+        self.input = self._write('input.con', '{ count = 2 }')
+        self.daemon = ValidationDaemon('127.0.0.1:0', self.format,
+                                       allow_files=True)
+        self.thread = threading.Thread(target=self.daemon.serve_forever,
+                                       args=(0.01,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        self.directory.cleanup()
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, 'w') as file_:
+            file_.write(content)
+        return filename
+
+    def _request(self, *requests):
+        with socket.create_connection(self.daemon.address) as connection:
+            connection.sendall(b''.join(json.dumps(request).encode() + b'\n'
+                                        for request in requests))
+            connection.shutdown(socket.SHUT_WR)
+            with connection.makefile('rb') as stream:
+                return [json.loads(line.decode()) for line in stream]
+
+    def test_validate(self):
+        valid, invalid = self._request(
+            {'filename': self.input},
+            {'command': 'validate', 'content': '{ count = 5 }'})
+        self.assertEqual(valid['valid'], True)
+        self.assertEqual(valid['console_log'], 'VALID')
+        self.assertEqual(invalid['valid'], False)
+        self.assertEqual(invalid['errors'],
+                         [['/count', 'Expected value smaller or equal to 3']])
+
+    def test_format_reload(self):
+        plan = self.daemon.get_format().plan
+        self.assertIs(self.daemon.get_format().plan, plan)
+        self._write('format.json', FORMAT.format(max=10))
+        response, = self._request({'content': '{ count = 5 }'})
+        self.assertEqual(response['valid'], True)
+        self.assertIsNot(self.daemon.get_format().plan, plan)
+
+    def test_errors(self):
+        missing, unknown, broken = self._request(
+            {'filename': os.path.join(self.directory.name, 'missing.con')},
+            {'command': 'unknown'},
+            {'content': '{ count = '})
+        self.assertIn('missing.con', missing['error'])
+        self.assertEqual(unknown['error'], 'Unknown command unknown')
+        self.assertEqual(broken['valid'], False)
+        self.assertIsNotNone(broken['failure'])
+
+        with socket.create_connection(self.daemon.address) as connection:
+            connection.sendall(b'not json\n')
+            with connection.makefile('rb') as stream:
+                self.assertIn('Invalid request', stream.readline().decode())
+
+    def test_concurrent(self):
+        responses = []
+
+        def validate():
+            responses.extend(self._request(*[{'filename': self.input}] * 5))
+
+        threads = [threading.Thread(target=validate) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([response['valid'] for response in responses],
+                         [True] * 20)
+
+    def test_convert(self):
+        try:
+            import yaml
+        except ImportError:
+            self.skipTest('PyYAML is not installed')
+        response, = self._request({'command': 'convert', 'filename': self.input})
+        self.assertEqual(yaml.safe_load(response['yaml']), {'count': 2})
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('/tmp/daemon.sock'),
+                         ('unix', '/tmp/daemon.sock'))
+        self.assertEqual(parse_address('8765'), ('tcp', ('localhost', 8765)))
+        self.assertEqual(parse_address('127.0.0.1:8765'),
+                         ('tcp', ('127.0.0.1', 8765)))
+        with self.assertRaises(ValueError):
+            parse_address('localhost')
+        for address in ['0.0.0.0:8765', '192.168.1.1:8765', 'example.com:8765']:
+            with self.assertRaises(ValueError):
+                parse_address(address)
+
+
+class TestRestrictedDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.format = os.path.join(self.directory.name, 'format.json')
+        with open(self.format, 'w') as format_file:
+            format_file.write(FORMAT.format(max=3))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_files(self):
+        daemon = ValidationDaemon('127.0.0.1:0', self.format)
+        try:
+            response = daemon.handle({'filename': self.format})
+            self.assertIn('not allowed', response['error'])
+            response = daemon.handle({'content': '{ count = 1 }',
+                                      'format': '/etc/passwd'})
+            self.assertIn('not allowed', response['error'])
+            response = daemon.handle({'content': '{ count = 1 }',
+                                      'format': self.format})
+            self.assertEqual(response['valid'], True)
+            response = daemon.handle({'command': 'shutdown'}, owner=False)
+            self.assertIn('Unix socket', response['error'])
+        finally:
+            daemon._server.server_close()
+
+    def test_result_cache(self):
+        results_dir = os.path.join(self.directory.name, 'cache')
+        daemon = ValidationDaemon('127.0.0.1:0', self.format,
+                                  results_dir=results_dir)
+        try:
+            first = daemon.handle({'content': '{ count = 1 }'})
+            second = daemon.handle({'content': '{ count = 1 }'})
+            self.assertEqual(first['cached'], False)
+            self.assertEqual(second['cached'], True)
+        finally:
+            daemon._server.server_close()
+        # the parsed format is not cached with the results
+        self.assertEqual(os.listdir(results_dir), ['results'])
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix sockets')
+    def test_unix_socket(self):
+        address = os.path.join(self.directory.name, 'daemon.sock')
+        with open(address, 'w'):
+            pass
+        with self.assertRaisesRegex(ValueError, 'not a socket'):
+            ValidationDaemon(address, self.format)
+        os.remove(address)
+
+        # socket left by a killed daemon
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(address)
+        stale.close()
+        daemon = ValidationDaemon(address, self.format)
+        self.assertEqual(os.stat(address).st_mode & 0o777, 0o600)
+        thread = threading.Thread(target=daemon.serve_forever, args=(0.01,))
+        thread.start()
+        try:
+            with self.assertRaisesRegex(ValueError, 'already running'):
+                ValidationDaemon(address, self.format)
+        finally:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(address)
+                connection.sendall(b'{"command": "shutdown"}\n')
+                with connection.makefile('rb') as stream:
+                    self.assertEqual(json.loads(stream.readline().decode()),
+                                     {'shutdown': True})
+            thread.join()
+        self.assertFalse(os.path.exists(address))
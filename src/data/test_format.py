@@ -5,10 +5,14 @@ Tests for format package.
 @author: Tomas Krizek
 """
 
+import json
+import os
+import tempfile
 import unittest
+from copy import deepcopy
 
 from .format import InputTypeSpec, _FormatSpec as FormatSpec, \
-        _list_to_dict as list_to_dict
+        _list_to_dict as list_to_dict, parse_format
 
 
 class TestFormatSpec(unittest.TestCase):
@@ -267,3 +271,55 @@ class TestListToDict(unittest.TestCase):
         self.assertEqual(self.dict['METIS']['description'], "METIS description")
 
 
+class TestFormatCache(unittest.TestCase):
+    data = [
+      {
+        "id": "cde734cca8c6d536",
+        "input_type": "Record",
+        "type_name": "Root",
+        "keys": [
+          {
+            "key": "recursion",
+            "type": "cde734cca8c6d536"
+          }
+        ]
+      }
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.filename = os.path.join(self.directory.name, 'format.json')
+        with open(self.filename, 'w') as format_file:
+            json.dump(TestFormatCache.data, format_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache(self):
+        its = parse_format(self.filename, self.cache_dir)
+        self.assertEqual(its.type_name, 'Root')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        cached = parse_format(self.filename, self.cache_dir)
+        self.assertEqual(cached.type_name, 'Root')
+        self.assertIs(cached.keys['recursion']['type'], cached)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_invalidation(self):
+        parse_format(self.filename, self.cache_dir)
+        data = deepcopy(TestFormatCache.data)
+        data[0]['type_name'] = 'Changed'
+        with open(self.filename, 'w') as format_file:
+            json.dump(data, format_file)
+        its = parse_format(self.filename, self.cache_dir)
+        self.assertEqual(its.type_name, 'Changed')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_corrupted_cache(self):
+        parse_format(self.filename, self.cache_dir)
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), 'wb') as cache_file:
+                cache_file.write(b'corrupted')
+        its = parse_format(self.filename, self.cache_dir)
+        self.assertEqual(its.type_name, 'Root')
@@ -6,8 +6,9 @@ Tests for model data structure.
 """
 
 import unittest
+from unittest.mock import Mock
 
-from .model import DataNode
+from .model import DataNode, LazyDataNode, NumericArrayNode
 
 
 class TestDataNode(unittest.TestCase):
@@ -137,3 +138,255 @@ class TestDataNode(unittest.TestCase):
             data.get('/invalid_key')
             data.get('/problem/invalid_key')
 
+    def test_path_cache(self):
+        raw = {
+            'a': {'x': [1, 2]},
+            'b': {}
+        }
+        data = DataNode(raw)
+        node = data.get('/a/x/1')
+        self.assertEqual(node.path, '/a/x/1')
+
+        # move subtree, cached paths are invalidated
+        moved = data.value['a'].value['x']
+        data.value['b'].value['y'] = data.value['b']._create_child_node(
+            moved, 'y')
+        self.assertEqual(moved.path, '/b/y')
+        self.assertEqual(node.path, '/b/y/1')
+
+    def test_path_index(self):
+        raw = {
+            'problem': {
+                'one': 1,
+                'three': [{'a': 2}, {'a': 3}]
+            },
+            'data': [True, False]
+        }
+        data = DataNode(raw)
+        index = data.build_path_index()
+        self.assertIs(index['/problem/three/1/a'], data.get('/problem/three/1/a'))
+        self.assertEqual(data.get('/problem/three/1/a').value, 3)
+        self.assertEqual(data.get('problem/three/0/a').value, 2)
+
+        problem = data.get('/problem')
+        self.assertEqual(problem.get('/problem/one').value, 1)
+        self.assertEqual(problem.get('three/0/a').value, 2)
+        self.assertEqual(problem.get('../data/0').value, True)
+        with self.assertRaises(LookupError):
+            problem.get('/data')
+            data.get('/invalid_key')
+
+        # created and moved nodes are registered
+        three = data.value['problem'].value['three']
+        three.value.append(three._create_child_node({'a': 4}, 2))
+        self.assertEqual(index['/problem/three/2/a'].value, 4)
+        data.value['moved'] = data._create_child_node(three, 'moved')
+        self.assertNotIn('/problem/three/0', index)
+        self.assertEqual(data.get('/moved/2/a').value, 4)
+
+        data.drop_path_index()
+        self.assertEqual(data.get('/moved/1/a').value, 3)
+
+    def test_track_changes(self):
+        raw = {
+            'a': {'x': [1, 2]},
+            'b': {'y': 3}
+        }
+        data = DataNode(raw)
+        with self.assertRaises(ValueError):
+            data.pop_changes()
+        data.track_changes()
+        self.assertEqual(data.pop_changes(), set())
+
+        y = data.get('/b/y')
+        y.value = 4
+        b = data.get('/b')
+        b.value['z'] = b._create_child_node([5], 'z')
+        self.assertEqual(data.pop_changes(), {y, b})
+        self.assertEqual(data.pop_changes(), set())
+
+        # tracking is combined with the path index
+        index = data.build_path_index()
+        data.get('/b/z/0').value = 6
+        self.assertEqual(data.pop_changes(), {index['/b/z/0']})
+        data.drop_change_tracking()
+        self.assertIs(data.get('/a/x/1'), index['/a/x/1'])
+        with self.assertRaises(ValueError):
+            data.pop_changes()
+
+    def test_subtree_hash(self):
+        raw = {
+            'a': {'x': [1, 2.0, 'x'], 'y': None},
+            'b': {'y': None, 'x': [1, 2.0, 'x']},
+            'c': {'x': [1, 2, 'x'], 'y': None},
+            'd': {'x': [True, 2.0, 'x'], 'y': None}
+        }
+        data = DataNode(raw)
+        a, b, c, d = (data.get(key).subtree_hash() for key in 'abcd')
+        self.assertEqual(len(a), 16)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertNotEqual(a, d)
+
+        # references and typed buffers hash as their values
+        data.value['e'] = data._create_child_node(None, 'e')
+        data.value['e'].ref = data.value['a']
+        self.assertEqual(data.get('e').subtree_hash(), a)
+        numbers = list(range(NumericArrayNode.MIN_LENGTH))
+        buffered = DataNode({'n': numbers}).get('n')
+        self.assertIsNotNone(buffered.buffer)
+        expected = buffered.subtree_hash()
+        buffered.value  # materialize the items
+        self.assertEqual(buffered.subtree_hash(), expected)
+
+    def test_hash_cache(self):
+        data = DataNode({'a': {'x': [1, 2]}, 'b': {'x': [1, 2]}})
+        data.build_hash_cache()
+        before = data.subtree_hash()
+        hashes = data._tree.hashes
+        self.assertIn(data.get('/a/x'), hashes)
+        data.get('/a/x/0').value = 3
+        self.assertNotIn(data.get('/a/x'), hashes)
+        self.assertNotIn(data, hashes)
+        self.assertIn(data.get('/b/x'), hashes)
+        self.assertNotEqual(data.subtree_hash(), before)
+        self.assertEqual(data.get('/a/x').subtree_hash(),
+                         DataNode([3, 2]).subtree_hash())
+        data.drop_hash_cache()
+        self.assertIsNone(data._tree)
+
+    def test_lazy_changes(self):
+        data = LazyDataNode({'a': {'x': 1}})
+        data.track_changes()
+        x = data.get('/a/x')  # materialization is not a change
+        self.assertEqual(data.pop_changes(), set())
+        x.value = 2
+        self.assertEqual(data.pop_changes(), {x})
+
+
+class TestAnnotation(unittest.TestCase):
+
+    its_int = Mock(input_type='Integer')
+    its_string = Mock(input_type='String')
+    its_array = Mock(input_type='Array', subtype=its_int)
+    its_a = Mock(input_type='Record', type_name='A',
+                 keys={'TYPE': {'type': its_string}, 'x': {'type': its_int}})
+    its_b = Mock(input_type='Record', type_name='B',
+                 keys={'TYPE': {'type': its_string}, 'y': {'type': its_array}})
+    its_abstract = Mock(spec=['input_type', 'implementations',
+                              'default_descendant'],
+                        input_type='AbstractRecord',
+                        implementations={'A': its_a, 'B': its_b},
+                        default_descendant=its_a)
+    its_root = Mock(input_type='Record', type_name='Root', keys={
+        'first': {'type': its_abstract},
+        'second': {'type': its_abstract},
+        'items': {'type': its_array}})
+
+    raw = {
+        'first': {'TYPE': 'B', 'y': [1, 2]},
+        'second': {'x': 3},
+        'items': list(range(NumericArrayNode.MIN_LENGTH)),
+        'unknown': {'z': 1}}
+
+    def test_annotate(self):
+        data = DataNode(self.raw)
+        self.assertIsNone(data.its)
+        data.annotate(self.its_root)
+        self.assertIs(data.its, self.its_root)
+        self.assertIs(data.get('/first').its, self.its_b)
+        self.assertIs(data.get('/first/TYPE').its, self.its_string)
+        self.assertIs(data.get('/first/y').its, self.its_array)
+        self.assertIs(data.get('/first/y/1').its, self.its_int)
+        self.assertIs(data.get('/second').its, self.its_a)  # default descendant
+        self.assertIsNone(data.get('/unknown').its)
+        self.assertIsNone(data.get('/unknown/z').its)
+
+        # items of typed buffers are annotated when they are created
+        self.assertIsNotNone(data.value['items'].buffer)
+        self.assertIs(data.get('/items/5').its, self.its_int)
+
+    def test_annotated_construction(self):
+        for node_class in (DataNode, LazyDataNode):
+            data = node_class(self.raw, its=self.its_root)
+            self.assertIs(data.its, self.its_root)
+            self.assertIs(data.get('/first').its, self.its_b)
+            self.assertIs(data.get('/first/y/1').its, self.its_int)
+            self.assertIs(data.get('/second').its, self.its_a)
+            self.assertIsNone(data.get('/unknown').its)
+            self.assertIsNone(data.get('/unknown/z').its)
+            self.assertIs(data.value['items'].its, self.its_array)
+            self.assertIs(data.get('/items/5').its, self.its_int)
+
+    def test_annotate_lazy(self):
+        data = LazyDataNode(self.raw)
+        data.annotate(self.its_root)
+        self.assertIsNotNone(data._data)  # annotating does not materialize
+        self.assertIs(data.get('/first/y/0').its, self.its_int)
+        self.assertIs(data.get('/items/0').its, self.its_int)
+
+    def test_annotate_ref(self):
+        data = DataNode({'first': {'TYPE': 'A', 'x': 1}, 'second': {}})
+        data.value['second'].ref = data.value['first']
+        data.annotate(self.its_root)
+        self.assertIs(data.get('/second').its, self.its_a)
+        self.assertIs(data.get('/first/x').its, self.its_int)
+
+
+class TestLazyDataNode(unittest.TestCase):
+
+    def test_lazy(self):
+        raw = {
+            'problem': {
+                'mesh': {'mesh_file': 'mesh.msh'},
+                'three': [{'a': 2}, {'a': 3}]
+            },
+            'data': [True, False]
+        }
+        data = LazyDataNode(raw)
+        self.assertEqual(data.get('/problem/mesh/mesh_file').value, 'mesh.msh')
+        self.assertEqual(data.get('/problem/mesh/mesh_file').path,
+                         '/problem/mesh/mesh_file')
+        self.assertIsInstance(data.get('/problem/mesh'), LazyDataNode)
+
+        # untouched subtrees are not constructed
+        self.assertIsNotNone(data.value['data']._data)
+        self.assertIsNotNone(data.value['problem'].value['three']._data)
+
+        self.assertEqual(data.get('/problem/three/1/a').value, 3)
+        self.assertEqual(data.get('/problem/three/1/..').path,
+                         '/problem/three')
+        self.assertEqual(data.value['data'].value[1].value, False)
+
+    def test_lazy_value(self):
+        data = LazyDataNode({'a': [1, 2], 'b': None})
+        data.value['b'].ref = data.value['a']
+        self.assertEqual(data.get('/b/1').value, 2)
+
+        data.value['a'].value = [3]
+        self.assertEqual(data.value['a'].value, [3])
+        self.assertEqual(data.value['b'].value, [3])
+
+
+class TestNumericArrayNode(unittest.TestCase):
+
+    def test_buffer(self):
+        length = NumericArrayNode.MIN_LENGTH
+        data = DataNode({
+            'ints': list(range(length)),
+            'floats': [0.5] * length,
+            'mixed': [1, 0.5] * length,
+            'short': [1, 2]})
+        self.assertEqual(data.value['ints'].buffer.typecode, 'q')
+        self.assertEqual(data.value['floats'].buffer.typecode, 'd')
+        self.assertNotIsInstance(data.value['mixed'], NumericArrayNode)
+        self.assertNotIsInstance(data.value['short'], NumericArrayNode)
+
+        node = data.value['ints']
+        self.assertEqual(data.get('/ints/3').value, 3)
+        self.assertIsInstance(data.get('/ints/3').value, int)
+        self.assertEqual(data.get('/ints/3').path, '/ints/3')
+        self.assertIsNone(node.buffer)
+        self.assertEqual(len(node.value), length)
+
+        self.assertIsInstance(data.value['floats'].value[0].value, float)
@@ -5,8 +5,14 @@ Tests for parser module.
 @author: Tomas Krizek
 """
 
+import os
 import unittest
+from unittest.mock import Mock
 from . import parser
+from .format import parse_format
+from .model import NumericArrayNode
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
 
 
 class TestConFileHandler(unittest.TestCase):
@@ -77,3 +83,193 @@ class TestConFileHandler(unittest.TestCase):
 
         self.assertEqual(root.get('/a/y')._ref, root.get('/b'))
 
+    def test_reference_chain(self):
+        raw = {
+            'a': {'REF': '/b/y'},
+            'b': {'REF': '/c'},
+            'c': {'REF': '/d'},
+            'd': {'x': 3, 'y': {'REF': '../x'}}
+        }
+        root = parser._resolve_references(raw)
+
+        self.assertEqual(root.get('/a').value, 3)
+        self.assertEqual(root.get('/b/x').value, 3)
+        self.assertEqual(root.get('/a').ref, root.get('/d/y'))
+
+    def test_reference_cycle(self):
+        raw = {
+            'a': {'REF': '/b'},
+            'b': {'REF': '/c/x'},
+            'c': {'REF': '/a'},
+            'd': {'REF': '/a'}
+        }
+
+        with self.assertRaisesRegex(parser.RefError, 'Circular') as context:
+            parser._resolve_references(raw)
+        message = str(context.exception)
+        for path in ['/a', '/b', '/c']:
+            self.assertIn(path, message)
+        self.assertNotIn('/d', message)
+
+    def test_missing_reference(self):
+        raw = {
+            'a': {'REF': '/b/x'},
+            'b': {'y': 1}
+        }
+
+        with self.assertRaisesRegex(parser.RefError, '/a -> /b/x'):
+            parser._resolve_references(raw)
+
+    def test_lazy_references(self):
+        raw = {
+            'a': {'x': 0, 'y': {'REF': '/b/y'}},
+            'b': {'REF': '/d'},
+            'd': {'x': 3, 'y': 5},
+            'e': {'f': [1, 2, 3]}
+        }
+        root = parser._resolve_references(raw, lazy=True)
+
+        self.assertIsInstance(root, parser.LazyDataNode)
+        self.assertEqual(root.get('/a/y').value, 5)
+        self.assertEqual(root.get('/b/x').value, 3)
+        self.assertIsNotNone(root.value['e']._data)
+        self.assertEqual(root.get('/e/f/2').value, 3)
+
+    def test_annotated(self):
+        its = parse_format(os.path.join(DATA_DIR, 'format', '1.8.2.json'))
+        filename = os.path.join(DATA_DIR, 'con', 'flow_dirichlet.con')
+        for lazy in (False, True):
+            root = parser.parse_con(filename, lazy=lazy, its=its)
+            self.assertIs(root.its, its)
+            problem = root.get('/problem')
+            self.assertEqual(problem.its.input_type, 'Record')
+            self.assertEqual(problem.its.type_name, 'SequentialCoupling')
+            self.assertEqual(problem.its,
+                             its.keys['problem']['type'].implementations[
+                                 'SequentialCoupling'])
+            self.assertEqual(root.get('/problem/mesh/mesh_file').its.input_type,
+                             'FileName')
+
+        root = parser.parse_con(filename)
+        self.assertIsNone(root.get('/problem').its)
+
+        # annotations made while building are equal to annotate()
+        with open(filename) as con_file:
+            con = con_file.read()
+        root.annotate(its)
+        built = parser.parse_con_string(con, its=its)
+        nodes = [(root, built)]
+        while nodes:
+            node, built_node = nodes.pop()
+            self.assertIs(built_node.its, node.its, node.path)
+            value = node.value if node.ref is None else None
+            if isinstance(value, dict):
+                nodes.extend((child, built_node.value[key])
+                             for key, child in value.items())
+            elif isinstance(value, list):
+                nodes.extend(zip(value, built_node.value))
+
+    def test_annotated_refs(self):
+        its_a = Mock(input_type='Record', keys={'TYPE': {'type': Mock()}})
+        its_b = Mock(input_type='Record', keys={'TYPE': {'type': Mock()}})
+        its_abstract = Mock(spec=['input_type', 'implementations',
+                                  'default_descendant'],
+                            input_type='AbstractRecord',
+                            implementations={'A': its_a, 'B': its_b},
+                            default_descendant=its_a)
+        its = Mock(input_type='Record', keys={
+            'first': {'type': its_abstract}, 'second': {'type': its_abstract}})
+        # the implementation is selected by the referred record
+        root = parser.parse_con_string(
+            '{ first = { TYPE = "B" }, second = { REF = "/first" } }', its=its)
+        self.assertIs(root.get('/second').its, its_b)
+        self.assertIs(root.get('/first').its, its_b)
+
+
+class TestYaml(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import yaml
+        except ImportError:
+            self.skipTest('PyYAML is not installed')
+
+    def test_aliases(self):
+        text = '\n'.join([
+            'a: &x {b: 1, c: [1, 2]}',
+            'd: *x',
+            'e: !Foo {f: 2.5, g: null, h: true}',
+            'i: [&y 5, {REF: /a/b}, *y]',
+            'long: [{0}]'.format(', '.join(['&z 0'] + ['1'] * 40)),
+            'item: *z'])
+        root = parser.parse_yaml_string(text)
+        self.assertIs(root.get('/d').ref, root.get('/a'))
+        self.assertEqual(root.get('/d/c/1').value, 2)
+        self.assertEqual(root.get('/e/TYPE').value, 'Foo')
+        self.assertEqual(root.get('/e/f').value, 2.5)
+        self.assertIsNone(root.get('/e/g').value)
+        self.assertIs(root.get('/e/h').value, True)
+        self.assertIs(root.get('/i/2').ref, root.get('/i/0'))
+        self.assertIs(root.get('/i/1').ref, root.get('/a/b'))
+        self.assertIsInstance(root.value['long'], NumericArrayNode)
+        self.assertIs(root.get('/item').ref, root.get('/long/0'))
+
+        with self.assertRaisesRegex(parser.RefError, 'Circular'):
+            parser.parse_yaml_string('a: &x {b: *x}')
+
+    def test_annotated(self):
+        its_b = Mock(input_type='Record', keys={'TYPE': {'type': Mock()}})
+        its_abstract = Mock(spec=['input_type', 'implementations',
+                                  'default_descendant'],
+                            input_type='AbstractRecord',
+                            implementations={'A': Mock(), 'B': its_b},
+                            default_descendant=None)
+        its_array = Mock(input_type='Array', subtype=its_abstract)
+        its = Mock(input_type='Record', keys={'items': {'type': its_array}})
+        root = parser.parse_yaml_string('items: [&b !B {}, *b, {TYPE: B}]',
+                                        its=its)
+        self.assertIs(root.get('/items').its, its_array)
+        for i in range(3):
+            self.assertIs(root.get('/items/{0}'.format(i)).its, its_b)
+        self.assertIs(root.get('/items/0/TYPE').its,
+                      its_b.keys['TYPE']['type'])
+
+    def test_merge_keys(self):
+        text = '\n'.join([
+            'base: &b {x: 1, y: 2}',
+            'der: {<<: *b, y: 3}',
+            'multi: {<<: [*b, {z: 4}], w: 5}',
+            '1: intkey'])
+        root = parser.parse_yaml_string(text)
+        self.assertEqual(sorted(root.get('/der').value), ['x', 'y'])
+        self.assertEqual(root.get('/der/x').value, 1)
+        self.assertEqual(root.get('/der/y').value, 3)
+        self.assertIs(root.get('/der/x').ref, root.get('/base/x'))
+        self.assertEqual({key: node.value
+                          for key, node in root.get('/multi').value.items()},
+                         {'x': 1, 'y': 2, 'z': 4, 'w': 5})
+        self.assertEqual(root.get('/1').value, 'intkey')  # keys are strings
+
+    def test_same_tree(self):
+        import tempfile
+        con = os.path.join(DATA_DIR, 'con', 'flow_dirichlet.con')
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'flow.yaml')
+            parser.con_to_yaml(con, filename)
+            root = parser.parse_yaml(filename)
+        self.assertEqual(root.subtree_hash(), parser.parse_con(con).subtree_hash())
+
+        con_root = parser.parse_con_string('{a = {b = 1}, c = {REF = "/a"}}')
+        yaml_root = parser.parse_yaml_string('a: &a {b: 1}\nc: *a')
+        self.assertEqual(yaml_root.subtree_hash(), con_root.subtree_hash())
+        self.assertIs(yaml_root.get('/c').ref, yaml_root.get('/a'))
+
+    def test_con_to_yaml_quoting(self):
+        import io
+        import yaml
+        from .yaml_codec import encode_yaml
+        data = {'a': ['1', 1, '1.5', 1.5, 'true', True, '', None, 'null'],
+                'b': {'c': float('inf'), 'd': 'text: with colon'}, 'e': []}
+        stream = io.StringIO()
+        encode_yaml(data, stream)
+        self.assertEqual(yaml.safe_load(stream.getvalue()), data)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for profiling of configuration file processing.
+
+@author: Tomas Krizek
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from .format import parse_format
+from .profiling import profile_file, Profile
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'input.con')
+        with open(self.input, 'w') as file_:
+            file_.write('{ count = 1, items = [1, 5], copy = { REF = "/items" } }')
+        format_file = os.path.join(self.directory.name, 'format.json')
+        with open(format_file, 'w') as file_:
+            file_.write('[{"id": "root", "input_type": "Record", '
+                        '"type_name": "Root", "keys": ['
+                        '{"key": "count", "type": "int"}, '
+                        '{"key": "items", "type": "array"}]}, '
+                        '{"id": "int", "input_type": "Integer", "range": [0, 3]}, '
+                        '{"id": "array", "input_type": "Array", "subtype": "int"}]')
+        self.its = parse_format(format_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_profile_file(self):
+        profile, validator = profile_file(self.input, self.its)
+        self.assertEqual(validator.valid, False)
+        phases = {record['name']: record for record in profile.phases}
+        self.assertEqual(list(phases), ['read', 'decode', 'build', 'resolve',
+                                        'autoconvert', 'validate'])
+        self.assertEqual(phases['build']['references'], 1)
+        self.assertEqual(phases['build']['nodes'], 6)
+        self.assertEqual(phases['validate']['nodes'], 5)
+        self.assertEqual(phases['validate']['errors'], 1)
+        self.assertNotIn('peak_memory', phases['decode'])
+
+        types = {item['type']: item for item in profile.to_dict()['types']}
+        self.assertEqual(types['Integer']['calls'], 3)
+        self.assertEqual(types['Record Root']['calls'], 1)
+        self.assertGreaterEqual(types['Record Root']['time'],
+                                types['Record Root']['own_time'])
+        self.assertEqual(json.loads(profile.to_json())['phases'][0]['name'],
+                         'read')
+        self.assertIn('Record Root', profile.to_text())
+
+    def test_memory(self):
+        profile, validator = profile_file(self.input, self.its, memory=True)
+        for record in profile.phases:
+            self.assertGreaterEqual(record['peak_memory'], 0)
+
+    def test_phase(self):
+        profile = Profile()
+        with profile.phase('custom') as record:
+            record['nodes'] = 3
+        self.assertEqual(profile.phases[0]['nodes'], 3)
+        self.assertGreaterEqual(profile.total_time, 0)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the validation result cache.
+
+@author: Tomas Krizek
+"""
+
+import os
+import tempfile
+import unittest
+
+from . import batch
+from .format import parse_format
+from .results import ResultCache, clear_results
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.input = os.path.join(self.directory.name, 'input.con')
+        self.format = os.path.join(self.directory.name, 'format.json')
+        self._write(self.input, '{ count = "x" }')
+        self._write(self.format,
+                    '[{"id": "root", "input_type": "Record", '
+                    '"type_name": "Root", "keys": '
+                    '[{"key": "count", "type": "int"}]}, '
+                    '{"id": "int", "input_type": "Integer"}]')
+        self.its = parse_format(self.format)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, filename, content):
+        with open(filename, 'w') as file_:
+            file_.write(content)
+
+    def _validate(self, options=()):
+        results = ResultCache(self.cache_dir, self.format, options)
+        return batch.validate_file(self.input, self.its, results=results)
+
+    def test_cache(self):
+        result = self._validate()
+        self.assertEqual(result.cached, False)
+        cached = self._validate()
+        self.assertEqual(cached.cached, True)
+        self.assertEqual(cached.filename, self.input)
+        self.assertEqual(cached.valid, False)
+        self.assertEqual(cached.console_log, result.console_log)
+
+        # files with equal content share the result
+        other = os.path.join(self.directory.name, 'other.con')
+        self._write(other, '{ count = "x" }')
+        results = ResultCache(self.cache_dir, self.format)
+        self.assertEqual(batch.validate_file(other, self.its,
+                                             results=results).cached, True)
+
+    def test_invalidation(self):
+        self._validate()
+        self._write(self.input, '{ count = 1 }')
+        result = self._validate()
+        self.assertEqual(result.cached, False)
+        self.assertEqual(result.valid, True)
+
+        self.assertEqual(self._validate(options=(1, False)).cached, False)
+        self._write(self.format, '[{"id": "root", "input_type": "Record", '
+                                 '"type_name": "Root", "keys": []}]')
+        self.assertEqual(self._validate().cached, False)
+
+    def test_clear(self):
+        self._validate()
+        clear_results(self.cache_dir)
+        self.assertEqual(self._validate().cached, False)
+
+        results = ResultCache(self.cache_dir, self.format)
+        for name in os.listdir(results.directory):
+            self._write(os.path.join(results.directory, name), 'corrupted')
+        self.assertEqual(self._validate().cached, False)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the watch mode.
+
+@author: Tomas Krizek
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from . import watch
+
+FORMAT = ('[{{"id": "root", "input_type": "Record", "type_name": "Root", '
+          '"keys": [{{"key": "a", "type": "array"}}, {{"key": "b", "type": "int"}}]}}, '
+          '{{"id": "array", "input_type": "Array", "subtype": "int"}}, '
+          '{{"id": "int", "input_type": "Integer", "range": [0, {max}]}}]')
+
+
+class TestWatchSession(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.format = self._write('format.json', FORMAT.format(max=3))
+        self.input = self._write('input.con', '{ a = [1, 2], b = 1 }')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, name, content):
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, 'w') as file_:
+            file_.write(content)
+        return filename
+
+    def test_validate(self):
+        session = watch.WatchSession(self.input, self.format)
+        self.assertEqual(session.validate(), ['VALID'])
+        self.assertIsNone(session.validate())  # nothing changed
+
+        self._write('input.con', '{ a = [1, 2], b = 5 }')
+        self.assertEqual(session.validate(), [
+            'INVALID (1 errors)', '+ /b: Expected value smaller or equal to 3'])
+        self._write('input.con', '{ a = [1, 7], b = 5 }')
+        self.assertEqual(session.validate(), [
+            'INVALID (2 errors)', '+ /a/1: Expected value smaller or equal to 3'])
+        self._write('input.con', '{ a = [1, 7], b = 2 }')
+        self.assertEqual(session.validate(), [
+            'INVALID (1 errors)', '- /b: Expected value smaller or equal to 3'])
+        self.assertGreater(session.cache.hits, 0)
+
+        self._write('format.json', FORMAT.format(max=10))
+        self.assertEqual(session.validate(), [
+            'VALID', '- /a/1: Expected value smaller or equal to 3'])
+
+    def test_failures(self):
+        session = watch.WatchSession(self.input, self.format)
+        session.validate()
+        self._write('input.con', '{ a = ')
+        report = session.validate()
+        self.assertEqual(report[0], 'INVALID (1 errors)')
+        os.remove(self.input)
+        self.assertIn('No such file', session.validate()[-1])
+
+    def test_format_failures(self):
+        session = watch.WatchSession(self.input, self.format)
+        self.assertEqual(session.validate(), ['VALID'])
+        plan = session._plan
+
+        self._write('format.json', FORMAT.format(max=3)[:-10])
+        report = session.validate()
+        self.assertEqual(report[0], 'INVALID (1 errors)')
+        self.assertTrue(report[1].startswith('+ Format '))
+        self.assertIs(session._plan, plan)
+        self.assertIsNone(session.validate())  # nothing changed
+
+        os.remove(self.format)
+        report = session.validate()
+        self.assertIn('No such file', report[-1])
+
+        self._write('format.json', FORMAT.format(max=1))
+        report = session.validate()
+        self.assertEqual(report[0], 'INVALID (1 errors)')
+        self.assertIn('+ /a/1: Expected value smaller or equal to 1', report)
+
+    def _check_watcher(self, watcher):
+        self.assertEqual(watcher.wait(0.01), set())
+        start = time.monotonic()
+        thread = threading.Timer(0.05, self._write,
+                                 ('input.con', '{ a = [], b = 2 }'))
+        thread.start()
+        try:
+            changed = watcher.wait(2)
+        finally:
+            thread.join()
+            watcher.close()
+        self.assertEqual(changed, {os.path.abspath(self.input)})
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_polling_watcher(self):
+        self._check_watcher(watch.PollingWatcher([self.input, self.format]))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = watch.InotifyWatcher([self.input, self.format])
+        except OSError:
+            self.skipTest('inotify is not available')
+        self._check_watcher(watcher)
+
+        # editors which save by replacing the file
+        watcher = watch.InotifyWatcher([self.input])
+        replacement = self._write('input.con~', '{ b = 1 }')
+        os.replace(replacement, self.input)
+        self.assertEqual(watcher.wait(1), {os.path.abspath(self.input)})
+        watcher.close()
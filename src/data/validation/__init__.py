@@ -1,2 +1,33 @@
-from .validator import Validator
-from .errors import ValidationError
\ No newline at end of file
+"""
+GeoMop validation of configuration data
+
+The public names are imported from their modules on first use (see the
+data package).
+"""
+
+import importlib
+
+_EXPORTS = {
+    'Validator': 'validator',
+    'ValidationError': 'errors',
+    'compile_plan': 'plan',
+    'IncrementalValidator': 'incremental',
+    'ValidationCache': 'cache',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError("module {module!r} has no attribute {name!r}".format(
+            module=__name__, name=name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop Model
+Cache of validation results of subtrees
+
+Validation of a subtree depends only on its structure and its ITS. The
+cache maps a structural hash of a subtree (DataNode.subtree_hash) and an
+ITS to the errors found in the subtree, so that identical subtrees within
+a file and across files are validated once. Errors are stored with paths
+relative to the subtree.
+
+@author: Tomas Krizek
+"""
+
+
+class ValidationCache:
+    """Validation results of subtrees keyed by (subtree hash, ITS id)."""
+
+    def __init__(self):
+        self._results = {}
+        self._its = {}  # keeps ITS alive, so their ids are not reused
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, digest, its, autoconvert=False):
+        """
+        Returns the result of a subtree, or None if it is not cached. The
+        result is a pair of a list of (relative keys, error record) and
+        a flag whether auto-conversion changed the subtree.
+        """
+        try:
+            result = self._results[digest, id(its), autoconvert]
+        except KeyError:
+            self.misses = self.misses + 1
+            return None
+        self.hits = self.hits + 1
+        return result
+
+    def put(self, digest, its, autoconvert, errors, converted):
+        """Stores the result of a subtree."""
+        self._its[id(its)] = its
+        self._results[digest, id(its), autoconvert] = (errors, converted)
+
+    def clear(self):
+        """Removes all results."""
+        self._results.clear()
+        self._its.clear()
+        self.hits = 0
+        self.misses = 0
@@ -5,73 +5,158 @@ Basic rules for data validation
 @author: Tomas Krizek
 """
 
+from array import array
+
 from . import errors
 
 
 def check_integer(value, its):
+    return _check(verify_integer(value, its))
+
+
+def check_double(value, its):
+    return _check(verify_double(value, its))
+
+
+def check_bool(value, its):
+    return _check(verify_bool(value, its))
+
+
+def check_string(value, its):
+    return _check(verify_string(value, its))
+
+
+def check_selection(value, its):
+    return _check(verify_selection(value, its))
+
+
+def check_filename(value, its):
+    """
+    Placeholder for FileName validation.
+    """
+    return check_string(value, its)
+
+
+def check_array(value, its):
+    return _check(verify_array(value, its))
+
+
+def _check(error):
+    """Raises the error of an error record, returns True if there is none."""
+    if error is not None:
+        error_class, args = error
+        raise error_class(*args)
+    return True
+
+
+# Exception-free checks. Instead of raising an error, they return an error
+# record (error class, arguments), or None if the value is valid. The
+# exception (and its message) is only created when the error is rendered.
+
+NOT_INTEGER = (errors.ValidationTypeError, ("Expecting type Integer",))
+NOT_DOUBLE = (errors.ValidationTypeError, ("Expecting type Double",))
+NOT_BOOL = (errors.ValidationTypeError, ("Expecting type Bool",))
+NOT_STRING = (errors.ValidationTypeError, ("Expecting type String",))
+NOT_ARRAY = (errors.ValidationTypeError, ("Expecting type Array",))
+
+
+def verify_integer(value, its):
     if not isinstance(value, int):
-        raise errors.ValidationTypeError("Expecting type Integer")
+        return NOT_INTEGER
 
     if (value < its.min):
-        raise errors.ValueTooSmall(its.min)
+        return (errors.ValueTooSmall, (its.min,))
 
     if (value > its.max):
-        raise errors.ValueTooBig(its.max)
+        return (errors.ValueTooBig, (its.max,))
 
-    return True
+    return None
 
 
-def check_double(value, its):
+def verify_double(value, its):
     if not isinstance(value, (int, float)):
-        raise errors.ValidationTypeError("Expecting type Double")
+        return NOT_DOUBLE
 
     if (value < its.min):
-        raise errors.ValueTooSmall(its.min)
+        return (errors.ValueTooSmall, (its.min,))
 
     if (value > its.max):
-        raise errors.ValueTooBig(its.max)
+        return (errors.ValueTooBig, (its.max,))
 
-    return True
+    return None
 
 
-def check_bool(value, its):
+def verify_bool(value, its):
     if not isinstance(value, bool):
-        raise errors.ValidationTypeError("Expecting type Bool")
+        return NOT_BOOL
 
-    return True
+    return None
 
 
-def check_string(value, its):
+def verify_string(value, its):
     if not isinstance(value, str):
-        raise errors.ValidationTypeError("Expecting type String")
+        return NOT_STRING
 
-    return True
+    return None
 
 
-def check_selection(value, its):
+def verify_selection(value, its):
     if (value in its.values):
-        return True
+        return None
     else:
-        raise errors.InvalidOption(value, its.name)
+        return (errors.InvalidOption, (value, its.name))
 
 
-def check_filename(value, its):
+def verify_filename(value, its):
     """
     Placeholder for FileName validation.
     """
-    return check_string(value, its)
+    return verify_string(value, its)
 
 
-def check_array(value, its):
-    if not isinstance(value, (list, str)):
-        raise errors.ValidationTypeError("Expecting type Array")
+def verify_array(value, its):
+    if not isinstance(value, (list, str, array)):
+        return NOT_ARRAY
 
     if len(value) < its.min:
-        raise errors.NotEnoughItems(its.min)
+        return (errors.NotEnoughItems, (its.min,))
     elif len(value) > its.max:
-        raise errors.TooManyItems(its.max)
+        return (errors.TooManyItems, (its.max,))
 
-    return True
+    return None
+
+
+def verify_integer_buffer(buffer, its):
+    """
+    Performs verify_integer on all items of a typed buffer at once.
+    Returns a list of (index, error record) of the invalid items.
+    """
+    if buffer.typecode != 'q':
+        return [(i, NOT_INTEGER) for i in range(len(buffer))]
+    return _verify_buffer_range(buffer, its)
+
+
+def verify_double_buffer(buffer, its):
+    """
+    Performs verify_double on all items of a typed buffer at once.
+    Returns a list of (index, error record) of the invalid items.
+    """
+    return _verify_buffer_range(buffer, its)
+
+
+def _verify_buffer_range(buffer, its):
+    # the bounds of the whole buffer are found without a Python loop
+    if not buffer or (min(buffer) >= its.min and max(buffer) <= its.max):
+        return []
+    too_small = (errors.ValueTooSmall, (its.min,))
+    too_big = (errors.ValueTooBig, (its.max,))
+    invalid = []
+    for i, value in enumerate(buffer):
+        if (value < its.min):
+            invalid.append((i, too_small))
+        elif (value > its.max):
+            invalid.append((i, too_big))
+    return invalid
 
 
 def check_record_key(record, key, its):
@@ -72,4 +72,11 @@ class InvalidAbstractRecordType(ValidationError):
         super(InvalidAbstractRecordType, self).__init__(message)
 
 
-
+class AggregatedError(ValidationError):
+    def __init__(self, error, parent, count):
+        self.error = error
+        self.parent = parent
+        self.count = count
+        message = "{error} (at {count} paths under {parent})".format(
+            error=error, count=count, parent=parent or '/')
+        super(AggregatedError, self).__init__(message)
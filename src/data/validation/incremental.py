@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop Model
+Incremental validation
+
+IncrementalValidator remembers the result of every validated node: its
+plan, location, errors and the results of its children. Changes of the
+tree are tracked by the nodes themselves (DataNode.track_changes), so after
+an edit only the changed subtrees are validated again.
+
+@author: Tomas Krizek
+"""
+
+from .validator import Validator
+from .sinks import format_path, render_log
+from .. import autoconverter
+
+
+class IncrementalValidator(Validator):
+    """
+    Validator which keeps per node results and revalidates only the
+    changed parts of a tree.
+
+    After autoconvert_and_validate(), changed nodes are auto-converted
+    when they are revalidated. Errors are kept in memory.
+    """
+
+    def __init__(self):
+        super(IncrementalValidator, self).__init__()
+        self._results = {}  # node -> list of its _Result
+        self._referrers = {}  # referred node -> set of referring nodes
+        self._current = None
+        self._rendered = None
+        self._converting = False  # auto-convert revalidated nodes
+
+    @property
+    def errors(self):
+        """Returns (path, error) pairs of the errors of all nodes."""
+        if self._rendered is None:
+            self._rendered = tuple(
+                (format_path(location), error_class(*args))
+                for results in self._results.values()
+                for result in results
+                if result.errors is not None
+                for location, (error_class, args) in result.errors)
+        return self._rendered
+
+    @property
+    def console_log(self):
+        return render_log(self.valid, self.errors)
+
+    def validate(self, node, its=None):
+        """
+        Performs full validation of node and starts tracking changes of
+        the tree.
+
+        Returns True when all data was correctly validated, False otherwise.
+        """
+        self._results = {}
+        self._referrers = {}
+        self._rendered = None
+        self._current = None
+        if node._tree is None or node._tree.changes is None:
+            node.track_changes()
+        else:
+            node.pop_changes()
+        self._converting = self._autoconvert
+        super(IncrementalValidator, self).validate(node, its)
+        node.pop_changes()  # conversions, which are validated already
+        self.valid = self.error_count == 0
+        return self.valid
+
+    def revalidate(self):
+        """
+        Validates the nodes changed since the last validation again.
+
+        Returns True when all data is correctly validated, False otherwise.
+        """
+        results = set()
+        for node in self.root_node.pop_changes():
+            results.update(self._affected_results(node))
+        # skip results whose ancestor is validated again anyway
+        for result in [result for result in results
+                       if result.parent is not None]:
+            parent = result.parent
+            while parent is not None and parent not in results:
+                parent = parent.parent
+            if parent is not None:
+                results.discard(result)
+        self._rendered = None
+        self._autoconvert = self._converting
+        try:
+            for result in results:
+                self._discard(result)
+                self._current = result.parent
+                node = result.node
+                if self._autoconvert and result.parent is not None:
+                    node = self._autoconverted(result)
+                self._validate_node(node, result.plan, result.location)
+                if result.parent is not None:
+                    result.parent.children.remove(result)
+        finally:
+            self._autoconvert = False
+        self._current = None
+        self.root_node.pop_changes()  # conversions, which are validated already
+        self.valid = self.error_count == 0
+        return self.valid
+
+    def _autoconverted(self, result):
+        """
+        Auto-converts the node of result and replaces it in its parent.
+        Returns the converted node.
+        """
+        node = result.node
+        converted = autoconverter._get_autoconverted(node, result.plan.its)
+        if converted is not node:
+            parent = result.parent.node
+            parent.value[result.location[1]] = converted
+            self._record_conversion(parent)
+        return converted
+
+    def _affected_results(self, node):
+        """Returns the results which have to be replaced after node changed."""
+        referrers = set(self._referrers.get(node, ()))
+        if node.name == 'TYPE' and node.parent is not None:
+            node = node.parent  # TYPE selects the record of an abstract record
+            referrers.update(self._referrers.get(node, ()))
+        while node is not None and node not in self._results:
+            node = node.parent
+        if node is None:
+            results = []
+        else:
+            results = list(self._results[node])
+        for referrer in referrers:
+            results.extend(self._affected_results(referrer))
+        return results
+
+    def _discard(self, result):
+        """Forgets result and the results of its descendants."""
+        results = [result]
+        while results:
+            result = results.pop()
+            if result.errors is not None:
+                self.error_count = self.error_count - len(result.errors)
+            node_results = self._results[result.node]
+            node_results.remove(result)
+            if not node_results:
+                del self._results[result.node]
+            if result.children is not None:
+                results.extend(result.children)
+
+    def _validate_node(self, node, its_plan, location=None):
+        parent = self._current
+        result = _Result(node, its_plan, location, parent)
+        try:
+            self._results[node].append(result)
+        except KeyError:
+            self._results[node] = [result]
+        if parent is not None:
+            if parent.children is None:
+                parent.children = [result]
+            else:
+                parent.children.append(result)
+        if node._ref is not None:
+            self._add_referrer(node)
+        self._current = result
+        Validator._validate_node(self, node, its_plan, location)
+        self._current = parent
+
+    def _add_referrer(self, node):
+        """Remembers node as a referrer of its referred node."""
+        target = node.ref
+        if target is not None:
+            while target.ref is not None:
+                target = target.ref
+            self._referrers.setdefault(target, set()).add(node)
+
+    def _report_error(self, location, error):
+        self.error_count = self.error_count + 1
+        result = self._current
+        if result.errors is None:
+            result.errors = [(location, error)]
+        else:
+            result.errors.append((location, error))
+
+
+class _Result:
+    """Result of the validation of a single node at a single location."""
+
+    __slots__ = ['node', 'plan', 'location', 'parent', 'errors', 'children']
+
+    def __init__(self, node, plan, location, parent):
+        self.node = node
+        self.plan = plan
+        self.location = location
+        self.parent = parent
+        self.errors = None
+        self.children = None
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop Model
+Compiled validation plans
+
+A validation plan is compiled once for every ITS reachable from the root
+ITS. It contains everything the validator would otherwise look up for each
+validated node: the verify function of scalar types, the keys of records
+with their obligatory flags and plans, and the plans of AbstractRecord
+implementations.
+
+@author: Tomas Krizek
+"""
+
+from . import checks
+
+SCALAR = ['Integer', 'Double', 'Bool', 'String', 'Selection', 'FileName']
+
+
+def compile_plan(its):
+    """
+    Returns the validation plan of its. Plans of all types reachable from
+    its are compiled as well.
+    """
+    return _PlanCompiler().compile(its)
+
+
+class TypePlan:
+    """
+    Validation plan of a single ITS.
+
+    Attributes depend on kind, which is one of 'scalar', 'record',
+    'abstract', 'array' or None for an unknown input_type:
+        verify - verify function of a scalar, called as verify(value, its)
+        verify_buffer - verify function of a typed buffer of numbers (or
+            None), called as verify_buffer(buffer, its)
+        keys - list of (key, plan, obligatory) of a record
+        implementations - record plans of an abstract record by type_name
+        default_descendant - record plan of an abstract record (or None)
+        subtype - plan of array items
+    """
+
+    __slots__ = ['its', 'kind', 'verify', 'verify_buffer', 'keys',
+                 'implementations', 'default_descendant', 'subtype']
+
+    def __init__(self, its):
+        self.its = its
+        self.kind = None
+        self.verify = None
+        self.verify_buffer = None
+        self.keys = None
+        self.implementations = None
+        self.default_descendant = None
+        self.subtype = None
+
+    def __repr__(self):
+        return 'TypePlan({its!r})'.format(its=self.its)
+
+
+class _PlanCompiler:
+    """Compiles plans of ITS, each ITS only once (formats are recursive)."""
+
+    def __init__(self):
+        self._plans = {}
+
+    def compile(self, its):
+        """Returns the plan of its."""
+        try:
+            return self._plans[id(its)]
+        except KeyError:
+            pass
+        plan = TypePlan(its)
+        self._plans[id(its)] = plan  # register before compiling children
+        input_type = its.input_type
+        if input_type in SCALAR:
+            plan.kind = 'scalar'
+            plan.verify = getattr(checks, 'verify_%s' % input_type.lower())
+            plan.verify_buffer = getattr(
+                checks, 'verify_%s_buffer' % input_type.lower(), None)
+        elif input_type == 'Record':
+            plan.kind = 'record'
+            plan.keys = [(key, self.compile(spec['type']), _is_obligatory(spec))
+                         for key, spec in its.keys.items()]
+        elif input_type == 'AbstractRecord':
+            plan.kind = 'abstract'
+            plan.implementations = {
+                type_name: self.compile(impl)
+                for type_name, impl in its.implementations.items()}
+            try:
+                default = its.default_descendant
+            except AttributeError:
+                pass
+            else:
+                plan.default_descendant = self.compile(default)
+        elif input_type == 'Array':
+            plan.kind = 'array'
+            plan.subtype = self.compile(its.subtype)
+        return plan
+
+
+def _is_obligatory(spec):
+    """Returns True if the key specification is obligatory."""
+    try:
+        return spec['default']['type'] == 'obligatory'
+    except KeyError:
+        return False
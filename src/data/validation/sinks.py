@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop Model
+Sinks of validation errors
+
+Validator reports every error to a sink as a (location, record) pair.
+Location is a linked (parent location, key) pair and record is an
+(error class, arguments) pair, so nothing is formatted while validating.
+CollectingSink keeps the errors for later inspection, StreamSink writes
+them out as they occur and AggregatingSink merges errors repeated across
+the items of an array.
+
+@author: Tomas Krizek
+"""
+
+import abc
+
+from .errors import AggregatedError
+
+
+class ErrorSink(abc.ABC):
+    """Base class of error sinks. Subclasses have to implement report."""
+
+    def open(self):
+        """Called before a validation starts."""
+        pass
+
+    @abc.abstractmethod
+    def report(self, location, record):
+        """Called for every occured error."""
+
+    def close(self):
+        """Called after a validation is finished (or terminated)."""
+        pass
+
+    @property
+    def errors(self):
+        """Returns (path, error) pairs of the kept errors."""
+        return ()
+
+
+class CollectingSink(ErrorSink):
+    """Keeps all errors in memory. Errors are rendered on first access."""
+
+    def __init__(self):
+        self._records = []
+        self._rendered = None
+
+    def open(self):
+        self._records = []
+        self._rendered = None
+
+    def report(self, location, record):
+        self._records.append((location, record))
+
+    @property
+    def errors(self):
+        if self._rendered is None:
+            self._rendered = tuple(
+                (format_path(location), error_class(*args))
+                for location, (error_class, args) in reversed(self._records))
+        return self._rendered
+
+
+class StreamSink(ErrorSink):
+    """
+    Writes every error to stream as soon as it occurs. Errors are not
+    kept in memory.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def report(self, location, record):
+        error_class, args = record
+        self.stream.write(_render_line(format_path(location), error_class(*args)))
+
+    def close(self):
+        self.stream.flush()
+
+
+class AggregatingSink(CollectingSink):
+    """
+    Keeps a single error for equal errors of items of the same array.
+    Such error is rendered with the path of the array, e.g.
+    '/a/b/*: Expecting type Integer (at 12000 paths under /a/b)'.
+    """
+
+    def open(self):
+        super(AggregatingSink, self).open()
+        self._groups = {}
+
+    def report(self, location, record):
+        if location is not None and type(location[1]) is int:
+            try:
+                group = self._groups[id(location[0]), record]
+            except KeyError:
+                pass
+            except TypeError:  # unhashable arguments are not aggregated
+                super(AggregatingSink, self).report(location, record)
+                return
+            else:
+                group[1] = group[1] + 1
+                return
+            group = [location, 1]
+            self._groups[id(location[0]), record] = group
+            self._records.append((group, record))
+            return
+        super(AggregatingSink, self).report(location, record)
+
+    @property
+    def errors(self):
+        if self._rendered is None:
+            errors = []
+            for location, (error_class, args) in reversed(self._records):
+                error = error_class(*args)
+                if type(location) is list:
+                    location, count = location
+                    if count > 1:
+                        error = AggregatedError(error, format_path(location[0]), count)
+                        errors.append((error.parent + '/*', error))
+                        continue
+                errors.append((format_path(location), error))
+            self._rendered = tuple(errors)
+        return self._rendered
+
+
+def render_log(valid, errors, stopped_after=None):
+    """
+    Returns the console report of (path, error) pairs sorted by path. The
+    report is built in a single pass. stopped_after is the number of errors
+    after which the validation was terminated (if it was).
+    """
+    lines = ['VALID' if valid else 'INVALID']
+    lines.extend(path + ': ' + str(error)
+                 for path, error in sorted(errors, key=(lambda item: item[0])))
+    if stopped_after is not None:
+        lines.append('Validation stopped after {count} errors'.format(
+            count=stopped_after))
+    return '\n'.join(lines)
+
+
+def format_path(location):
+    """Returns the path of a (parent location, key) pair."""
+    keys = []
+    while location is not None:
+        location, key = location
+        keys.append(str(key))
+    if not keys:
+        return ''
+    return '/' + '/'.join(reversed(keys))
+
+
+def _render_line(path, error):
+    return path + ': ' + str(error) + '\n'
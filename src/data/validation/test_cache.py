@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the cache of subtree validation results
+
+@author: Tomas Krizek
+"""
+
+import unittest
+from unittest.mock import Mock
+
+from .cache import ValidationCache
+from .validator import Validator
+from ..model import DataNode
+from .. import autoconverter
+
+
+class TestValidationCache(unittest.TestCase):
+
+    its_int = Mock(
+        input_type='Integer',
+        min=0,
+        max=3)
+
+    its_record = Mock(
+        spec=['input_type', 'keys', 'type_name', 'reducible_to_key'],
+        input_type='Record',
+        keys={
+            'a': {'default': {'type': 'obligatory'}, 'type': its_int},
+            'b': {'type': its_int}},
+        type_name='Record',
+        reducible_to_key='a')
+
+    its_array = Mock(
+        input_type='Array',
+        subtype=its_record,
+        min=1,
+        max=10)
+
+    def test_repeated_subtrees(self):
+        raw = [{'a': 1}, {'a': 5, 'b': 1}, {'b': 2}, {'a': 1}, {'a': 5, 'b': 1}]
+        cache = ValidationCache()
+        validator = Validator(cache=cache)
+        self.assertEqual(validator.validate(DataNode(raw), self.its_array), False)
+        expected = Validator()
+        expected.validate(DataNode(raw), self.its_array)
+        self.assertEqual(validator.console_log, expected.console_log)
+        self.assertEqual(sorted(path for path, error in validator.errors),
+                         ['/1/a', '/2', '/4/a'])
+        self.assertEqual(cache.hits, 2)
+
+        # results are shared by validations of other trees
+        cache.hits = 0
+        validator.validate(DataNode([{'b': 2}]), self.its_array)
+        self.assertEqual([path for path, error in validator.errors], ['/0'])
+        self.assertEqual(cache.hits, 1)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_autoconvert(self):
+        raw = [2, {'a': 2}, 2]
+        cache = ValidationCache()
+        validator = Validator(cache=cache)
+        validator.validate(DataNode(raw), self.its_array)
+        self.assertEqual(validator.valid, False)
+
+        # results of validation without auto-conversion are not reused
+        node, errors = validator.autoconvert_and_validate(
+            DataNode(raw), self.its_array, mode=autoconverter.INPLACE)
+        self.assertEqual(validator.valid, True)
+        self.assertEqual([item.value['a'].value for item in node.value],
+                         [2, 2, 2])
+
+    def test_edits(self):
+        cache = ValidationCache()
+        validator = Validator(cache=cache)
+        node = DataNode([{'a': 1}, 2])
+        self.assertEqual(validator.validate(node, self.its_array), False)
+        autoconverter.autoconvert(node, self.its_array, autoconverter.INPLACE)
+        self.assertEqual(validator.validate(node, self.its_array), True)
+        self.assertIsNone(node._tree)  # hashes are not left on the tree
+
+        # direct modification of a value dict
+        record = node.value[0]
+        record.value['a'] = DataNode(5, record, 'a')
+        self.assertEqual(Validator().validate(node, self.its_array), False)
+        self.assertEqual(validator.validate(node, self.its_array), False)
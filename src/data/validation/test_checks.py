@@ -8,6 +8,7 @@ Tests for basic validation checks.
 """
 
 import unittest
+from array import array
 from unittest.mock import Mock
 
 from . import checks, errors
@@ -178,3 +179,29 @@ class TestBasicChecks(unittest.TestCase):
             checks.get_abstractrecord_type(
                 {'TYPE': Mock(value='invalid')}, its)
 
+
+    def test_verify(self):
+        its = Mock(min=0, max=3)
+        self.assertIsNone(checks.verify_integer(2, its))
+        self.assertEqual(checks.verify_integer(2.5, its), checks.NOT_INTEGER)
+        error_class, args = checks.verify_integer(5, its)
+        self.assertIs(error_class, errors.ValueTooBig)
+        self.assertEqual(str(error_class(*args)), str(errors.ValueTooBig(3)))
+        self.assertIsNone(checks.verify_array([None], its))
+        self.assertEqual(checks.verify_array([None] * 4, its)[0],
+                         errors.TooManyItems)
+
+    def test_verify_buffers(self):
+        its = Mock(min=0, max=3)
+        self.assertEqual(checks.verify_integer_buffer(array('q', [0, 3, 2]), its), [])
+        invalid = checks.verify_integer_buffer(array('q', [0, -1, 2, 5]), its)
+        self.assertEqual([i for i, error in invalid], [1, 3])
+        self.assertIs(invalid[0][1][0], errors.ValueTooSmall)
+        self.assertIs(invalid[1][1][0], errors.ValueTooBig)
+        invalid = checks.verify_integer_buffer(array('d', [0.0, 1.5]), its)
+        self.assertEqual([i for i, error in invalid], [0, 1])
+        self.assertEqual(invalid[0][1], checks.NOT_INTEGER)
+
+        self.assertEqual(checks.verify_double_buffer(array('d', [0.5, 3.0]), its), [])
+        invalid = checks.verify_double_buffer(array('d', [3.5, 1.0, float('nan')]), its)
+        self.assertEqual([i for i, error in invalid], [0])
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for incremental validation
+
+@author: Tomas Krizek
+"""
+
+import unittest
+from unittest.mock import Mock
+
+from .incremental import IncrementalValidator
+from .validator import Validator
+from ..model import DataNode
+from .. import autoconverter
+
+
+class TestIncrementalValidator(unittest.TestCase):
+
+    its_int = Mock(
+        input_type='Integer',
+        min=0,
+        max=3)
+
+    its_record = Mock(
+        spec=['input_type', 'keys', 'type_name'],
+        input_type='Record',
+        keys={
+            'a': {'default': {'type': 'obligatory'}, 'type': its_int},
+            'b': {'type': its_int}},
+        type_name='Record')
+
+    its_array = Mock(
+        input_type='Array',
+        subtype=its_record,
+        min=1,
+        max=10)
+
+    its_abstract = Mock(
+        spec=['input_type', 'implementations', 'name'],
+        input_type='AbstractRecord',
+        implementations={'rec': its_record},
+        name='Abstract')
+
+    its_root = Mock(
+        spec=['input_type', 'keys', 'type_name'],
+        input_type='Record',
+        keys={
+            'items': {'type': its_array},
+            'abstract': {'type': its_abstract}},
+        type_name='Root')
+
+    def setUp(self):
+        self.data = DataNode({
+            'items': [{'a': 1}, {'a': 2, 'b': 3}],
+            'abstract': {'TYPE': 'rec', 'a': 0}})
+        self.v = IncrementalValidator()
+        self.assertEqual(self.v.validate(self.data, self.its_root), True)
+
+    def assertSameResult(self):
+        expected = Validator()
+        expected.validate(self.data, self.its_root)
+        self.assertEqual(self.v.valid, expected.valid)
+        self.assertEqual(sorted(self.v.console_log.split('\n')),
+                         sorted(expected.console_log.split('\n')))
+
+    def test_value_change(self):
+        self.data.get('/items/1/b').value = 7
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertEqual([path for path, error in self.v.errors], ['/items/1/b'])
+        self.assertSameResult()
+
+        self.data.get('/items/1/b').value = 2
+        self.assertEqual(self.v.revalidate(), True)
+        self.assertSameResult()
+
+    def test_structure_change(self):
+        item = self.data.get('/items/0')
+        item.value = {'b': item._create_child_node(1, 'b')}  # no key a
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertSameResult()
+
+        item.value['a'] = item._create_child_node(-1, 'a')
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertSameResult()
+
+        items = self.data.get('/items')
+        items.value.append(items._create_child_node({'a': 4}, 2))
+        item.value['a'].value = 1
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertEqual([path for path, error in self.v.errors], ['/items/2/a'])
+        self.assertSameResult()
+
+    def test_abstract_type(self):
+        self.data.get('/abstract/TYPE').value = 'invalid'
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertSameResult()
+        self.data.get('/abstract/TYPE').value = 'rec'
+        self.assertEqual(self.v.revalidate(), True)
+
+    def test_reference(self):
+        data = DataNode({'items': [{'a': 1}], 'abstract': {'TYPE': 'rec', 'a': 0}})
+        data.value['abstract'].value['b'] = data.value['abstract']._create_child_node(None, 'b')
+        data.get('/abstract/b').ref = data.get('/items/0/a')
+        self.data = data
+        self.assertEqual(self.v.validate(data, self.its_root), True)
+        data.get('/items/0/a').value = 5
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertEqual(sorted(path for path, error in self.v.errors),
+                         ['/abstract/b', '/items/0/a'])
+        self.assertSameResult()
+
+    def test_autoconvert(self):
+        data = DataNode({'items': {'a': 1}, 'abstract': {'TYPE': 'rec', 'a': 0}})
+        self.data, errors = self.v.autoconvert_and_validate(
+            data, self.its_root, mode=autoconverter.INPLACE)
+        self.assertEqual(self.v.valid, True)
+        self.assertEqual(data.get('/items/0/a').value, 1)
+
+        # changed nodes are auto-converted when they are revalidated
+        items = data.get('/items')
+        items.value = {'a': items._create_child_node(2, 'a')}
+        self.assertEqual(self.v.revalidate(), True)
+        self.assertEqual(data.get('/items/0/a').value, 2)
+        self.assertIsNot(data.get('/items'), items)
+        self.assertSameResult()
+        data.get('/items/0/a').value = 7
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertSameResult()
+
+    def test_referred_abstract_type(self):
+        data = DataNode({'items': [{'a': 1}],
+                         'abstract': {'TYPE': 'rec', 'a': 1}})
+        data.value['other'] = data._create_child_node(DataNode(None), 'other')
+        data.get('/other').ref = data.get('/abstract')
+        its_root = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={
+                'items': {'type': self.its_array},
+                'abstract': {'type': self.its_abstract},
+                'other': {'type': self.its_abstract}},
+            type_name='Root')
+        self.its_root = its_root
+        self.data = data
+        self.assertEqual(self.v.validate(data, its_root), True)
+        data.get('/abstract/TYPE').value = 'bad'
+        self.assertEqual(self.v.revalidate(), False)
+        self.assertEqual(sorted(path for path, error in self.v.errors),
+                         ['/abstract', '/other'])
+        self.assertSameResult()
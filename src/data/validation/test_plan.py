@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop Model
+
+Tests for compiled validation plans.
+
+@author: Tomas Krizek
+"""
+
+import unittest
+from copy import deepcopy
+
+from . import checks, plan
+from .validator import Validator
+from ..format import _FormatSpec as FormatSpec
+from ..model import DataNode
+
+
+class TestPlan(unittest.TestCase):
+    data = [
+        {
+            "id": "root",
+            "input_type": "Record",
+            "type_name": "Root",
+            "keys": [
+                {"key": "count", "type": "int",
+                 "default": {"type": "obligatory"}},
+                {"key": "items", "type": "array"},
+                {"key": "recursion", "type": "root",
+                 "default": {"type": "optional"}},
+                {"key": "abstract", "type": "abstract"}
+            ]
+        },
+        {
+            "id": "int",
+            "input_type": "Integer",
+            "range": [0, 10]
+        },
+        {
+            "id": "array",
+            "input_type": "Array",
+            "subtype": "int"
+        },
+        {
+            "id": "abstract",
+            "input_type": "AbstractRecord",
+            "name": "MyAbstract",
+            "implementations": ["root"],
+            "default_descendant": "root"
+        }
+    ]
+
+    def setUp(self):
+        self.format = FormatSpec(deepcopy(TestPlan.data))
+
+    def test_compile(self):
+        root = plan.compile_plan(self.format.its())
+        self.assertEqual(root.kind, 'record')
+        keys = {key: (key_plan, obligatory)
+                for key, key_plan, obligatory in root.keys}
+        self.assertEqual(keys['count'][1], True)
+        self.assertEqual(keys['recursion'][1], False)
+        self.assertIs(keys['recursion'][0], root)
+        self.assertEqual(keys['count'][0].verify, checks.verify_integer)
+        self.assertIs(keys['items'][0].subtype, keys['count'][0])
+        abstract = keys['abstract'][0]
+        self.assertIs(abstract.implementations['Root'], root)
+        self.assertIs(abstract.default_descendant, root)
+
+    def test_validate_with_plan(self):
+        root = plan.compile_plan(self.format.its())
+        validator = Validator()
+        node = DataNode({'count': 1, 'items': [1, 2],
+                         'abstract': {'TYPE': 'Root', 'count': 3}})
+        self.assertEqual(validator.validate(node, root), True)
+        node = DataNode({'items': [1, 20], 'recursion': {'count': -1}})
+        self.assertEqual(validator.validate(node, root), False)
+        paths = sorted(path for path, error in validator.errors)
+        self.assertEqual(paths, ['', '/items/1', '/recursion/count'])
+
+    def test_plan_reused(self):
+        its = self.format.its()
+        validator = Validator()
+        validator.validate(DataNode({'count': 1}), its)
+        its_plan = validator._get_plan(its)
+        validator.validate(DataNode({'count': 2}), its)
+        self.assertIs(validator._get_plan(its), its_plan)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for error sinks
+
+@author: Tomas Krizek
+"""
+
+import io
+import unittest
+from unittest.mock import Mock
+
+from . import sinks, errors
+from .validator import Validator
+from ..model import DataNode
+
+
+class TestSinks(unittest.TestCase):
+
+    its_int = Mock(
+        input_type='Integer',
+        min=0,
+        max=3)
+
+    its_array = Mock(
+        input_type='Array',
+        subtype=its_int,
+        min=0,
+        max=100)
+
+    its_record = Mock(
+        spec=['input_type', 'keys', 'type_name'],
+        input_type='Record',
+        keys={
+            'a': {'type': its_array},
+            'b': {'type': its_int}},
+        type_name='Root')
+
+    def setUp(self):
+        self.node = DataNode({'a': [1, -1, 5, 7, -2, 9], 'b': 'x'})
+
+    def test_collecting_sink(self):
+        validator = Validator()
+        self.assertEqual(validator.validate(self.node, self.its_record), False)
+        self.assertEqual(validator.error_count, 6)
+        self.assertEqual(len(validator.errors), 6)
+        self.assertIs(validator.errors, validator.errors)
+
+    def test_error_sink(self):
+        class IncompleteSink(sinks.ErrorSink):
+            def close(self):
+                pass
+
+        # a sink without report fails when it is created
+        with self.assertRaises(TypeError):
+            IncompleteSink()
+
+    def test_stream_sink(self):
+        stream = io.StringIO()
+        validator = Validator(sinks.StreamSink(stream))
+        self.assertEqual(validator.validate(self.node, self.its_record), False)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertIn('/a/1: Expected value larger or equal to 0', lines)
+        self.assertIn('/b: Expecting type Integer', lines)
+        self.assertEqual(validator.errors, ())
+
+    def test_aggregating_sink(self):
+        validator = Validator(sinks.AggregatingSink())
+        self.assertEqual(validator.validate(self.node, self.its_record), False)
+        self.assertEqual(validator.error_count, 6)
+        paths = sorted(path for path, error in validator.errors)
+        self.assertEqual(paths, ['/a/*', '/a/*', '/b'])
+        aggregated = [error for path, error in validator.errors
+                      if isinstance(error, errors.AggregatedError)]
+        self.assertEqual(sorted(error.count for error in aggregated), [2, 3])
+        self.assertEqual(str(aggregated[0]).endswith('paths under /a)'), True)
+
+        node = DataNode({'a': [1, -1, 2], 'b': 1})
+        self.assertEqual(validator.validate(node, self.its_record), False)
+        self.assertEqual(validator.console_log,
+                         'INVALID\n/a/1: Expected value larger or equal to 0')
+
+    def test_max_errors(self):
+        validator = Validator(max_errors=2)
+        self.assertEqual(validator.validate(self.node, self.its_record), False)
+        self.assertEqual(validator.stopped, True)
+        self.assertEqual(len(validator.errors), 2)
+        self.assertEqual(validator.console_log.splitlines()[-1],
+                         'Validation stopped after 2 errors')
+
+        node = DataNode({'a': [1, 2], 'b': -1})
+        self.assertEqual(validator.validate(node, self.its_record), False)
+        self.assertEqual(validator.stopped, False)
+
+    def test_render_log(self):
+        log = sinks.render_log(False, [('/b', 'y'), ('/a', 'x')])
+        self.assertEqual(log, 'INVALID\n/a: x\n/b: y')
+        self.assertEqual(sinks.render_log(True, []), 'VALID')
@@ -9,7 +9,7 @@ import unittest
 from unittest.mock import Mock
 
 from . import validator
-from ..model import DataNode
+from ..model import DataNode, NumericArrayNode
 
 
 class TestValidator(unittest.TestCase):
@@ -91,6 +91,13 @@ class TestValidator(unittest.TestCase):
         del node.value['TYPE']
         self.assertEqual(self.v.validate(node), False)
 
+        # a TYPE which is not a valid key is reported, not raised
+        node = DataNode({'a1': 1, 'a2': 1, 'TYPE': [1]})
+        node.its = TestValidator.its_abstract
+        self.assertEqual(self.v.validate(node), False)
+        self.assertIsInstance(self.v.errors[0][1],
+                              validator.errors.InvalidAbstractRecordType)
+
     def test_validate(self):
         node = DataNode({'TYPE': 'record1', 'a1': 2, 'a2': 1})
         node.its=TestValidator.its_abstract
@@ -116,3 +123,71 @@ class TestValidator(unittest.TestCase):
         self.assertEqual(len(self.v.errors), 3)
 
 
+
+    def test_error_paths(self):
+        its_root = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={
+                'array': {'type': TestValidator.its_array},
+                'record': {'type': TestValidator.its_record}},
+            type_name='Root')
+        node = DataNode({'array': [0, 5], 'record': {'a1': 1}})
+        self.assertEqual(self.v.validate(node, its_root), False)
+        paths = sorted(path for path, error in self.v.errors)
+        self.assertEqual(paths, ['/array/1', '/record'])
+
+        node = DataNode([1, 'x'])
+        self.assertEqual(self.v.validate(node, TestValidator.its_array), False)
+        self.assertEqual([path for path, error in self.v.errors], ['/1'])
+
+    def test_autoconvert_and_validate(self):
+        its_root = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={
+                'array': {'type': TestValidator.its_array},
+                'abstract': {'type': TestValidator.its_abstract}},
+            type_name='Root')
+        node = DataNode({'array': 2, 'abstract': {'TYPE': 'record2', 'b': 7}})
+        converted, errors = self.v.autoconvert_and_validate(node, its_root)
+        self.assertEqual(converted.get('/array/0').value, 2)
+        self.assertEqual(node.get('/array').value, 2)  # copied
+        self.assertEqual([path for path, error in errors], ['/abstract/b'])
+        self.assertEqual(self.v.valid, False)
+
+        converted, errors = self.v.autoconvert_and_validate(
+            node, its_root, mode='inplace')
+        self.assertIs(converted, node)
+        self.assertEqual(node.get('/array/0').value, 2)
+
+    def test_numeric_buffer(self):
+        length = NumericArrayNode.MIN_LENGTH
+        its_array = Mock(
+            input_type='Array',
+            subtype=TestValidator.its_int,
+            min=1,
+            max=length)
+        node = DataNode({'a': [1] * length, 'b': None})
+        node.value['b'].ref = node.value['a']
+        its_root = Mock(
+            spec=['input_type', 'keys', 'type_name'],
+            input_type='Record',
+            keys={'a': {'type': its_array}, 'b': {'type': its_array}},
+            type_name='Root')
+        self.assertEqual(self.v.validate(node, its_root), True)
+
+        node = DataNode({'a': [1] * length + [-1, 7]})
+        self.assertEqual(self.v.validate(node, its_root), False)
+        self.assertIsNotNone(node.value['a'].buffer)  # not materialized
+        paths = sorted(path for path, error in self.v.errors)
+        self.assertEqual(paths, ['/a', '/a/{0}'.format(length),
+                                 '/a/{0}'.format(length + 1)])
+
+        # auto-conversion keeps the buffers (of the nodes and of references)
+        node = DataNode({'a': [1] * length, 'b': None})
+        node.value['b'].ref = node.value['a']
+        converted, errors = self.v.autoconvert_and_validate(
+            node, its_root, mode='inplace')
+        self.assertEqual(self.v.valid, True)
+        self.assertIsNotNone(node.value['a'].buffer)
@@ -5,117 +5,310 @@ Validator for Flow123D CON files
 @author: Tomas Krizek
 """
 
-from . import errors, checks
+from copy import deepcopy
+
+from . import errors, checks, plan
+from .sinks import CollectingSink, render_log
+from .. import autoconverter
+from ..model import NumericArrayNode
+
+
+_NOT_RECORD = (errors.ValidationError, ("Expecting type Record",))
+_NOT_ARRAY = (errors.ValidationError, ("Expecting type Array",))
 
 
 class Validator:
-    SCALAR = ['Integer', 'Double', 'Bool', 'String', 'Selection', 'FileName']
+    SCALAR = plan.SCALAR
 
     @property
     def errors(self):
-        return tuple(self._errors)
+        """
+        Returns (path, error) pairs of the occured errors kept by the sink.
+        Errors are collected as lightweight records; paths and exceptions
+        are created on the first access.
+        """
+        return self.sink.errors
 
     @property
     def console_log(self):
-        out = ('VALID' if self.valid else 'INVALID')
-        for path, error in sorted(self._errors, key=(lambda item: item[0])):
-            out = out + '\n' + path + ': ' + str(error)
-        return out
+        return render_log(self.valid, self.errors,
+                          self.error_count if self.stopped else None)
 
     def validate(self, node, its=None):
         """
         Performs data validation of node.
 
         Validation is performed recursively on all children nodes as well.
+        its can be either an ITS or its compiled plan. Plans of ITS are
+        compiled on first use and reused by subsequent validations.
 
         Returns True when all data was correctly validated, False otherwise.
-        Attribute errors contains a list of occured errors.
+        Errors are reported to the sink; attribute errors contains a list of
+        errors kept by the sink. When max_errors errors occur, validation is
+        terminated and attribute stopped is set.
         """
-        self._errors = []
         self.valid = True
+        self.error_count = 0
+        self.stopped = False
         self.root_node = node
 
         if its is None:
             its = node.its
 
-        self._validate_node('', its)
-        self._errors = reversed(self._errors)
+        its_plan = self._get_plan(its)
+        # hashes miss direct edits of value dicts and lists, so unless the
+        # caller keeps them up to date, they are kept during this validation only
+        build_hashes = self.cache is not None and \
+            (node._tree is None or node._tree.hashes is None)
+        if build_hashes:
+            node.build_hash_cache()
+        self._captures = []
+        self.sink.open()
+        try:
+            self._validate_node(node, its_plan)
+        except _ErrorLimitReached:
+            self.stopped = True
+        finally:
+            self.sink.close()
+            if build_hashes:
+                node.drop_hash_cache()
 
         return self.valid
 
-    def _validate_node(self, path='', its=None):
+    def autoconvert_and_validate(self, node, its=None, mode=autoconverter.COPY):
         """
-        Determines if node at given path contains correct value.
+        Performs auto-conversion and validation of node in a single
+        traversal. Each node is auto-converted right before it is validated.
+        mode is either autoconverter.COPY or autoconverter.INPLACE.
 
-        Method verifies node recursively. All descendant nodes are checked.
+        Returns the converted root node and the list of occured errors.
         """
-        node = self.root_node.get(path)
         if its is None:
             its = node.its
-        
-        if its.input_type in Validator.SCALAR:
-            self._validate_scalar(path, its)
-        elif its.input_type == 'Record':
-            self._validate_record(path, its)
-        elif its.input_type == 'AbstractRecord':
-            self._validate_abstract(path, its)
-        elif its.input_type == 'Array':
-            self._validate_array(path, its)
+        if mode == autoconverter.COPY:
+            node = deepcopy(node)  # references are kept, but duplicated
+        elif mode != autoconverter.INPLACE:
+            raise ValueError("Unsupported autoconvert mode {mode}".format(mode=mode))
+
+        self._autoconvert = True
+        try:
+            self.validate(node, its)
+        finally:
+            self._autoconvert = False
+        return node, self.errors
+
+    def _get_plan(self, its):
+        """Returns the compiled plan of its."""
+        if isinstance(its, plan.TypePlan):
+            return its
+        try:
+            its_plan = self._plans[id(its)]
+        except KeyError:
+            pass
+        else:
+            if its_plan.its is its:
+                return its_plan
+        its_plan = plan.compile_plan(its)
+        self._plans[id(its)] = its_plan
+        return its_plan
+
+    def _validate_node(self, node, its_plan, location=None):
+        """
+        Determines if node contains correct value.
+
+        Method verifies node recursively. All descendant nodes are checked.
+
+        Location of the node is passed down as a (parent location, key) pair
+        and formatted into a path only when an error is reported.
+        """
+        kind = its_plan.kind
+        if kind == 'scalar':
+            self._validate_scalar(node, its_plan, location)
+        elif self.cache is not None and kind is not None:
+            self._validate_cached(node, its_plan, location)
+        else:
+            self._validate_structure(node, its_plan, location)
+
+    def _validate_structure(self, node, its_plan, location):
+        """Validates a record, abstract record or array node."""
+        kind = its_plan.kind
+        if kind == 'record':
+            self._validate_record(node, its_plan, location)
+        elif kind == 'abstract':
+            self._validate_abstract(node, its_plan, location)
+        elif kind == 'array':
+            self._validate_array(node, its_plan, location)
         else:
-            raise Exception("Format error: Unknown input_type {input_type})".format(input_type=its.input_type))
+            raise Exception("Format error: Unknown input_type {input_type})".format(input_type=its_plan.its.input_type))
 
-    def _validate_scalar(self, path, its):
-        node = self.root_node.get(path)
+    def _validate_cached(self, node, its_plan, location):
+        """
+        Validates node using the cached result of an identical subtree.
+        Errors of a validated subtree are captured and cached.
+
+        In auto-conversion mode, only results of subtrees which were not
+        converted are reused.
+        """
+        digest = node.subtree_hash()
+        its = its_plan.its
+        result = self.cache.get(digest, its, self._autoconvert)
+        if result is not None and not result[1]:
+            for keys, error in result[0]:
+                error_location = location
+                for key in keys:
+                    error_location = (error_location, key)
+                self._report_error(error_location, error)
+            return
+        conversions = self._conversions
+        capture = []
+        self._captures.append(capture)
         try:
-            getattr(checks, 'check_%s' % its.input_type.lower())(node.value, its)
-        except errors.ValidationError as error:
-            self._report_error(path, error)
-
-    def _validate_record(self, path, its):
-        node = self.root_node.get(path)
-        if not isinstance(node.value, dict):
-            self._report_error(path, ValidationError("Expecting type Record"))
+            self._validate_structure(node, its_plan, location)
+        finally:
+            self._captures.pop()
+        errors_ = [(_relative_keys(error_location, location), error)
+                   for error_location, error in capture]
+        self.cache.put(digest, its, self._autoconvert, errors_,
+                       self._conversions != conversions)
+
+    def _validate_scalar(self, node, its_plan, location):
+        error = its_plan.verify(node.value, its_plan.its)
+        if error is not None:
+            self._report_error(location, error)
+
+    def _validate_record(self, node, its_plan, location):
+        value = node.value
+        if not isinstance(value, dict):
+            self._report_error(location, _NOT_RECORD)
             return
-        for key in its.keys.keys():
-            try:
-                checks.check_record_key(node.value, key, its)
-            except errors.ValidationError as error:
-                self._report_error(path, error)
-                if isinstance(error, errors.UnknownKey):
-                    continue
-            if key in node.value:
-                self._validate_node('%s/%s' % (path, key), its.keys[key]['type'])
-
-    def _validate_abstract(self, path, its):
-        node = self.root_node.get(path)
+        for key, key_plan, obligatory in its_plan.keys:
+            if key in value:
+                child = value[key]
+                if self._autoconvert:
+                    converted = autoconverter._get_autoconverted(child, key_plan.its)
+                    if converted is not child:
+                        child = value[key] = converted
+                        self._record_conversion(node)
+                self._validate_node(child, key_plan, (location, key))
+            elif obligatory:
+                self._report_error(location, (errors.MissingKey, (key, its_plan.its.type_name)))
+
+    def _validate_abstract(self, node, its_plan, location):
         try:
-            record_its = checks.get_abstractrecord_type(node.value, its)
-        except errors.ValidationError as error:
-            self._report_error(path, error)
+            type_name = node.value['TYPE'].value
+        except (KeyError, TypeError):
+            record_plan = its_plan.default_descendant
+            if record_plan is None:
+                self._report_error(location, (errors.MissingAbstractRecordType, ()))
+                return
         else:
-            self._validate_record(path, record_its)
+            try:
+                record_plan = its_plan.implementations[type_name]
+            except (KeyError, TypeError):
+                self._report_error(location, (errors.InvalidAbstractRecordType, (type_name, its_plan.its.name)))
+                if self._autoconvert and its_plan.default_descendant is not None:
+                    # auto-conversion falls back to the default descendant
+                    autoconverter._autoconvert_crawl(node, its_plan.default_descendant.its)
+                    self._record_conversion(node, subtree=True)
+                return
+        self._validate_record(node, record_plan, location)
 
-    def _validate_array(self, path, its):
-        node = self.root_node.get(path)
-        if not isinstance(node.value, list):
-            self._report_error(path, errors.ValidationError("Expecting type Array"))
+    def _validate_array(self, node, its_plan, location):
+        subtype = its_plan.subtype
+        if subtype.verify_buffer is not None:
+            target = node
+            while target.ref is not None:
+                target = target.ref
+            if isinstance(target, NumericArrayNode) and target.buffer is not None:
+                self._validate_buffer(target.buffer, its_plan, location)
+                return
+        value = node.value
+        if not isinstance(value, list):
+            self._report_error(location, _NOT_ARRAY)
             return
-        try:
-            checks.check_array(node.value, its)
-        except errors.ValidationError as error:
-            self._report_error(path, error)
-        for i, item in enumerate(node.value):
-            self._validate_node('%s/%d' % (path, i), its.subtype)
+        error = checks.verify_array(value, its_plan.its)
+        if error is not None:
+            self._report_error(location, error)
+        convert = self._autoconvert and subtype.kind != 'scalar'
+        for i, item in enumerate(value):
+            if convert:
+                converted = autoconverter._get_autoconverted(item, subtype.its)
+                if converted is not item:
+                    item = value[i] = converted
+                    self._record_conversion(node)
+            self._validate_node(item, subtype, (location, i))
 
-    def __init__(self):
+    def _validate_buffer(self, buffer, its_plan, location):
+        """Validates a typed buffer of numbers with a bulk check."""
+        error = checks.verify_array(buffer, its_plan.its)
+        if error is not None:
+            self._report_error(location, error)
+        subtype = its_plan.subtype
+        for i, error in subtype.verify_buffer(buffer, subtype.its):
+            self._report_error((location, i), error)
+
+    def __init__(self, sink=None, max_errors=None, cache=None):
+        """
+        sink receives the occured errors (errors are kept in memory by
+        default). Validation is terminated after max_errors errors. cache
+        is a ValidationCache of subtree results, which can be shared by
+        validators of multiple files.
+        """
+        if sink is None:
+            sink = CollectingSink()
+        self.sink = sink
+        self.max_errors = max_errors
+        self.cache = cache
+        self._captures = []
+        self._conversions = 0
         self.valid = True
-        self._errors = []
+        self.error_count = 0
+        self.stopped = False
+        self._plans = {}
+        self._autoconvert = False
 
-    def _report_error(self, path, error):
+    def _record_conversion(self, node, subtree=False):
         """
-        Report an error.
+        Counts a conversion of node (or of its subtree) and records it as
+        a change of the tree, so that cached hashes are not outdated.
+        """
+        self._conversions = self._conversions + 1
+        while node.ref is not None:
+            node = node.ref
+        if node._tree is None:
+            return
+        node._record_change()
+        hashes = node._tree.hashes
+        if subtree and hashes:
+            nodes = node._children()
+            while nodes:
+                child = nodes.pop()
+                hashes.pop(child, None)
+                nodes.extend(child._children())
+
+    def _report_error(self, location, error):
+        """
+        Report an error given as an (error class, arguments) record.
         """
         self.valid = False
-        self._errors.append((path, error))
+        self.error_count = self.error_count + 1
+        self.sink.report(location, error)
+        for capture in self._captures:
+            capture.append((location, error))
+        if self.max_errors is not None and self.error_count >= self.max_errors:
+            raise _ErrorLimitReached()
+
+
+def _relative_keys(location, base):
+    """Returns the keys leading from base location to location."""
+    keys = []
+    while location is not base:
+        location, key = location
+        keys.append(key)
+    keys.reverse()
+    return tuple(keys)
 
 
+class _ErrorLimitReached(Exception):
+    """Terminates a validation once max_errors errors occured."""
+    pass
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop watch mode
+
+Validates a configuration file again whenever it (or its format) is
+saved, and reports only the errors which appeared or disappeared since
+the previous validation. The format is parsed again only when its file
+changes, and a subtree cache shared by all validations of the session
+skips the subtrees which were not edited.
+
+Files are watched by inotify on Linux; elsewhere their status is polled.
+Directories of the files are watched, so that editors which save by
+replacing the file are noticed as well.
+
+@author: Tomas Krizek
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from .batch import validate_content
+from .format import parse_format
+from .validation import compile_plan
+from .validation.cache import ValidationCache
+
+SETTLE_TIME = 0.02  # changes within this time are handled at once
+POLL_INTERVAL = 0.05
+
+
+class WatchSession:
+    """Repeated validations of a single file with the error diff."""
+
+    def __init__(self, filename, format_filename, cache_dir=None,
+                 max_errors=None, aggregate=False):
+        self.filename = filename
+        self.format_filename = format_filename
+        self.cache_dir = cache_dir
+        self.max_errors = max_errors
+        self.aggregate = aggregate
+        self.cache = ValidationCache()
+        self.errors = None  # error lines of the last validation
+        self._plan = None
+        self._format_version = None
+        self._content = None
+
+    @property
+    def filenames(self):
+        """Returns the watched files."""
+        return [self.filename, self.format_filename]
+
+    def validate(self):
+        """
+        Validates the file unless neither it nor the format changed since
+        the last validation. Returns the report of the changes of the error
+        set (a list of lines), or None if nothing was validated.
+
+        Errors of the format (e.g. a file saved in the middle of an edit)
+        are reported as the error set; the previous plan is kept.
+        """
+        try:
+            format_changed = self._load_format()
+        except Exception as error:
+            errors = {'Format {filename}: {error}'.format(
+                filename=self.format_filename, error=error)}
+            if errors == self.errors:
+                return None
+            self._content = None  # validate again once the format is fixed
+            previous, self.errors = self.errors, errors
+            return _report(False, previous, errors)
+        try:
+            with open(self.filename, 'rb') as con_file:
+                content = con_file.read()
+        except OSError as error:
+            content = None
+            errors = {'{0}'.format(error)}
+            valid = False
+        else:
+            if content == self._content and not format_changed:
+                return None
+            result = validate_content(content, self._plan, self.max_errors,
+                                      self.aggregate, self.cache)
+            valid = result.valid
+            if result.failure is not None:
+                errors = {result.failure}
+            else:
+                errors = {path + ': ' + message
+                          for path, message in result.errors}
+                if result.stopped_after is not None:
+                    errors.add('Validation stopped after {0} errors'.format(
+                        result.stopped_after))
+        self._content = content
+        previous, self.errors = self.errors, errors
+        return _report(valid, previous, errors)
+
+    def _load_format(self):
+        """
+        Parses the format if it changed; returns whether it changed. The
+        plan is replaced only if the format was parsed and compiled.
+        """
+        stat = os.stat(self.format_filename)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._format_version:
+            return False
+        self._format_version = None  # parsed again after a failure
+        plan = compile_plan(parse_format(self.format_filename, self.cache_dir))
+        self._plan = plan
+        self._format_version = version
+        self.cache.clear()
+        return True
+
+
+def watch(session, output=sys.stdout, watcher=None):
+    """
+    Prints the result of the session and the changes after every
+    modification of the watched files. Runs until interrupted.
+    """
+    if watcher is None:
+        watcher = create_watcher(session.filenames)
+    try:
+        _print_report(session, session.validate(), output)
+        while True:
+            if watcher.wait():
+                _print_report(session, session.validate(), output)
+    finally:
+        watcher.close()
+
+
+def _print_report(session, report, output):
+    if report is None:
+        return
+    output.write('[{time}] {filename}\n'.format(
+        time=time.strftime('%H:%M:%S'), filename=session.filename))
+    output.write('\n'.join(report) + '\n')
+    output.flush()
+
+
+def _report(valid, previous, errors):
+    """Returns the lines describing the change of the error set."""
+    status = 'VALID' if valid else 'INVALID ({0} errors)'.format(len(errors))
+    if previous is None:
+        return [status] + sorted(errors)
+    lines = [status]
+    lines.extend('- ' + error for error in sorted(previous - errors))
+    lines.extend('+ ' + error for error in sorted(errors - previous))
+    if len(lines) == 1:
+        lines.append('(no change of errors)')
+    return lines
+
+
+def create_watcher(filenames):
+    """Returns an inotify watcher if available, a polling watcher otherwise."""
+    try:
+        return InotifyWatcher(filenames)
+    except OSError:
+        return PollingWatcher(filenames)
+
+
+class PollingWatcher:
+    """Notices changes of files by polling their status."""
+
+    def __init__(self, filenames, interval=POLL_INTERVAL):
+        self.filenames = [os.path.abspath(filename) for filename in filenames]
+        self.interval = interval
+        self._status = {filename: _status(filename)
+                        for filename in self.filenames}
+
+    def wait(self, timeout=None):
+        """
+        Waits for a change of the files; returns the set of changed files
+        (empty after timeout seconds).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changed()
+            if changed:
+                time.sleep(SETTLE_TIME)
+                return changed | self._changed()
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+    def _changed(self):
+        changed = set()
+        for filename in self.filenames:
+            status = _status(filename)
+            if status != self._status[filename]:
+                self._status[filename] = status
+                changed.add(filename)
+        return changed
+
+
+def _status(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class InotifyWatcher:
+    """Notices changes of files by inotify (Linux only)."""
+
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x2 | 0x8 | 0x80 | 0x100 | 0x200
+
+    def __init__(self, filenames):
+        """Raises OSError if inotify is not available."""
+        libc = _libc()
+        self.filenames = {os.path.abspath(filename) for filename in filenames}
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}  # watch descriptor -> directory
+        try:
+            for directory in {os.path.dirname(filename)
+                              for filename in self.filenames}:
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                            self.MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+                self._directories[wd] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout=None):
+        """
+        Waits for a change of the files; returns the set of changed files
+        (empty after timeout seconds).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while not changed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return changed
+            if select.select([self._fd], [], [], remaining)[0]:
+                changed.update(self._read_events())
+        while select.select([self._fd], [], [], SETTLE_TIME)[0]:
+            changed.update(self._read_events())
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _read_events(self):
+        """Returns the watched files named by the pending events."""
+        try:
+            buffer = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + 16 <= len(buffer):
+            wd, mask, cookie, length = struct.unpack_from('iIII', buffer, offset)
+            name = buffer[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset = offset + 16 + length
+            directory = self._directories.get(wd)
+            if directory is None:
+                continue
+            filename = os.path.join(directory, os.fsdecode(name))
+            if filename in self.filenames:
+                changed.add(filename)
+        return changed
+
+
+def _libc():
+    """Returns libc with inotify functions, raises OSError otherwise."""
+    if not sys.platform.startswith('linux'):
+        raise OSError("inotify is available on Linux only")
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        raise OSError("inotify is not available")
+    return libc
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+GeoMop YAML input and output
+
+Reading builds the DataNode tree directly from the YAML node graph
+composed by PyYAML (by libyaml when available). Anchors and aliases are
+mapped onto references: the anchored node is built once and every alias
+becomes a node referring to it, so no reference resolution pass is
+needed. Nodes are annotated with their input types while they are built
+if the root ITS is given. Merge keys (<<) are expanded as by yaml.safe_load; the merged
+values refer to the nodes of the merged mapping. REF keys (e.g. in files
+converted from .con) are resolved as in .con files. Tags of mappings
+(!TypeName in Flow123d v2 files) are read as the TYPE key. Keys which are
+not strings (e.g. 1: ...) are converted to strings, since nodes are named
+and addressed by text paths.
+
+Writing emits the YAML events while walking the data, so the
+representation of the whole document is never built.
+
+@author: Tomas Krizek
+"""
+
+from sys import intern
+
+from .model import DataNode, NumericArrayNode, RefError, _concrete_its, \
+    _item_its, _numeric_buffer
+
+_YAML_TAG = 'tag:yaml.org,2002:'
+_STR_TAG = _YAML_TAG + 'str'
+_MERGE_TAG = _YAML_TAG + 'merge'
+
+
+def decode_yaml(text, node_class=DataNode, its=None):
+    """
+    Builds the tree of a YAML document, annotated if the root its is given.
+    Returns the root node and the REF keys found in it (path -> referred
+    path, as in parser._extract_references).
+    """
+    import yaml
+    loader_class = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    loader = loader_class(text)
+    try:
+        document = loader.get_single_node()
+        if document is None:
+            return node_class(None, its=its), {}
+        return _TreeBuilder(loader, node_class).build(document, its)
+    finally:
+        loader.dispose()
+
+
+class _TreeBuilder:
+    """Builds DataNode tree from YAML nodes."""
+
+    def __init__(self, loader, node_class):
+        self._loader = loader
+        self._constructors = loader.yaml_constructors
+        self._node_class = node_class
+        self._built = {}  # YAML node -> DataNode (or (array node, index))
+        self._building = set()  # YAML nodes whose children are being built
+        self._refs = {}
+
+    def build(self, document, its=None):
+        root = self._build(document, None, '', its)
+        return root, self._refs
+
+    def _build(self, node, parent, name, its):
+        built = self._built.get(node)
+        if built is not None or node in self._building:
+            return self._alias(node, built, parent, name, its)
+        kind = node.id
+        if kind == 'scalar':
+            data_node = self._node_class(self._scalar(node), parent, name, its)
+        elif kind == 'mapping':
+            data_node = self._mapping(node, parent, name, its)
+        else:
+            data_node = self._sequence(node, parent, name, its)
+        self._built[node] = data_node
+        return data_node
+
+    def _alias(self, node, target, parent, name, its):
+        """Returns a node referring to the node built from node."""
+        if target is None:
+            raise RefError("Circular reference: alias of an ancestor at "
+                           "{path}/{name}".format(path=parent.path.rstrip('/'),
+                                                  name=name))
+        if isinstance(target, tuple):  # item of a typed buffer
+            array_node, index = target
+            target = self._built[node] = array_node.value[index]
+        data_node = self._node_class({}, parent, name)
+        data_node.ref = target
+        if its is not None:
+            data_node.annotate(its)
+        return data_node
+
+    def _scalar(self, node):
+        tag = node.tag
+        if tag == _STR_TAG:
+            return node.value
+        constructor = self._constructors.get(tag)
+        if constructor is None:
+            return node.value  # unknown tag, keep the text
+        return constructor(self._loader, node)
+
+    def _mapping(self, node, parent, name, its):
+        items = {}  # the last value of a repeated key is used
+        for key_node, value_node in self._items(node):
+            items[intern(str(self._scalar(key_node)))] = value_node
+        tag = node.tag
+        type_name = None
+        if not tag.startswith(_YAML_TAG) and 'TYPE' not in items:
+            type_name = tag[1:] if tag.startswith('!') else tag
+        if its is not None and its.input_type == 'AbstractRecord':
+            type_node = items.get('TYPE')
+            if type_node is not None and type_node.id == 'scalar':
+                its = _concrete_its({'TYPE': self._scalar(type_node)}, its)
+            else:
+                its = _concrete_its({'TYPE': type_name}, its)
+        keys = its.keys if its is not None and its.input_type == 'Record' else {}
+        data_node = self._node_class({}, parent, name, its)
+        self._building.add(node)
+        value = data_node._value
+        for key, value_node in items.items():
+            if key == 'REF' and value_node.id == 'scalar':
+                self._refs[data_node.path] = str(self._scalar(value_node))
+                continue
+            value[key] = self._build(value_node, data_node, key,
+                                     _key_its(keys, key))
+        if type_name is not None:
+            value['TYPE'] = self._node_class(type_name, data_node, 'TYPE',
+                                             _key_its(keys, 'TYPE'))
+        self._building.discard(node)
+        return data_node
+
+    def _items(self, node):
+        """
+        Returns the (key node, value node) pairs of a mapping node. Merge
+        keys are expanded by SafeConstructor, which puts the merged pairs
+        first, so that the keys of the mapping itself override them.
+        """
+        if any(key_node.tag == _MERGE_TAG for key_node, value_node in node.value):
+            self._loader.flatten_mapping(node)
+        return node.value
+
+    def _sequence(self, node, parent, name, its):
+        items = node.value
+        if len(items) >= NumericArrayNode.MIN_LENGTH and \
+                all(item.id == 'scalar' for item in items):
+            buffer = _numeric_buffer([self._scalar(item) for item in items])
+            if buffer is not None:
+                array_node = NumericArrayNode(buffer, parent, name, its)
+                for i, item in enumerate(items):
+                    self._built[item] = (array_node, i)
+                return array_node
+        data_node = self._node_class([], parent, name, its)
+        self._building.add(node)
+        value = data_node._value
+        subtype = _item_its(its)
+        for i, item in enumerate(items):
+            value.append(self._build(item, data_node, i, subtype))
+        self._building.discard(node)
+        return data_node
+
+
+def _key_its(keys, key):
+    """Returns the ITS of key of a record (None for unknown keys)."""
+    spec = keys.get(key)
+    return None if spec is None else spec['type']
+
+
+def encode_yaml(data, stream):
+    """
+    Writes data (dicts, lists and scalars) to stream as a YAML document.
+    The events are emitted while data is walked.
+    """
+    import yaml
+    dumper_class = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    yaml.emit(_events(data, yaml), stream, Dumper=dumper_class)
+
+
+def _events(data, yaml):
+    """Yields the YAML events of a document with data."""
+    represent = _Representer(yaml)
+    yield yaml.StreamStartEvent()
+    yield yaml.DocumentStartEvent(explicit=False)
+    stack = [iter([data])]
+    while stack:
+        try:
+            item = next(stack[-1])
+        except StopIteration:
+            finished = stack.pop()
+            if stack:
+                yield (yaml.MappingEndEvent() if isinstance(finished, _Keys)
+                       else yaml.SequenceEndEvent())
+            continue
+        if isinstance(stack[-1], _Keys):
+            key, item = item
+            yield represent.scalar(key)
+        if isinstance(item, dict):
+            yield yaml.MappingStartEvent(None, None, True, flow_style=False)
+            stack.append(_Keys(item))
+        elif isinstance(item, list):
+            yield yaml.SequenceStartEvent(None, None, True, flow_style=False)
+            stack.append(iter(item))
+        else:
+            yield represent.scalar(item)
+    yield yaml.DocumentEndEvent(explicit=False)
+    yield yaml.StreamEndEvent()
+
+
+class _Keys:
+    """Iterator over the items of a dict (marks mappings on the stack)."""
+
+    def __init__(self, mapping):
+        self._items = iter(mapping.items())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+
+class _Representer:
+    """Creates scalar events the same way as the safe representer."""
+
+    def __init__(self, yaml):
+        self._yaml = yaml
+        self._representer = yaml.representer.SafeRepresenter()
+        self._resolver = yaml.resolver.Resolver()
+
+    def scalar(self, value):
+        if isinstance(value, str):
+            text = value
+            tag = _STR_TAG
+        else:
+            node = self._representer.represent_data(value)
+            text, tag = node.value, node.tag
+        implicit = (self._resolver.resolve(self._yaml.ScalarNode, text,
+                                           (True, False)) == tag,
+                    self._resolver.resolve(self._yaml.ScalarNode, text,
+                                           (False, True)) == tag)
+        return self._yaml.ScalarEvent(None, None, implicit, text)